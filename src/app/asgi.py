@@ -0,0 +1,166 @@
+"""ASGI-приложение на асинхронном движке (AsyncGoService).
+
+    uvicorn app.asgi:app --workers 4
+
+Обслуживает /debug/, /testing/ (без потокового режима), /ready/
+и /metrics с теми же схемами и ответами об ошибках, что и Flask-приложение.
+Если клиент отключился, не дождавшись ответа, запрос отменяется
+и его программы убиваются.
+"""
+import json
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Optional
+
+from marshmallow import Schema, ValidationError
+from prometheus_client import CONTENT_TYPE_LATEST
+from werkzeug.exceptions import BadRequest, InternalServerError, TooManyRequests
+
+from app import config
+from app.schema import (
+    DebugSchema,
+    TestsSchema,
+    BadRequestSchema,
+    ServiceExceptionSchema,
+)
+from app.service import build, metrics, stages
+from app.service.aio import AsyncGoService
+from app.service.exceptions import ServiceException, OverloadedException
+
+Receive = Callable[[], Awaitable[dict]]
+Send = Callable[[dict], Awaitable[None]]
+
+
+class Disconnected(Exception):
+    """Клиент закрыл соединение"""
+
+
+async def read_body(receive: Receive) -> bytes:
+    body = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise Disconnected()
+        body.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(body)
+
+
+async def until_disconnect(receive: Receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def send_response(
+    send: Send,
+    status: int,
+    body: bytes,
+    content_type: str = 'application/json',
+    headers: Optional[Dict[str, str]] = None
+):
+    raw_headers = [
+        (b'content-type', content_type.encode()),
+        (b'content-length', str(len(body)).encode()),
+    ]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send: Send, status: int, data: dict, headers: Optional[Dict[str, str]] = None):
+    await send_response(send, status, json.dumps(data).encode(), headers=headers)
+
+
+def load_request(schema: Schema, body: bytes):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        # marshmallow ответит 'Invalid input type.'
+        data = None
+    with metrics.SCHEMA_LOAD.time():
+        return schema.load(data)
+
+
+def dump_response(schema: Schema, obj) -> dict:
+    with metrics.SCHEMA_DUMP.time():
+        return schema.dump(obj)
+
+
+async def run_service(
+    schema: Schema,
+    method: Callable,
+    receive: Receive,
+    send: Send
+):
+    """Допуск, разбор запроса и вызов асинхронного сервиса.
+    Запрос отменяется, если клиент отключился"""
+    retry_after = stages.admission()
+    if retry_after is not None:
+        ex = TooManyRequests(OverloadedException(retry_after))
+        await send_json(
+            send, 429, ServiceExceptionSchema().dump(ex),
+            headers={'Retry-After': str(retry_after)}
+        )
+        return
+    try:
+        data = load_request(schema, await read_body(receive))
+    except Disconnected:
+        return
+    except ValidationError as ex:
+        await send_json(send, 400, BadRequestSchema().dump(BadRequest(ex)))
+        return
+
+    task = asyncio.ensure_future(method(data))
+    watcher = asyncio.ensure_future(until_disconnect(receive))
+    try:
+        await asyncio.wait([task, watcher], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for future in (task, watcher):
+            future.cancel()
+        await asyncio.gather(task, watcher, return_exceptions=True)
+    if task.cancelled():
+        return
+    try:
+        data = task.result()
+    except ServiceException as ex:
+        await send_json(send, 500, ServiceExceptionSchema().dump(InternalServerError(ex)))
+    else:
+        await send_json(send, 200, dump_response(schema, data))
+
+
+async def lifespan(receive: Receive, send: Send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if config.WARMUP_ENABLED:
+                threading.Thread(target=build.keep_warming, daemon=True).start()
+            else:
+                build.ready.set()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope: dict, receive: Receive, send: Send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    route = (scope['method'], scope['path'])
+    if route == ('POST', '/debug/'):
+        await run_service(DebugSchema(), AsyncGoService.debug, receive, send)
+    elif route == ('POST', '/testing/'):
+        await run_service(TestsSchema(), AsyncGoService.testing, receive, send)
+    elif route == ('GET', '/ready/'):
+        if build.ready.is_set():
+            await send_json(send, 200, {'ready': True})
+        else:
+            await send_json(send, 503, {'ready': False})
+    elif route == ('GET', '/metrics'):
+        await send_response(send, 200, metrics.render(), content_type=CONTENT_TYPE_LATEST)
+    else:
+        await send_json(send, 404, {'error': 'Not found'})
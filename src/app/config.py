@@ -4,6 +4,77 @@ from tempfile import gettempdir
 
 
 TIMEOUT = 5  # seconds
+CPU_TIME_LIMIT = float(env.get('CPU_TIME_LIMIT', TIMEOUT))  # seconds
+WALL_TIME_LIMIT = float(env.get('WALL_TIME_LIMIT', TIMEOUT * 2))  # seconds
+MEMORY_LIMIT = int(env.get('MEMORY_LIMIT', 256 * 1024 * 1024))  # bytes, 0 — без лимита
+STDOUT_LIMIT = int(env.get('STDOUT_LIMIT', 16 * 1024 * 1024))  # bytes
+STDERR_LIMIT = int(env.get('STDERR_LIMIT', 1024 * 1024))  # bytes
+OUTPUT_KEEP = int(env.get('OUTPUT_KEEP', 4096))  # bytes
 SANDBOX_USER_UID = int(env.get('SANDBOX_USER_UID', os.getuid()))
 SANDBOX_USER_GID = int(env.get('SANDBOX_USER_GID', os.getgid()))
 SANDBOX_DIR = env.get('SANDBOX_DIR', gettempdir())
+
+ARTIFACT_CACHE_ENABLED = env.get('ARTIFACT_CACHE_ENABLED', '1') == '1'
+ARTIFACT_CACHE_DIR = env.get(
+    'ARTIFACT_CACHE_DIR',
+    os.path.join(SANDBOX_DIR, 'cache', 'artifacts')
+)
+ARTIFACT_CACHE_MAX_SIZE = int(env.get('ARTIFACT_CACHE_MAX_SIZE', 512 * 1024 * 1024))  # bytes
+ARTIFACT_CACHE_MAX_ENTRIES = int(env.get('ARTIFACT_CACHE_MAX_ENTRIES', 1000))
+
+EXECUTE_MEMFD = env.get('EXECUTE_MEMFD', '0') == '1'
+MEMFD_CACHE_SIZE = int(env.get('MEMFD_CACHE_SIZE', 32))
+
+COMPILE_ERROR_CACHE_SIZE = int(env.get('COMPILE_ERROR_CACHE_SIZE', 1024))
+COMPILE_ERROR_CACHE_TTL = int(env.get('COMPILE_ERROR_CACHE_TTL', 300))  # seconds
+
+COMPILE_WORKERS = int(env.get('COMPILE_WORKERS', os.cpu_count() or 1))
+COMPILE_QUEUE_SIZE = int(env.get('COMPILE_QUEUE_SIZE', 32))
+EXECUTE_CPUS = int(env.get('EXECUTE_CPUS', 0))  # ядер на запуск, 0 — без привязки
+EXECUTE_GOGC = env.get('EXECUTE_GOGC', '')
+CPU_SLOT_DIR = env.get('CPU_SLOT_DIR', os.path.join(SANDBOX_DIR, 'cache', 'cpus'))
+EXECUTE_WORKERS = int(env.get(
+    'EXECUTE_WORKERS',
+    max(1, (os.cpu_count() or 1) // EXECUTE_CPUS) if EXECUTE_CPUS > 0 else os.cpu_count() or 1
+))
+EXECUTE_QUEUE_SIZE = int(env.get('EXECUTE_QUEUE_SIZE', 128))
+
+CGROUP_ROOT = env.get('CGROUP_ROOT', '')  # делегированный каталог cgroup v2, '' — без cgroup
+CGROUP_CPU_QUOTA = float(env.get('CGROUP_CPU_QUOTA', 1))  # ядер на процесс
+COMPILE_MEMORY_LIMIT = int(env.get('COMPILE_MEMORY_LIMIT', 0))  # bytes, 0 — без лимита
+
+TEST_WORKERS = int(env.get('TEST_WORKERS', os.cpu_count() or 1))
+BATCH_WORKERS = int(env.get('BATCH_WORKERS', os.cpu_count() or 1))
+BATCH_MAX_ITEMS = int(env.get('BATCH_MAX_ITEMS', 1000))
+
+COMPILE_COALESCING = env.get('COMPILE_COALESCING', '1') == '1'
+COMPILE_FLIGHT_DIR = env.get(
+    'COMPILE_FLIGHT_DIR',
+    os.path.join(SANDBOX_DIR, 'cache', 'flights')
+)
+COMPILE_FLIGHT_TTL = 600  # seconds
+
+CHECKER_CACHE_SIZE = int(env.get('CHECKER_CACHE_SIZE', 256))
+
+GOCACHE_DIR = env.get('GOCACHE_DIR', os.path.join(SANDBOX_DIR, 'cache', 'go-build'))
+GOCACHE_MAX_SIZE = int(env.get('GOCACHE_MAX_SIZE', 1024 * 1024 * 1024))  # bytes
+GOCACHE_TRIM_INTERVAL = int(env.get('GOCACHE_TRIM_INTERVAL', 3600))  # seconds
+BUILD_BACKEND = env.get('BUILD_BACKEND', 'go')  # go | direct
+BUILD_DIRECT_PACKAGES = env.get('BUILD_DIRECT_PACKAGES', 'std')
+WARMUP_ENABLED = env.get('WARMUP_ENABLED', '1') == '1'
+WARMUP_TIMEOUT = 120  # seconds
+WARMUP_RETRY_INTERVAL = int(env.get('WARMUP_RETRY_INTERVAL', 30))  # seconds
+LAUNCHER_DIR = env.get('LAUNCHER_DIR', os.path.join(SANDBOX_DIR, 'cache', 'launcher'))
+
+JOB_BACKEND = env.get('JOB_BACKEND', 'app.service.jobs.LocalJobBackend')
+JOB_WORKERS = int(env.get('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(env.get('JOB_QUEUE_SIZE', 100))
+JOB_TTL = int(env.get('JOB_TTL', 600))  # seconds
+
+WORKSPACE_DIR = env.get('WORKSPACE_DIR', os.path.join(SANDBOX_DIR, 'workspaces'))
+WORKSPACE_POOL_SIZE = int(env.get('WORKSPACE_POOL_SIZE', (os.cpu_count() or 1) * 2))
+
+TEST_SET_DIR = env.get('TEST_SET_DIR', os.path.join(SANDBOX_DIR, 'test-sets'))
+
+RUNNER_SOCKET = env.get('RUNNER_SOCKET', '')
+RUNNER_TIMEOUT_GRACE = 5  # seconds
@@ -1,5 +1,16 @@
-from typing import Optional, List
-from dataclasses import dataclass
+from typing import Optional, List, Dict
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Usage:
+    """Ресурсы, потраченные процессом (по данным wait4 или cgroup)"""
+
+    wall_time: float  # seconds
+    user_time: float  # seconds
+    system_time: float  # seconds
+    max_rss: Optional[int]  # kilobytes, только из cgroup (memory.peak)
+    exit_code: int
 
 
 @dataclass
@@ -9,6 +20,8 @@ class DebugData:
     code: Optional[str] = None
     result: Optional[str] = None
     error: Optional[str] = None
+    usage: Optional[Usage] = None
+    compile_usage: Optional[Usage] = None
 
 
 @dataclass
@@ -21,6 +34,20 @@ class TestData:
     result: Optional[str] = None
     error: Optional[str] = None
     ok: Optional[bool] = None
+    skipped: Optional[bool] = None
+    usage: Optional[Usage] = None
+    # тесты сохранённого набора: данные лежат в файлах
+    data_in_path: Optional[str] = None
+    data_out_path: Optional[str] = None
+
+
+@dataclass
+class TestSet:
+
+    __test__ = False
+
+    tests: List[TestData]
+    id: Optional[str] = None
 
 
 @dataclass
@@ -28,9 +55,51 @@ class TestsData:
 
     __test__ = False
 
+    ORDER_GIVEN = 'given'
+    ORDER_COST = 'cost'
+
     tests: List[TestData]
     num: int = 0
     num_ok: int = 0
     ok: Optional[bool] = None
     code: Optional[str] = None
     checker: Optional[str] = None
+    error: Optional[str] = None
+    fail_fast: bool = False
+    order: str = ORDER_GIVEN
+    compile_usage: Optional[Usage] = None
+    # встроенный checker вместо checker-функции
+    checker_name: Optional[str] = None
+    abs_eps: float = 1e-6
+    rel_eps: float = 1e-6
+
+
+@dataclass
+class BatchData:
+
+    items: List[TestsData]
+    errors: Dict[int, Exception] = field(default_factory=dict)
+
+
+@dataclass
+class Job:
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id: str
+    data: TestsData
+    status: str = QUEUED
+    error: Optional[Exception] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def done_tests(self) -> List[TestData]:
+        """Уже проверенные тесты"""
+        return [t for t in self.data.tests if t.ok is not None]
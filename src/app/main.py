@@ -1,30 +1,130 @@
+import json
+import threading
+from itertools import chain
+from typing import Optional
 from flask import (
     Flask,
+    Response,
     request,
     render_template,
-    abort
+    abort,
+    stream_with_context
 )
-from marshmallow import ValidationError
+from marshmallow import Schema, ValidationError
+from prometheus_client import CONTENT_TYPE_LATEST
 
+from app import config
+from app.service import build, messages, metrics, stages
+from app.service.jobs import create_backend
 from app.service.main import GoService
+from app.entities import TestsData, TestSet
+from app.service.test_sets import test_sets
 
 from app.schema import (
     DebugSchema,
     TestsSchema,
+    TestStreamSchema,
+    TestSetSchema,
+    BatchSchema,
+    JobSchema,
     BadRequestSchema,
     ServiceExceptionSchema,
 )
-from app.service.exceptions import ServiceException
+from app.service.exceptions import (
+    ServiceException,
+    QueueFullException,
+    OverloadedException,
+)
+
+
+STREAM_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+
+def load_request(schema: Schema):
+    with metrics.SCHEMA_LOAD.time():
+        return schema.load(request.get_json())
+
+
+def dump_response(schema: Schema, obj) -> dict:
+    with metrics.SCHEMA_DUMP.time():
+        return schema.dump(obj)
+
+
+def admit():
+    """Допуск запроса: 429 с Retry-After, пока очередь
+    компиляции или запуска заполнена"""
+    retry_after = stages.admission()
+    if retry_after is not None:
+        abort(429, OverloadedException(retry_after))
+
+
+def get_stream_format() -> Optional[str]:
+    """Потоковый режим /testing/: ?stream=ndjson|sse или заголовок Accept"""
+    stream_format = request.args.get('stream')
+    if stream_format in STREAM_MIMETYPES:
+        return stream_format
+    for stream_format, mimetype in STREAM_MIMETYPES.items():
+        if request.accept_mimetypes.best == mimetype:
+            return stream_format
+    return None
+
+
+def stream_testing(data: TestsData, stream_format: str) -> Response:
+    """Отдаёт результат компиляции, затем каждый тест по мере проверки
+    и итоговую сводку. Ошибки до первого теста (компиляция, checker)
+    пробрасываются как обычно, более поздние становятся событием error."""
+    schema = TestStreamSchema()
+    tests = GoService.iter_testing(data)
+    first = next(tests, None)
+
+    def encode(event: dict) -> str:
+        if stream_format == 'sse':
+            return f'event: {event["event"]}\ndata: {json.dumps(event)}\n\n'
+        return json.dumps(event) + '\n'
+
+    def generate():
+        num, num_ok = 0, 0
+        yield encode(schema.dump_compile(data))
+        try:
+            for index, test in chain([first] if first else [], tests):
+                num += 1
+                num_ok += bool(test.ok)
+                yield encode(schema.dump_test(index, test))
+        except ServiceException as ex:
+            yield encode(schema.dump_error(ex))
+        else:
+            yield encode(schema.dump_summary(num, num_ok))
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=STREAM_MIMETYPES[stream_format]
+    )
 
 
 def create_app():
 
     app = Flask(__name__)
+    if config.WARMUP_ENABLED:
+        threading.Thread(target=build.keep_warming, daemon=True).start()
+    else:
+        build.ready.set()
+    jobs = create_backend()
 
     @app.errorhandler(400)
     def bad_request_handler(ex: ValidationError):
         return BadRequestSchema().dump(ex), 400
 
+    @app.errorhandler(429)
+    def too_many_requests_handler(ex: ServiceException):
+        headers = {}
+        retry_after = getattr(ex.description, 'retry_after', None)
+        if retry_after is not None:
+            headers['Retry-After'] = str(retry_after)
+        return ServiceExceptionSchema().dump(ex), 429, headers
+
     @app.errorhandler(500)
     def bad_request_handler(ex: ServiceException):
         return ServiceExceptionSchema().dump(ex), 500
@@ -33,33 +133,94 @@ def create_app():
     def index():
         return render_template("index.html")
 
+    @app.route('/ready/', methods=['get'])
+    def ready():
+        if build.ready.is_set():
+            return {'ready': True}
+        return {'ready': False}, 503
+
     @app.route('/debug/', methods=['post'])
     def debug():
+        admit()
         schema = DebugSchema()
         try:
-            data = GoService.debug(
-                schema.load(request.get_json())
-            )
+            data = GoService.debug(load_request(schema))
         except ValidationError as ex:
             abort(400, ex)
         except ServiceException as ex:
             abort(500, ex)
         else:
-            return schema.dump(data)
+            return dump_response(schema, data)
 
     @app.route('/testing/', methods=['post'])
     def testing():
+        admit()
         schema = TestsSchema()
+        stream_format = get_stream_format()
         try:
-            data = GoService.testing(
-                schema.load(request.get_json())
-            )
+            data = load_request(schema)
+            if stream_format:
+                return stream_testing(data, stream_format)
+            data = GoService.testing(data)
         except ValidationError as ex:
             abort(400, ex)
         except ServiceException as ex:
             abort(500, ex)
         else:
-            return schema.dump(data)
+            return dump_response(schema, data)
+
+    @app.route('/test-sets/', methods=['post'])
+    def create_test_set():
+        schema = TestSetSchema()
+        try:
+            data = load_request(schema)
+            data.id = test_sets.put(data.tests)
+        except ValidationError as ex:
+            abort(400, ex)
+        else:
+            return dump_response(schema, data), 201
+
+    @app.route('/test-sets/<test_set_id>', methods=['get'])
+    def get_test_set(test_set_id: str):
+        tests = test_sets.get(test_set_id)
+        if tests is None:
+            return {'error': messages.MSG_13}, 404
+        return dump_response(TestSetSchema(), TestSet(id=test_set_id, tests=tests))
+
+    @app.route('/batch/', methods=['post'])
+    def batch():
+        admit()
+        schema = BatchSchema()
+        try:
+            data = GoService.batch(load_request(schema))
+        except ValidationError as ex:
+            abort(400, ex)
+        except ServiceException as ex:
+            abort(500, ex)
+        else:
+            return dump_response(schema, data)
+
+    @app.route('/jobs/', methods=['post'])
+    def create_job():
+        try:
+            job = jobs.submit(load_request(TestsSchema()))
+        except ValidationError as ex:
+            abort(400, ex)
+        except QueueFullException as ex:
+            abort(429, ex)
+        else:
+            return dump_response(JobSchema(), job), 202
+
+    @app.route('/jobs/<job_id>', methods=['get'])
+    def get_job(job_id: str):
+        job = jobs.get(job_id)
+        if job is None:
+            return {'error': messages.MSG_10}, 404
+        return dump_response(JobSchema(), job)
+
+    @app.route('/metrics', methods=['get'])
+    def metrics_view():
+        return Response(metrics.render(), content_type=CONTENT_TYPE_LATEST)
     return app
 
 app = create_app()
\ No newline at end of file
@@ -1,26 +1,55 @@
-from typing import Optional
+from dataclasses import replace
+from typing import Dict, List, Optional
 from marshmallow import Schema, ValidationError
-from marshmallow import INCLUDE
+from marshmallow import EXCLUDE
 from marshmallow.fields import (
     Nested,
     Field,
     Boolean,
+    Float,
     Integer,
-    Method
+    Method,
+    String
 )
+from marshmallow.validate import OneOf
 from marshmallow.decorators import (
     post_load,
-    pre_dump
+    pre_dump,
+    validates,
+    validates_schema
 )
+from app import config
 from app.entities import (
     DebugData,
     TestData,
-    TestsData
+    TestsData,
+    BatchData,
+    Job,
+    TestSet
 )
 from app.utils import clean_str
+from app.service.test_sets import test_sets
+from app.service.checkers import BUILTIN_CHECKERS
 from app.service.exceptions import ServiceException
 
 
+def _either(data: dict, name: str, alternative: str, required: bool = True) -> Dict[str, List[str]]:
+    """Ошибки пары взаимоисключающих полей: передано оба
+    или (при required) ни одного"""
+    if name in data and alternative in data:
+        return {alternative: [f'Specify either {name} or {alternative}.']}
+    if required and name not in data and alternative not in data:
+        return {name: ['Missing data for required field.']}
+    return {}
+
+
+def _test_set(test_set_id: str) -> List[TestData]:
+    tests = test_sets.get(test_set_id)
+    if tests is None:
+        raise ValidationError('Unknown test set.', 'test_set_id')
+    return tests
+
+
 class StrField(Field):
 
     def _deserialize(self, value: Optional[str], *args, **kwargs):
@@ -30,6 +59,15 @@ class StrField(Field):
         return clean_str(value)
 
 
+class UsageSchema(Schema):
+
+    wall_time = Float()
+    user_time = Float()
+    system_time = Float()
+    max_rss = Integer()
+    exit_code = Integer()
+
+
 class DebugSchema(Schema):
 
     data_in = StrField(
@@ -40,6 +78,8 @@ class DebugSchema(Schema):
     code = StrField(required=True, load_only=True)
     result = StrField(dump_only=True)
     error = StrField(dump_only=True)
+    usage = Nested(UsageSchema, dump_only=True)
+    compile_usage = Nested(UsageSchema, dump_only=True)
 
     @post_load
     def make_debug_data(self, data, **kwargs) -> DebugData:
@@ -48,30 +88,72 @@ class DebugSchema(Schema):
 
 class TestSchema(Schema):
     class Meta:
-        unknown = INCLUDE
+        # data_in_path/data_out_path задаёт только хранилище наборов тестов
+        unknown = EXCLUDE
 
     data_in = StrField(load_only=True)
     data_out = StrField(required=True, load_only=True)
     result = StrField(dump_only=True)
     error = StrField(dump_only=True)
     ok = Boolean(dump_only=True)
+    skipped = Boolean(dump_only=True)
+    usage = Nested(UsageSchema, dump_only=True)
 
     @post_load
     def make_test_data(self, data, **kwargs) -> TestData:
         return TestData(**data)
 
 
+class TestSetSchema(Schema):
+
+    id = String(dump_only=True)
+    tests = Nested(TestSchema, many=True, required=True, load_only=True)
+    num = Method('dump_num')
+
+    def dump_num(self, obj: TestSet):
+        return len(obj.tests)
+
+    @post_load
+    def make_test_set(self, data, **kwargs) -> TestSet:
+        return TestSet(**data)
+
+
 class TestsSchema(Schema):
 
-    tests = Nested(TestSchema, many=True, required=True)
-    checker = StrField(load_only=True, required=True)
+    tests = Nested(TestSchema, many=True)
+    test_set_id = String(load_only=True)
+    checker = StrField(load_only=True)
+    checker_name = String(load_only=True, validate=OneOf(tuple(BUILTIN_CHECKERS)))
+    abs_eps = Float(load_only=True)
+    rel_eps = Float(load_only=True)
     code = StrField(load_only=True, required=True)
+    fail_fast = Boolean(load_only=True)
+    order = String(
+        load_only=True,
+        validate=OneOf((TestsData.ORDER_GIVEN, TestsData.ORDER_COST))
+    )
     num = Integer(dump_only=True)
     num_ok = Integer(dump_only=True)
     ok = Boolean(dump_only=True)
+    compile_usage = Nested(UsageSchema, dump_only=True)
+
+    @validates_schema
+    def validate_tests(self, data, **kwargs):
+        errors = _either(data, 'tests', 'test_set_id')
+        if errors:
+            raise ValidationError(errors)
+
+    @validates_schema
+    def validate_checker(self, data, **kwargs):
+        errors = _either(data, 'checker', 'checker_name')
+        if errors:
+            raise ValidationError(errors)
 
     @post_load
     def make_tests_data(self, data, **kwargs) -> TestsData:
+        test_set_id = data.pop('test_set_id', None)
+        if test_set_id is not None:
+            data['tests'] = _test_set(test_set_id)
         return TestsData(**data)
 
     @pre_dump
@@ -83,6 +165,157 @@ class TestsSchema(Schema):
         return data
 
 
+class BatchItemSchema(Schema):
+
+    code = StrField(required=True)
+    checker = StrField()
+    checker_name = String(validate=OneOf(tuple(BUILTIN_CHECKERS)))
+    abs_eps = Float()
+    rel_eps = Float()
+    tests = Nested(TestSchema, many=True)
+    test_set_id = String()
+    fail_fast = Boolean()
+    order = String(
+        validate=OneOf((TestsData.ORDER_GIVEN, TestsData.ORDER_COST))
+    )
+
+
+class BatchSchema(Schema):
+
+    PAIRS = (('tests', 'test_set_id'), ('checker', 'checker_name'))
+
+    items = Nested(BatchItemSchema, many=True, required=True, load_only=True)
+    checker = StrField(load_only=True)
+    checker_name = String(load_only=True, validate=OneOf(tuple(BUILTIN_CHECKERS)))
+    abs_eps = Float(load_only=True)
+    rel_eps = Float(load_only=True)
+    tests = Nested(TestSchema, many=True, load_only=True)
+    test_set_id = String(load_only=True)
+    results = Method('dump_results', data_key='items')
+
+    @validates('items')
+    def validate_items(self, value, **kwargs):
+        if len(value) > config.BATCH_MAX_ITEMS:
+            raise ValidationError(
+                f'Batch can contain at most {config.BATCH_MAX_ITEMS} items.'
+            )
+
+    @validates_schema
+    def validate_shared_fields(self, data, **kwargs):
+        errors = {}
+        for name, alternative in self.PAIRS:
+            errors.update(_either(data, name, alternative, required=False))
+        for index, item in enumerate(data.get('items', [])):
+            for name, alternative in self.PAIRS:
+                shared = name in data or alternative in data
+                item_errors = _either(item, name, alternative, required=not shared)
+                if item_errors:
+                    errors.setdefault('items', {}).setdefault(index, {}).update(item_errors)
+        if errors:
+            raise ValidationError(errors)
+
+    @post_load
+    def make_batch_data(self, data, **kwargs) -> BatchData:
+        # каждый набор тестов читается один раз на пакет
+        resolved = {}
+        shared_tests = self._tests(data, resolved)
+        shared_checker = {
+            name: data[name] for name in ('checker', 'checker_name') if name in data
+        }
+        shared_eps = {
+            name: data[name] for name in ('abs_eps', 'rel_eps') if name in data
+        }
+        items = []
+        for index, item in enumerate(data['items']):
+            try:
+                tests = self._tests(item, resolved)
+            except ValidationError as ex:
+                raise ValidationError({'items': {index: ex.normalized_messages()}})
+            if 'checker' not in item and 'checker_name' not in item:
+                item.update(shared_checker)
+            for name, value in shared_eps.items():
+                item.setdefault(name, value)
+            items.append(TestsData(
+                tests=[replace(test) for test in tests or shared_tests],
+                **item
+            ))
+        return BatchData(items=items)
+
+    @staticmethod
+    def _tests(data: dict, resolved: Dict[str, List[TestData]]) -> Optional[List[TestData]]:
+        """Тесты из tests или из набора test_set_id, None без них"""
+        test_set_id = data.pop('test_set_id', None)
+        if test_set_id is None:
+            return data.pop('tests', None)
+        if test_set_id not in resolved:
+            resolved[test_set_id] = _test_set(test_set_id)
+        return resolved[test_set_id]
+
+    def dump_results(self, obj: BatchData):
+        results = []
+        for index, item in enumerate(obj.items):
+            error = obj.errors.get(index)
+            result = TestsSchema().dump(item)
+            result['error'] = getattr(error, 'message', None)
+            result['details'] = getattr(error, 'details', None)
+            results.append(result)
+        return results
+
+
+class TestStreamSchema:
+    """События потокового ответа /testing/"""
+
+    def dump_compile(self, data: TestsData) -> dict:
+        return {
+            'event': 'compile',
+            'error': data.error,
+            'usage': UsageSchema().dump(data.compile_usage)
+            if data.compile_usage else None
+        }
+
+    def dump_test(self, index: int, test: TestData) -> dict:
+        return {'event': 'test', 'index': index, **TestSchema().dump(test)}
+
+    def dump_summary(self, num: int, num_ok: int) -> dict:
+        return {
+            'event': 'summary',
+            'num': num,
+            'num_ok': num_ok,
+            'ok': num == num_ok
+        }
+
+    def dump_error(self, ex: ServiceException) -> dict:
+        return {'event': 'error', 'error': ex.message, 'details': ex.details}
+
+
+class JobSchema(Schema):
+
+    id = String(dump_only=True)
+    status = String(dump_only=True)
+    done = Method('dump_done')
+    total = Method('dump_total')
+    result = Method('dump_result')
+    error = Method('dump_error')
+    details = Method('dump_details')
+
+    def dump_done(self, obj: Job):
+        return len(obj.done_tests)
+
+    def dump_total(self, obj: Job):
+        return len(obj.data.tests)
+
+    def dump_result(self, obj: Job):
+        if obj.status == Job.QUEUED:
+            return None
+        return TestsSchema().dump(TestsData(tests=obj.done_tests))
+
+    def dump_error(self, obj: Job):
+        return getattr(obj.error, 'message', None)
+
+    def dump_details(self, obj: Job):
+        return getattr(obj.error, 'details', None)
+
+
 class BadRequestSchema(Schema):
 
     error = Method('dump_error')
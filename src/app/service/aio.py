@@ -0,0 +1,316 @@
+import asyncio
+import functools
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from app import config
+from app.entities import DebugData, TestsData
+from app.service import build, exceptions, metrics, process, stages
+from app.service.cache import artifacts, compile_errors
+from app.service.cgroups import Leaf, cgroups
+from app.service.cpus import CpuSet, cpu_slots, go_env, run_env
+from app.service.entities import ExecuteResult, GoFile
+from app.service.main import GoService
+from app.service.process import RunResult
+
+T = TypeVar('T')
+
+
+class AsyncGoService:
+    """Асинхронный движок: компиляция и запуски — задачи одного
+    event loop, поток на каждую программу не нужен.
+
+    Процессы запускаются так же, как в GoService (posix_spawn,
+    с ограничениями — через sandbox-launch), а их ввод-вывод и завершение обслуживает event loop
+    (process.communicate_async). Пределы одновременных компиляций
+    и запусков — те же этапы stages. При отмене задачи (например,
+    клиент отключился) программа убивается. Одновременные сборки одного
+    исходника объединяются внутри процесса, без файловых блокировок.
+    Шаги сборки, разбор результатов, кеши и checker-функции общие
+    с GoService. Всё, что блокирует (posix_spawn, слоты ядер и cgroup
+    с их mkdir, flock и ожиданием kill, файлы, checker-функции), идёт
+    в пуле потоков, event loop только ждёт ввод-вывод программ."""
+
+    _compiling: Dict[str, 'asyncio.Future[Optional[str]]'] = {}
+
+    @staticmethod
+    async def _in_thread(func: Callable[..., T], *args) -> T:
+        """Блокирующая работа (файлы, кеши, checker-функции) —
+        в пуле потоков, чтобы не останавливать event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    @staticmethod
+    async def _in_thread_finished(func: Callable[..., T], *args) -> T:
+        """Как _in_thread, но при отмене задачи дожидается func:
+        её результат (процесс, слот ядер, cgroup) нельзя бросить.
+        Отмена повторяется на следующем await вызывающего"""
+        future = asyncio.get_running_loop().run_in_executor(None, func, *args)
+        cancelled = False
+        try:
+            while True:
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        raise
+                    cancelled = True
+        finally:
+            if cancelled:
+                asyncio.current_task().cancel()
+
+    @classmethod
+    @asynccontextmanager
+    async def _context_in_thread(cls, context: ContextManager[T]):
+        """Вход в синхронный контекст и выход из него — в пуле потоков"""
+        value = await cls._in_thread_finished(context.__enter__)
+        try:
+            yield value
+        except BaseException as ex:
+            if not await cls._in_thread_finished(context.__exit__, type(ex), ex, ex.__traceback__):
+                raise
+        else:
+            await cls._in_thread_finished(context.__exit__, None, None, None)
+
+    @classmethod
+    async def _run(
+        cls,
+        args: List[str],
+        timeout: float,
+        env: Optional[Dict[str, str]] = None,
+        launch: Optional[process.Launch] = None,
+        data_in: Optional[bytes] = None,
+        stdin: Optional[int] = None,
+        pass_fds: Tuple[int, ...] = (),
+        stdout_limit: Optional[int] = None,
+        stderr_limit: Optional[int] = None
+    ) -> RunResult:
+        pid, *fds = await cls._in_thread_finished(functools.partial(
+            process.spawn,
+            args=args,
+            env=env,
+            launch=launch,
+            stdin=stdin,
+            pass_fds=pass_fds
+        ))
+        return await process.communicate_async(
+            pid,
+            *fds,
+            data_in=data_in,
+            timeout=timeout,
+            stdout_limit=stdout_limit,
+            stderr_limit=stderr_limit
+        )
+
+    @classmethod
+    async def _leaf_result(cls, leaf: Optional[Leaf], run_result: RunResult) -> RunResult:
+        if leaf is None:
+            return run_result
+        return await cls._in_thread_finished(leaf.result, run_result)
+
+    @classmethod
+    async def _run_build(cls, args: List[str], timeout: float) -> RunResult:
+        async with cls._context_in_thread(GoService._build_context()) as (leaf, launch):
+            run_result = await cls._run(
+                args,
+                timeout=timeout,
+                env=build.build_env(),
+                launch=launch
+            )
+            return await cls._leaf_result(leaf, run_result)
+
+    @classmethod
+    async def _build(cls, file: GoFile) -> RunResult:
+        """Собирает бинарник по шагам GoService._build_steps"""
+        steps = GoService._build_steps(file)
+        # первый шаг может прочитать importcfg прямой сборки
+        args, timeout = await cls._in_thread(next, steps)
+        while True:
+            run_result = await cls._run_build(args, timeout=timeout)
+            try:
+                args, timeout = steps.send(run_result)
+            except StopIteration as stop:
+                return stop.value
+
+    @classmethod
+    async def _compile_file(cls, file: GoFile, key: str) -> Optional[str]:
+        """Собирает бинарник и кладёт его в кеш"""
+        try:
+            await cls._in_thread(file.write_source)
+            async with stages.COMPILE.async_slot():
+                run_result = await cls._build(file)
+            error = await cls._in_thread(GoService._compiled, file, key, run_result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            raise exceptions.CompileException(details=str(ex))
+        await cls._in_thread(build.maybe_trim)
+        return error
+
+    @classmethod
+    async def _compile(cls, file: GoFile) -> Optional[str]:
+        """Компилирует Go-программу"""
+        # декоратор prometheus_client не ждёт корутину
+        with metrics.COMPILE.time():
+            return await cls._compile_now(file)
+
+    @classmethod
+    async def _compile_now(cls, file: GoFile) -> Optional[str]:
+        settings = GoService._build_settings()
+        key = artifacts.key(file.code, *settings)
+        if await cls._in_thread(GoService._use_cached, file, key):
+            return None
+
+        flight = cls._compiling.get(key)
+        if flight is not None and GoService._coalescing():
+            # отмена ждущего запроса не отменяет чужую сборку
+            await asyncio.wait([flight])
+            if not flight.cancelled():
+                error = flight.result()
+                if error is not None or await cls._in_thread(GoService._use_cached, file, key):
+                    metrics.COMPILES_COALESCED.inc()
+                    return error
+
+        flight = asyncio.get_running_loop().create_future()
+        cls._compiling[key] = flight
+        try:
+            error = await cls._compile_file(file, key)
+        except BaseException:
+            # ждущие запросы соберут сами
+            flight.cancel()
+            raise
+        else:
+            flight.set_result(error)
+        finally:
+            if cls._compiling.get(key) is flight:
+                del cls._compiling[key]
+        if error and file.compile_diagnostics:
+            await cls._in_thread(compile_errors.put, key, settings[0], error)
+        elif not error:
+            await cls._in_thread(GoService._load_image, file, key)
+        return error
+
+    @classmethod
+    async def _execute(
+        cls,
+        file: GoFile,
+        data_in: Optional[str] = None,
+        data_in_path: Optional[str] = None
+    ) -> ExecuteResult:
+        """Запускает скомпилированный Go-бинарник"""
+        with metrics.EXECUTE.time():
+            return await cls._execute_now(file, data_in, data_in_path)
+
+    @classmethod
+    async def _execute_now(
+        cls,
+        file: GoFile,
+        data_in: Optional[str] = None,
+        data_in_path: Optional[str] = None
+    ) -> ExecuteResult:
+        try:
+            async with stages.EXECUTE.async_slot():
+                context = cls._execute_context(data_in_path)
+                async with cls._context_in_thread(context) as (stdin, cpus, leaf, launch):
+                    run_result = await cls._run(
+                        [file.executable],
+                        timeout=config.WALL_TIME_LIMIT,
+                        env=run_env(go_env(cpus)),
+                        launch=launch,
+                        pass_fds=GoService._pass_fds(file),
+                        data_in=data_in.encode() if data_in is not None else None,
+                        stdin=stdin,
+                        stdout_limit=config.STDOUT_LIMIT,
+                        stderr_limit=config.STDERR_LIMIT
+                    )
+                    run_result = await cls._leaf_result(leaf, run_result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            raise exceptions.ExecutionException(details=str(ex))
+        return GoService._execute_result(run_result)
+
+    @classmethod
+    @contextmanager
+    def _execute_context(
+        cls,
+        data_in_path: Optional[str]
+    ) -> Iterator[Tuple[Optional[int], Optional[CpuSet], Optional[Leaf], Optional[process.Launch]]]:
+        """Ввод, слот ядер, cgroup и ограничения запуска одним контекстом:
+        вход в него и выход — по одному переходу в пул потоков"""
+        with GoService._stdin(data_in_path) as stdin, cpu_slots.slot() as cpus, \
+                cgroups.leaf('execute', cpus) as leaf, GoService._execute_launch(cpus, leaf) as launch:
+            yield stdin, cpus, leaf, launch
+
+    @classmethod
+    async def debug(cls, data: DebugData) -> DebugData:
+        """Компиляция и отладочный запуск"""
+        data.error = await cls._in_thread(GoService._cached_error, data.code)
+        if data.error:
+            return data
+        file = GoFile(data.code)
+        try:
+            error = await cls._compile(file)
+            if error:
+                data.error = error
+            else:
+                exec_result = await cls._execute(file=file, data_in=data.data_in)
+                data.result = exec_result.result
+                data.error = exec_result.error
+                data.usage = exec_result.usage
+            data.compile_usage = file.compile_usage
+        finally:
+            await cls._in_thread(file.remove)
+        return data
+
+    @classmethod
+    async def _run_tests(cls, file: GoFile, data: TestsData):
+        """Запускает все тесты сразу (их число ограничивает только
+        EXECUTE_WORKERS) и проверяет результаты по порядку"""
+        checker = await cls._in_thread(GoService._checker, data)
+        # оценка стоимости тестов читает размеры файлов ввода
+        order = await cls._in_thread(GoService._schedule, data)
+        tasks = [
+            asyncio.ensure_future(cls._execute(
+                file=file,
+                data_in=data.tests[index].data_in,
+                data_in_path=data.tests[index].data_in_path
+            ))
+            for index in order
+        ]
+        done = 0
+        try:
+            for index, task in zip(order, tasks):
+                test = data.tests[index]
+                exec_result = await task
+                await cls._in_thread(GoService._record, data, test, exec_result, checker)
+                done += 1
+                if GoService._stop(data, test):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for index in order[done:]:
+            GoService._skip(data.tests[index])
+
+    @classmethod
+    async def testing(cls, data: TestsData) -> TestsData:
+        """Компиляция и тестовый запуск"""
+        error = await cls._in_thread(GoService._cached_error, data.code)
+        file = None
+        try:
+            if not error:
+                file = GoFile(data.code)
+                error = await cls._compile(file)
+                data.compile_usage = file.compile_usage
+            data.error = error
+            if error:
+                for test in data.tests:
+                    test.error = error
+                    test.ok = False
+            else:
+                await cls._run_tests(file, data)
+        finally:
+            if file is not None:
+                await cls._in_thread(file.remove)
+        return data
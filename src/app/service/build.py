@@ -0,0 +1,319 @@
+import os
+import re
+import time
+import fcntl
+import logging
+import hashlib
+import shutil
+import tempfile
+import threading
+import subprocess
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Dict, Optional, Set
+
+from app import config
+from app.service import launcher
+from app.service.cache import toolchain_version
+
+WARMUP_PROGRAMS = (
+    (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    var s string\n'
+        '    fmt.Scan(&s)\n'
+        '    fmt.Println(s)\n'
+        '}'
+    ),
+    (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "bufio"\n'
+        '    "fmt"\n'
+        '    "math"\n'
+        '    "os"\n'
+        '    "sort"\n'
+        '    "strconv"\n'
+        '    "strings"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    reader := bufio.NewReader(os.Stdin)\n'
+        '    line, _ := reader.ReadString(\'\\n\')\n'
+        '    fields := strings.Fields(line)\n'
+        '    sort.Strings(fields)\n'
+        '    n, _ := strconv.Atoi(fields[0])\n'
+        '    fmt.Println(math.Sqrt(float64(n)))\n'
+        '}'
+    ),
+    (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    _ "bytes"\n'
+        '    _ "container/heap"\n'
+        '    _ "container/list"\n'
+        '    _ "errors"\n'
+        '    _ "math/big"\n'
+        '    _ "math/rand"\n'
+        '    _ "regexp"\n'
+        '    _ "time"\n'
+        '    _ "unicode"\n'
+        '    _ "unicode/utf8"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '}'
+    ),
+)
+
+logger = logging.getLogger(__name__)
+
+ready = threading.Event()
+
+Toolchain = namedtuple('Toolchain', ('compile', 'link', 'importcfg', 'packages'))
+
+_IMPORT = re.compile(r'^\s*import\s*(\([^)]*\)|[^\n]*)', re.M)
+_IMPORT_PATH = re.compile(r'"([^"\\\n]*)"|`([^`]*)`')
+_toolchains: Dict[str, Optional[Toolchain]] = {}
+_toolchains_lock = threading.Lock()
+
+
+def build_env() -> Dict[str, str]:
+    """Окружение для go build с управляемым GOCACHE"""
+    return dict(os.environ, GOCACHE=config.GOCACHE_DIR)
+
+
+@contextmanager
+def _locked(name: str, blocking: bool = True):
+    """flock на служебном файле в GOCACHE, общий для всех воркеров.
+    Без blocking отдаёт False, если блокировка уже занята."""
+    os.makedirs(config.GOCACHE_DIR, exist_ok=True)
+    with open(os.path.join(config.GOCACHE_DIR, name), 'a') as f:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _importcfg_path() -> str:
+    packages = ' '.join(config.BUILD_DIRECT_PACKAGES.split())
+    digest = hashlib.sha256(packages.encode()).hexdigest()[:16]
+    return os.path.join(
+        config.GOCACHE_DIR,
+        f'.sandbox-importcfg-{toolchain_version()}-{digest}'
+    )
+
+
+def _read_importcfg(path: str) -> Dict[str, str]:
+    exports = {}
+    with open(path) as f:
+        for line in f:
+            package, _, export = line.strip().partition(' ')[2].partition('=')
+            if package and export:
+                exports[package] = export
+    return exports
+
+
+def _write_importcfg(path: str):
+    output = subprocess.run(
+        args=[
+            'go', 'list', '-export', '-deps',
+            '-f', '{{if .Export}}packagefile {{.ImportPath}}={{.Export}}{{end}}',
+            *config.BUILD_DIRECT_PACKAGES.split()
+        ],
+        env=build_env(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        timeout=config.WARMUP_TIMEOUT,
+        check=True
+    ).stdout
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(output)
+    os.replace(tmp_path, path)
+
+
+def toolchain() -> Optional[Toolchain]:
+    """Инструменты и importcfg стандартной библиотеки для прямой сборки
+    (BUILD_BACKEND=direct). importcfg строится один раз на версию
+    тулчейна через go list -export и лежит в GOCACHE. None, если
+    получить их не удалось — тогда собирает go build."""
+    path = _importcfg_path()
+    with _toolchains_lock:
+        if path in _toolchains:
+            return _toolchains[path]
+        try:
+            tooldir = subprocess.run(
+                args=['go', 'env', 'GOTOOLDIR'],
+                env=build_env(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                check=True
+            ).stdout.strip()
+            with _locked('.sandbox-importcfg'):
+                exports = {}
+                if os.path.exists(path):
+                    exports = _read_importcfg(path)
+                if not exports or not all(map(os.path.exists, exports.values())):
+                    _write_importcfg(path)
+                    exports = _read_importcfg(path)
+            result = Toolchain(
+                compile=os.path.join(tooldir, 'compile'),
+                link=os.path.join(tooldir, 'link'),
+                importcfg=path,
+                packages=frozenset(exports)
+            )
+        except (OSError, subprocess.SubprocessError):
+            result = None
+        _toolchains[path] = result
+        return result
+
+
+def imports(code: str) -> Set[str]:
+    """Пути импортов Go-файла"""
+    paths = set()
+    for declaration in _IMPORT.findall(code):
+        for quoted, raw in _IMPORT_PATH.findall(declaration):
+            paths.add(quoted or raw)
+    return paths
+
+
+def direct_supported(code: str, tools: Toolchain) -> bool:
+    """Можно ли собрать программу без go build: импортируется только
+    то, что есть в importcfg, нет cgo и //go:embed"""
+    if '//go:embed' in code:
+        return False
+    return imports(code) <= tools.packages
+
+
+def _importcfg_exports() -> Set[str]:
+    """Файлы GOCACHE, на которые ссылаются importcfg прямой сборки"""
+    exports = set()
+    try:
+        names = os.listdir(config.GOCACHE_DIR)
+    except FileNotFoundError:
+        return exports
+    for name in names:
+        if name.startswith('.sandbox-importcfg-') and not name.endswith('.tmp'):
+            try:
+                exports.update(
+                    _read_importcfg(os.path.join(config.GOCACHE_DIR, name)).values()
+                )
+            except OSError:
+                continue
+    return exports
+
+
+def trim() -> int:
+    """Удаляет давно не использованные файлы GOCACHE,
+    пока размер кеша больше GOCACHE_MAX_SIZE. Возвращает число байт.
+    Файлы из importcfg прямой сборки не удаляются."""
+    keep = _importcfg_exports()
+    entries = []
+    for dirpath, _, filenames in os.walk(config.GOCACHE_DIR):
+        if dirpath == config.GOCACHE_DIR:
+            continue
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if path in keep:
+                continue
+            try:
+                entries.append((path, os.stat(path)))
+            except FileNotFoundError:
+                continue
+    size = sum(st.st_size for _, st in entries)
+    if size <= config.GOCACHE_MAX_SIZE:
+        return 0
+    target = config.GOCACHE_MAX_SIZE * 0.8
+    removed = 0
+    for path, st in sorted(entries, key=lambda e: e[1].st_mtime):
+        if size <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        size -= st.st_size
+        removed += st.st_size
+    return removed
+
+
+def maybe_trim() -> Optional[int]:
+    """Запускает trim не чаще чем раз в GOCACHE_TRIM_INTERVAL секунд"""
+    marker = os.path.join(config.GOCACHE_DIR, '.sandbox-trim')
+    try:
+        last_trim = os.stat(marker).st_mtime
+    except FileNotFoundError:
+        last_trim = 0
+    if time.time() - last_trim < config.GOCACHE_TRIM_INTERVAL:
+        return None
+    with _locked('.sandbox-trim', blocking=False) as acquired:
+        if not acquired:
+            return None
+        os.utime(marker)
+        return trim()
+
+
+def warm_up():
+    """Собирает типовые программы, чтобы прогреть GOCACHE
+    стандартной библиотекой. Выполняется одним воркером на версию
+    тулчейна, остальные дожидаются его на блокировке.
+    ready ставится только после успешного прогрева."""
+    marker = os.path.join(
+        config.GOCACHE_DIR,
+        f'.sandbox-warm-{toolchain_version()}'
+    )
+    with _locked('.sandbox-warm'):
+        if not os.path.exists(marker):
+            tmpdir = tempfile.mkdtemp()
+            try:
+                for i, code in enumerate(WARMUP_PROGRAMS):
+                    filepath_go = os.path.join(tmpdir, f'main{i}.go')
+                    with open(filepath_go, 'w') as f:
+                        f.write(code)
+                    subprocess.run(
+                        args=[
+                            'go', 'build',
+                            '-o', os.path.join(tmpdir, f'main{i}.out'),
+                            filepath_go
+                        ],
+                        env=build_env(),
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        timeout=config.WARMUP_TIMEOUT,
+                        check=True
+                    )
+            finally:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+            open(marker, 'w').close()
+    if config.BUILD_BACKEND == 'direct':
+        toolchain()
+    launcher.path()
+    ready.set()
+
+
+def keep_warming():
+    """Повторяет warm_up, пока прогрев не пройдёт: до этого
+    /ready/ отвечает 503"""
+    while True:
+        try:
+            warm_up()
+            return
+        except Exception:
+            logger.exception(
+                'Warm-up failed, retrying in %s seconds',
+                config.WARMUP_RETRY_INTERVAL
+            )
+        time.sleep(config.WARMUP_RETRY_INTERVAL)
@@ -0,0 +1,311 @@
+import os
+import time
+import errno
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Dict, Tuple
+
+from app import config
+from app.service import metrics
+
+logger = logging.getLogger(__name__)
+
+_toolchain = {}
+
+
+def toolchain_version() -> str:
+    """Версия Go-тулчейна, которым собираются программы"""
+    go = shutil.which('go') or 'go'
+    goroot = os.path.dirname(os.path.dirname(os.path.realpath(go)))
+    version_path = os.path.join(goroot, 'VERSION')
+    try:
+        mtime = os.stat(version_path).st_mtime_ns
+    except OSError:
+        return go
+    if _toolchain.get('key') != (version_path, mtime):
+        with open(version_path) as f:
+            _toolchain['version'] = f.readline().strip()
+        _toolchain['key'] = (version_path, mtime)
+    return _toolchain['version']
+
+
+class ArtifactCache:
+    """Хранилище скомпилированных бинарников, адресуемое хешем исходника.
+
+    Каталог общий для всех воркеров: запись идёт через временный файл
+    и атомарный rename под flock, вытесняются давно не используемые
+    записи (время последнего обращения хранится в mtime).
+    """
+
+    name = 'artifacts'
+    suffix = '.out'
+
+    @property
+    def root(self) -> str:
+        return config.ARTIFACT_CACHE_DIR
+
+    @classmethod
+    def key(cls, code: str, *settings: str) -> str:
+        digest = hashlib.sha256()
+        for part in (*settings, code):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key + self.suffix)
+
+    def get(self, key: str, dst: str) -> Optional[str]:
+        """Кладёт бинарник в dst (рабочий каталог запроса) жёсткой ссылкой,
+        а если кеш на другой файловой системе — копией, так что вытеснение
+        в другом воркере его уже не удалит. Возвращает dst или None.
+        Если положить бинарник не удалось, это промах: программа соберётся"""
+        path = self.path(key)
+        try:
+            self._link(path, dst)
+        except FileNotFoundError:
+            metrics.cache_lookup(self.name, hit=False)
+            return None
+        except OSError as ex:
+            logger.warning('Failed to take %s from artifact cache: %s', key, ex)
+            metrics.cache_lookup(self.name, hit=False)
+            return None
+        metrics.cache_lookup(self.name, hit=True)
+        return dst
+
+    @staticmethod
+    def _link(path: str, dst: str):
+        try:
+            os.link(path, dst)
+        except FileExistsError:
+            # бинарник прошлой попытки (например, до объединённой сборки)
+            os.unlink(dst)
+            os.link(path, dst)
+        except OSError as ex:
+            if ex.errno != errno.EXDEV:
+                raise
+            try:
+                with open(path, 'rb') as src, open(dst, 'wb') as f:
+                    shutil.copyfileobj(src, f)
+                os.chmod(dst, 0o711)
+            except BaseException:
+                if os.path.exists(dst):
+                    os.remove(dst)
+                raise
+            os.utime(path)
+            return
+        # у ссылки и записи кеша общий inode
+        os.utime(dst)
+
+    def put(self, key: str, filepath: str) -> str:
+        os.makedirs(self.root, mode=0o755, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as dst, open(filepath, 'rb') as src:
+                shutil.copyfileobj(src, dst)
+            os.chmod(tmp_path, 0o711)
+            with self._locked():
+                os.replace(tmp_path, self.path(key))
+                self._evict()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return self.path(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Размер кеша; обращения и вытеснения — в metrics"""
+        entries, size = 0, 0
+        for _, st in self._entries():
+            entries += 1
+            size += st.st_size
+        return {
+            'entries': entries,
+            'size': size,
+        }
+
+    def clear(self):
+        with self._locked():
+            for path, _ in self._entries():
+                os.remove(path)
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.root, mode=0o755, exist_ok=True)
+        with open(os.path.join(self.root, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                yield path, os.stat(path)
+            except FileNotFoundError:
+                continue
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        size = sum(st.st_size for _, st in entries)
+        while entries and (
+            len(entries) > config.ARTIFACT_CACHE_MAX_ENTRIES
+            or size > config.ARTIFACT_CACHE_MAX_SIZE
+        ):
+            path, st = entries.pop(0)
+            os.remove(path)
+            size -= st.st_size
+            metrics.CACHE_EVICTIONS.labels(self.name).inc()
+
+
+class CompileErrorCache:
+    """Ошибки компиляции по хешу исходника, в памяти воркера.
+
+    Записи живут COMPILE_ERROR_CACHE_TTL секунд, сверх
+    COMPILE_ERROR_CACHE_SIZE вытесняются давно не используемые.
+    При смене версии тулчейна кеш очищается.
+    """
+
+    name = 'compile_errors'
+
+    def __init__(self):
+        self._version: Optional[str] = None
+        self._items: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            self._items.clear()
+            self._version = version
+
+    def get(self, key: str, version: str) -> Optional[str]:
+        with self._lock:
+            self._check_version(version)
+            item = self._items.get(key)
+            if item is None or item[1] < time.monotonic():
+                self._items.pop(key, None)
+                metrics.cache_lookup(self.name, hit=False)
+                return None
+            self._items.move_to_end(key)
+            metrics.cache_lookup(self.name, hit=True)
+            return item[0]
+
+    def put(self, key: str, version: str, error: str):
+        if config.COMPILE_ERROR_CACHE_SIZE <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._items[key] = (error, time.monotonic() + config.COMPILE_ERROR_CACHE_TTL)
+            self._items.move_to_end(key)
+            while len(self._items) > config.COMPILE_ERROR_CACHE_SIZE:
+                self._items.popitem(last=False)
+                metrics.CACHE_EVICTIONS.labels(self.name).inc()
+
+    def stats(self) -> Dict[str, int]:
+        """Размер кеша; обращения и вытеснения — в metrics"""
+        with self._lock:
+            return {
+                'size': len(self._items),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class ImageCache:
+    """Бинарники, загруженные в запечатанные memfd, в памяти воркера.
+
+    Запуск по дескриптору (/proc/self/fd/N) не обращается к файловой
+    системе. Каждому запросу выдаётся свой дубликат дескриптора,
+    поэтому вытеснение образа не мешает уже идущим запускам.
+    Сверх MEMFD_CACHE_SIZE вытесняются давно не используемые образы.
+    """
+
+    name = 'images'
+    seals = fcntl.F_SEAL_SEAL | fcntl.F_SEAL_SHRINK | fcntl.F_SEAL_GROW | fcntl.F_SEAL_WRITE
+
+    def __init__(self):
+        self._items: 'OrderedDict[str, Tuple[int, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def seal(cls, filepath: str) -> int:
+        """Копирует бинарник в новый memfd и запечатывает его"""
+        fd = os.memfd_create('main', os.MFD_CLOEXEC | os.MFD_ALLOW_SEALING)
+        try:
+            with open(filepath, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                offset = 0
+                while offset < size:
+                    offset += os.sendfile(fd, f.fileno(), offset, size - offset)
+            fcntl.fcntl(fd, fcntl.F_ADD_SEALS, cls.seals)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def get(self, key: str) -> Optional[int]:
+        """Дубликат дескриптора образа или None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                metrics.cache_lookup(self.name, hit=False)
+                return None
+            self._items.move_to_end(key)
+            metrics.cache_lookup(self.name, hit=True)
+            return os.dup(item[0])
+
+    def load(self, key: Optional[str], filepath: str) -> int:
+        """Загружает бинарник в memfd и возвращает дубликат дескриптора.
+        Без ключа (или при MEMFD_CACHE_SIZE = 0) образ не сохраняется"""
+        fd = self.seal(filepath)
+        if key is None or config.MEMFD_CACHE_SIZE <= 0:
+            return fd
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                os.close(old[0])
+            self._items[key] = (fd, os.fstat(fd).st_size)
+            while len(self._items) > config.MEMFD_CACHE_SIZE:
+                os.close(self._items.popitem(last=False)[1][0])
+                metrics.CACHE_EVICTIONS.labels(self.name).inc()
+            self._report()
+            return os.dup(fd)
+
+    def _report(self):
+        metrics.MEMFD_IMAGES.set(len(self._items))
+        metrics.MEMFD_IMAGE_BYTES.set(sum(size for _, size in self._items.values()))
+
+    def stats(self) -> Dict[str, int]:
+        """Размер кеша; обращения и вытеснения — в metrics"""
+        with self._lock:
+            return {
+                'size': len(self._items),
+                'bytes': sum(size for _, size in self._items.values()),
+            }
+
+    def clear(self):
+        with self._lock:
+            for fd, _ in self._items.values():
+                os.close(fd)
+            self._items.clear()
+            self._report()
+
+
+artifacts = ArtifactCache()
+compile_errors = CompileErrorCache()
+images = ImageCache()
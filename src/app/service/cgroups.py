@@ -0,0 +1,203 @@
+import os
+import time
+import signal
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional
+
+from app import config
+from app.service import metrics
+from app.service.cpus import CpuSet
+from app.service.process import RunResult
+
+logger = logging.getLogger(__name__)
+
+CPU_PERIOD = 100000  # microseconds
+KILL_TIMEOUT = 1  # seconds
+
+
+class Leaf:
+    """Листовая cgroup одного процесса сборки или запуска"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _write(self, name: str, value: str):
+        fd = os.open(self._file(name), os.O_WRONLY)
+        try:
+            os.write(fd, value.encode())
+        finally:
+            os.close(fd)
+
+    def _read(self, name: str) -> Dict[str, int]:
+        """Файл из строк «ключ значение» (cpu.stat, memory.events);
+        пустой словарь, если файла нет (контроллер выключен)"""
+        try:
+            with open(self._file(name)) as f:
+                return {key: int(value) for key, value in (line.split() for line in f)}
+        except FileNotFoundError:
+            return {}
+
+    def _peak(self) -> Optional[int]:
+        try:
+            with open(self._file('memory.peak')) as f:
+                return int(f.read())
+        except FileNotFoundError:
+            return None
+
+    def pids(self) -> List[int]:
+        try:
+            with open(self._file('cgroup.procs')) as f:
+                return [int(pid) for pid in f.read().split()]
+        except FileNotFoundError:
+            return []
+
+    def limit(self, cpu_quota: float, memory: int):
+        """cpu.max и memory.max, если родитель включил эти контроллеры"""
+        if cpu_quota > 0 and os.path.exists(self._file('cpu.max')):
+            self._write('cpu.max', f'{int(cpu_quota * CPU_PERIOD)} {CPU_PERIOD}')
+        if memory > 0 and os.path.exists(self._file('memory.max')):
+            self._write('memory.max', str(memory))
+            if os.path.exists(self._file('memory.swap.max')):
+                self._write('memory.swap.max', '0')
+
+    def open_procs(self) -> int:
+        """Дескриптор cgroup.procs для записи: через него sandbox-launch
+        переносит себя в cgroup до exec программы, и в ней оказываются
+        все её потомки. Права на перенос процесса
+        ядро проверяет по тому, кто открыл файл, поэтому через дескриптор
+        в cgroup может войти и процесс без прав на неё (программа демона
+        запуска, который уже перешёл под пользователя песочницы)"""
+        return os.open(self._file('cgroup.procs'), os.O_WRONLY | os.O_CLOEXEC)
+
+    def kill(self):
+        """Убивает всё дерево процессов cgroup и ждёт, пока она опустеет"""
+        if not self._read('cgroup.events').get('populated'):
+            return
+        try:
+            self._write('cgroup.kill', '1')
+        except FileNotFoundError:
+            # cgroup.kill появился в Linux 5.14
+            for pid in self.pids():
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        deadline = time.monotonic() + KILL_TIMEOUT
+        while self._read('cgroup.events').get('populated') and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def result(self, run_result: RunResult) -> RunResult:
+        """Результат с учётом всего дерева процессов: процессорное время
+        из cpu.stat, пик памяти из memory.peak, OOM из memory.events.
+        Оставшиеся процессы программы при этом убиваются"""
+        self.kill()
+        usage = run_result.usage
+        if usage is not None:
+            cpu = self._read('cpu.stat')
+            if cpu:
+                usage = replace(
+                    usage,
+                    user_time=cpu['user_usec'] / 1000000,
+                    system_time=cpu['system_usec'] / 1000000
+                )
+            peak = self._peak()
+            if peak is not None:
+                usage = replace(usage, max_rss=peak // 1024)
+        return run_result._replace(
+            usage=usage,
+            oom_killed=self._read('memory.events').get('oom_kill', 0) > 0
+        )
+
+    def remove(self):
+        self.kill()
+        try:
+            os.rmdir(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception('Failed to remove cgroup %s', self.path)
+
+
+class Cgroups:
+    """Листовые cgroup v2 для процессов сборки и запуска.
+
+    CGROUP_ROOT — каталог cgroup v2, делегированный сервису; процессов
+    сервиса в нём быть не должно, иначе ядро не включит контроллеры
+    для потомков. Каждый процесс сборки и каждый запуск получает в нём
+    свою cgroup: cpu.max и memory.max ограничивают всё дерево процессов,
+    cpu.stat и memory.peak дают учёт с потомками, а cgroup.kill убивает
+    дерево целиком. Если cgroup v2 не делегированы, процессы запускаются
+    без них, если недоступны контроллеры — без лимитов."""
+
+    def __init__(self):
+        self._root: Optional[str] = None
+        self._available = False
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        root = config.CGROUP_ROOT
+        if not root:
+            return False
+        with self._lock:
+            if self._root != root:
+                self._available = self._setup(root)
+                self._root = root
+            return self._available
+
+    def _setup(self, root: str) -> bool:
+        """Проверяет каталог и включает потомкам контроллеры cpu и memory"""
+        try:
+            with open(os.path.join(root, 'cgroup.controllers')) as f:
+                controllers = f.read().split()
+        except OSError as ex:
+            logger.warning('cgroup v2 is not available at %s, running without cgroups: %s', root, ex)
+            return False
+        enable = ' '.join(f'+{name}' for name in ('cpu', 'memory') if name in controllers)
+        if enable:
+            try:
+                with open(os.path.join(root, 'cgroup.subtree_control'), 'w') as f:
+                    f.write(enable)
+            except OSError as ex:
+                logger.warning('Failed to enable cgroup controllers in %s: %s', root, ex)
+        return True
+
+    def _create(self, kind: str, cpus: Optional[CpuSet]) -> Optional[Leaf]:
+        leaf = Leaf(os.path.join(
+            config.CGROUP_ROOT,
+            f'{kind}-{os.getpid()}-{next(self._counter)}'
+        ))
+        try:
+            os.mkdir(leaf.path)
+            if kind == 'compile':
+                leaf.limit(config.CGROUP_CPU_QUOTA, config.COMPILE_MEMORY_LIMIT)
+            else:
+                leaf.limit(len(cpus) if cpus else config.CGROUP_CPU_QUOTA, config.MEMORY_LIMIT)
+        except OSError as ex:
+            metrics.CGROUP_FALLBACKS.inc()
+            logger.warning('Running %s without cgroup: %s', kind, ex)
+            leaf.remove()
+            return None
+        return leaf
+
+    @contextmanager
+    def leaf(self, kind: str, cpus: Optional[CpuSet] = None) -> Iterator[Optional[Leaf]]:
+        """cgroup для одного процесса: compile (лимит памяти
+        COMPILE_MEMORY_LIMIT) или execute (MEMORY_LIMIT, квота по ядрам
+        слота cpus). None, если cgroup выключены или недоступны"""
+        leaf = self._create(kind, cpus) if self.available() else None
+        try:
+            yield leaf
+        finally:
+            if leaf is not None:
+                leaf.remove()
+
+
+cgroups = Cgroups()
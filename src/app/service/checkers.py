@@ -0,0 +1,166 @@
+import re
+import math
+import time
+import hashlib
+import threading
+from functools import partial
+from itertools import starmap, zip_longest
+from operator import eq, methodcaller
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Any, Iterator, Optional, Union
+
+from app import config
+from app.service import metrics
+
+Checker = Callable[[str, str], bool]
+
+# Встроенные checker-функции принимают str или bytes-подобные объекты
+# (в том числе mmap файла с ответом) и сравнивают их потоком, не собирая
+# списков токенов (unordered_lines нужен мультимножество строк).
+Text = Union[str, bytes, memoryview]
+
+_TOKEN = re.compile(r'\S+')
+_TOKEN_BYTES = re.compile(rb'\S+')
+_LINE = re.compile(r'^.*$', re.MULTILINE)
+_LINE_BYTES = re.compile(rb'^.*$', re.MULTILINE)
+CHUNK_SIZE = 64 * 1024
+_group = methodcaller('group')
+
+CHECKER_EXACT = 'exact'
+CHECKER_TOKENS = 'tokens'
+CHECKER_FLOAT = 'float'
+CHECKER_UNORDERED_LINES = 'unordered_lines'
+
+
+def _same_type(right_value: Optional[Text], value: Optional[Text]):
+    """Приводит оба значения к str или оба к bytes-подобным"""
+    right_value = '' if right_value is None else right_value
+    value = '' if value is None else value
+    if isinstance(right_value, str) != isinstance(value, str):
+        if isinstance(right_value, str):
+            right_value = right_value.encode()
+        else:
+            value = value.encode()
+    return right_value, value
+
+
+def _tokens(text: Text) -> Iterator[Text]:
+    pattern = _TOKEN if isinstance(text, str) else _TOKEN_BYTES
+    return map(_group, pattern.finditer(text))
+
+
+def _lines(text: Text) -> Iterator[Text]:
+    pattern = _LINE if isinstance(text, str) else _LINE_BYTES
+    return map(_group, pattern.finditer(text))
+
+
+def exact(right_value: Optional[Text], value: Optional[Text]) -> bool:
+    """Вывод совпадает с ответом посимвольно"""
+    right_value, value = _same_type(right_value, value)
+    if isinstance(right_value, str):
+        return right_value == value
+    # mmap не сравнивается с bytes через ==, сравниваем частями
+    return len(right_value) == len(value) and all(
+        right_value[i:i + CHUNK_SIZE] == value[i:i + CHUNK_SIZE]
+        for i in range(0, len(value), CHUNK_SIZE)
+    )
+
+
+def tokens(right_value: Optional[Text], value: Optional[Text]) -> bool:
+    """Совпадают последовательности слов, пробельные символы не важны"""
+    right_value, value = _same_type(right_value, value)
+    return all(starmap(eq, zip_longest(_tokens(right_value), _tokens(value))))
+
+
+def floats(
+    right_value: Optional[Text],
+    value: Optional[Text],
+    abs_eps: float,
+    rel_eps: float
+) -> bool:
+    """Числа совпадают с точностью abs_eps или rel_eps.
+    Сравнение идёт в C-итераторах, без цикла на Python"""
+    right_value, value = _same_type(right_value, value)
+    isclose = partial(math.isclose, rel_tol=rel_eps, abs_tol=abs_eps)
+    try:
+        return all(starmap(isclose, zip_longest(
+            map(float, _tokens(right_value)),
+            map(float, _tokens(value)),
+            fillvalue=math.nan
+        )))
+    except ValueError:
+        # в выводе не число
+        return False
+
+
+def unordered_lines(right_value: Optional[Text], value: Optional[Text]) -> bool:
+    """Совпадают строки вывода без учёта их порядка"""
+    right_value, value = _same_type(right_value, value)
+    return Counter(_lines(right_value)) == Counter(_lines(value))
+
+
+def builtin(name: str, abs_eps: float = 0.0, rel_eps: float = 0.0) -> Checker:
+    """Встроенная checker-функция по имени"""
+    if name == CHECKER_FLOAT:
+        return partial(floats, abs_eps=abs_eps, rel_eps=rel_eps)
+    return BUILTIN_CHECKERS[name]
+
+
+BUILTIN_CHECKERS: Dict[str, Checker] = {
+    CHECKER_EXACT: exact,
+    CHECKER_TOKENS: tokens,
+    CHECKER_FLOAT: floats,
+    CHECKER_UNORDERED_LINES: unordered_lines,
+}
+
+
+class CheckerCache:
+    """LRU-кеш скомпилированных checker-функций по хешу исходника"""
+
+    name = 'checkers'
+
+    def __init__(self):
+        self._items: 'OrderedDict[str, Checker]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source: str, namespace: Dict[str, Any]) -> Checker:
+        """Возвращает функцию checker, компилируя исходник при промахе.
+        Ошибки компиляции и исполнения определения пробрасываются."""
+        key = hashlib.sha256(source.encode()).hexdigest()
+        with self._lock:
+            checker = self._items.get(key)
+            if checker is not None:
+                self._items.move_to_end(key)
+                metrics.cache_lookup(self.name, hit=True)
+                return checker
+
+        started = time.perf_counter()
+        code = compile(source, '<checker>', 'exec')
+        namespace = dict(namespace)
+        exec(code, namespace)
+        checker = namespace['checker']
+        elapsed = time.perf_counter() - started
+
+        metrics.cache_lookup(self.name, hit=False)
+        metrics.CHECKER_COMPILE_SECONDS.inc(elapsed)
+
+        with self._lock:
+            self._items[key] = checker
+            while len(self._items) > config.CHECKER_CACHE_SIZE:
+                self._items.popitem(last=False)
+                metrics.CACHE_EVICTIONS.labels(self.name).inc()
+        return checker
+
+    def stats(self) -> Dict[str, Any]:
+        """Размер кеша; обращения, вытеснения и время компиляции — в metrics"""
+        with self._lock:
+            return {
+                'size': len(self._items),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+checkers = CheckerCache()
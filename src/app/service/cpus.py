@@ -0,0 +1,121 @@
+import os
+import fcntl
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app import config
+from app.service import metrics
+
+CpuSet = Tuple[int, ...]
+
+
+class CpuSlots:
+    """Раскладка запусков программ по ядрам.
+
+    Доступные процессу ядра делятся на слоты по EXECUTE_CPUS ядер,
+    каждый запуск занимает свободный слот: программа привязывается
+    к его ядрам (sched_setaffinity), а GOMAXPROCS равен размеру слота.
+    Занятость слота — flock на его файле в CPU_SLOT_DIR, поэтому
+    воркеры gunicorn не кладут программы на одни и те же ядра.
+    Если свободных слотов нет, запуск делит наименее занятый слот
+    своего воркера, а не ждёт (очередь — это этап EXECUTE)."""
+
+    def __init__(self):
+        self._slots: Optional[List[CpuSet]] = None
+        self._owner = None
+        self._active = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return config.EXECUTE_CPUS > 0
+
+    @property
+    def root(self) -> str:
+        return config.CPU_SLOT_DIR
+
+    def slots(self) -> List[CpuSet]:
+        """Слоты по EXECUTE_CPUS ядер; остаток ядер не используется"""
+        owner = (config.EXECUTE_CPUS, os.getpid())
+        if self._owner != owner:
+            cpus = sorted(os.sched_getaffinity(0))
+            size = min(config.EXECUTE_CPUS, len(cpus))
+            self._slots = [
+                tuple(cpus[i:i + size])
+                for i in range(0, len(cpus) - size + 1, size)
+            ]
+            self._owner = owner
+        return self._slots
+
+    def _claim(self, count: int) -> Tuple[int, Optional[int]]:
+        """Индекс слота и дескриптор его блокировки
+        (None, если слот пришлось делить)"""
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        with self._lock:
+            order = sorted(range(count), key=lambda i: self._active[i])
+            for index in order:
+                if self._active[index]:
+                    break
+                fd = os.open(
+                    os.path.join(self.root, f'slot-{count}-{index}.lock'),
+                    os.O_RDWR | os.O_CREAT,
+                    0o600
+                )
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                self._active[index] += 1
+                return index, fd
+            metrics.CPU_SLOTS_SHARED.inc()
+            self._active[order[0]] += 1
+            return order[0], None
+
+    @contextmanager
+    def slot(self) -> Iterator[Optional[CpuSet]]:
+        """Ядра для одного запуска; None, если привязка выключена"""
+        if not self.enabled:
+            yield None
+            return
+        slots = self.slots()
+        index, fd = self._claim(len(slots))
+        try:
+            yield slots[index]
+        finally:
+            with self._lock:
+                self._active[index] -= 1
+            if fd is not None:
+                os.close(fd)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'slots': len(self.slots()) if self.enabled else 0,
+                'active': sum(self._active.values()),
+            }
+
+
+def go_env(cpus: Optional[CpuSet]) -> Dict[str, str]:
+    """Переменные окружения Go-рантайма для запуска: GOMAXPROCS
+    по числу ядер слота, GOGC и GOMEMLIMIT по MEMORY_LIMIT"""
+    env = {}
+    if cpus:
+        env['GOMAXPROCS'] = str(len(cpus))
+    if config.EXECUTE_GOGC:
+        env['GOGC'] = config.EXECUTE_GOGC
+    if config.MEMORY_LIMIT > 0:
+        env['GOMEMLIMIT'] = str(config.MEMORY_LIMIT)
+    return env
+
+
+def run_env(extra: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """Окружение сервиса с добавками; None, если добавок нет"""
+    if not extra:
+        return None
+    return {**os.environ, **extra}
+
+
+cpu_slots = CpuSlots()
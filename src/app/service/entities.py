@@ -1,29 +1,123 @@
 import os
+import threading
 from collections import namedtuple
-import tempfile
+from concurrent.futures import Future
+from typing import Callable, Optional, Tuple
 
-from app import config
+from app.service import metrics
+from app.service.workspaces import workspaces
 
-ExecuteResult = namedtuple('ExecuteResult', ('result', 'error'))
+ExecuteResult = namedtuple(
+    'ExecuteResult',
+    ('result', 'error', 'usage'),
+    defaults=(None,)
+)
 
 
 def opener(path, flags):
     return os.open(path, flags, mode=0o777)
 
+
+def source_opener(path, flags):
+    return os.open(path, flags, mode=0o600)
+
+
 class GoFile:
+    """Программа запроса. Рабочий каталог выдаётся при первом обращении,
+    а исходник пишется только перед сборкой: программе из кеша образов
+    не нужно ни то, ни другое"""
+
     def __init__(self, code: str):
-        self.tmpdir = tempfile.mkdtemp()
-        # os.chmod(self.tmpdir, 0o755)
-        os.chown(self.tmpdir, config.SANDBOX_USER_UID, config.SANDBOX_USER_GID)
-        self.filepath_go = os.path.join(self.tmpdir, "main.go")
-        self.filepath_out = os.path.join(self.tmpdir, "main.out")
-        with open(self.filepath_go, "w") as f:
-            f.write(code)
+        self.code = code
+        self.cached = False
+        self.compile_usage = None
+        # ошибка сборки — диагностика компилятора, её можно кешировать
+        self.compile_diagnostics = False
+        self.image_fd = None
+        self._tmpdir = None
+
+    @property
+    def tmpdir(self) -> str:
+        if self._tmpdir is None:
+            self._tmpdir = self._lease()
+        return self._tmpdir
+
+    @metrics.GOFILE_CREATE.time()
+    def _lease(self) -> str:
+        return workspaces.lease()
+
+    @property
+    def filepath_go(self) -> str:
+        return os.path.join(self.tmpdir, "main.go")
+
+    @property
+    def filepath_out(self) -> str:
+        return os.path.join(self.tmpdir, "main.out")
+
+    def write_source(self):
+        """Записывает исходник для сборки"""
+        # исходник читает только сборка, программам песочницы он недоступен
+        with open(self.filepath_go, "w", opener=source_opener) as f:
+            f.write(self.code)
 
+    def use_artifact(self):
+        """Бинарник в tmpdir взят из кеша, сборка не нужна"""
+        self.cached = True
+
+    def use_image(self, fd: int, cached: bool = False):
+        """Запускать бинарник из memfd (дескриптор переходит к GoFile)"""
+        self.image_fd = fd
+        self.cached = self.cached or cached
+
+    @property
+    def executable(self) -> str:
+        """Путь, по которому запускается программа"""
+        if self.image_fd is not None:
+            return f'/proc/self/fd/{self.image_fd}'
+        return self.filepath_out
+
+    @metrics.GOFILE_REMOVE.time()
     def remove(self):
-        try:
-            os.remove(self.filepath_go)
-            os.remove(self.filepath_out)
-            os.rmdir(self.tmpdir)
-        except Exception:
-            pass
\ No newline at end of file
+        if self.image_fd is not None:
+            os.close(self.image_fd)
+            self.image_fd = None
+        if self._tmpdir is not None:
+            workspaces.release(self._tmpdir)
+
+
+class SharedFile:
+    """GoFile элементов пакета с одинаковым кодом. Создаёт и компилирует
+    его первый элемент, а удаляет последний, поэтому рабочий каталог
+    не ждёт конца всего пакета"""
+
+    def __init__(self, code: str, users: int):
+        self.code = code
+        self._users = users
+        self._lock = threading.Lock()
+        self._file: Optional[GoFile] = None
+        self._compiled: Optional[Future] = None
+
+    def acquire(
+        self,
+        compile_fn: Callable[[str], Tuple[Optional[GoFile], Optional[str]]]
+    ) -> Tuple[Optional[GoFile], Optional[str]]:
+        """GoFile и ошибка компиляции; compile_fn вызывается один раз,
+        его исключение получат все элементы"""
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = Future()
+                try:
+                    self._file, error = compile_fn(self.code)
+                except BaseException as ex:
+                    self._compiled.set_exception(ex)
+                else:
+                    self._compiled.set_result(error)
+        return self._file, self._compiled.result()
+
+    def release(self):
+        """Элемент закончил работу с файлом; последний его удаляет"""
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._file is not None:
+                self._file.remove()
+                self._file = None
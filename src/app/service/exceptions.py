@@ -29,3 +29,17 @@ class ExecutionException(ServiceException):
 class CompileException(ServiceException):
 
     default_message = messages.MSG_7
+
+
+class QueueFullException(ServiceException):
+
+    default_message = messages.MSG_9
+
+
+class OverloadedException(ServiceException):
+
+    default_message = messages.MSG_14
+
+    def __init__(self, retry_after: int, *args, **kwargs):
+        self.retry_after = retry_after
+        super().__init__(*args, **kwargs)
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import fcntl
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from app import config
+
+
+class Flight:
+    """Компиляция одного исходника, на которую попал запрос.
+
+    waited — пока запрос ждал блокировку, этот исходник собирал
+    другой запрос, и его результат можно взять через shared()."""
+
+    def __init__(self, result_path: str, waited: bool):
+        self.result_path = result_path
+        self.waited = waited
+
+    def shared(self) -> Optional[Dict[str, Optional[str]]]:
+        """Результат сборки, которую дождался запрос ({'error': ...}),
+        None, если её нет (собиравший запрос упал)"""
+        if not self.waited:
+            return None
+        try:
+            with open(self.result_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def publish(self, error: Optional[str]):
+        """Сохраняет результат сборки для ждущих запросов"""
+        tmp_path = f'{self.result_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'error': error}, f)
+        os.replace(tmp_path, self.result_path)
+
+
+class CompileFlights:
+    """Объединение одновременных сборок одного исходника.
+
+    На каждый хеш исходника — файл блокировки в COMPILE_FLIGHT_DIR.
+    flock берётся на отдельном открытом файле, поэтому исключает
+    и потоки одного воркера, и разные воркеры gunicorn. Кто взял
+    блокировку сразу, собирает сам и публикует результат; кто
+    ждал — берёт готовую ошибку или бинарник из кеша.
+    """
+
+    lock_suffix = '.lock'
+    result_suffix = '.json'
+
+    def __init__(self):
+        self._evicted_at = 0.0
+
+    @property
+    def root(self) -> str:
+        return config.COMPILE_FLIGHT_DIR
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.root, key + suffix)
+
+    def _acquire(self, key: str) -> Tuple[int, bool]:
+        """Открывает и блокирует файл блокировки ключа.
+        Возвращает дескриптор и признак, что пришлось ждать"""
+        path = self.path(key, self.lock_suffix)
+        waited = False
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    waited = True
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                # файл могла удалить очистка, пока мы ждали
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    os.utime(fd)
+                    return fd, waited
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+    @contextmanager
+    def flight(self, key: str) -> Iterator[Flight]:
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        fd, waited = self._acquire(key)
+        try:
+            result_path = self.path(key, self.result_suffix)
+            if not waited:
+                # результат прошлой сборки устарел
+                try:
+                    os.remove(result_path)
+                except FileNotFoundError:
+                    pass
+            yield Flight(result_path, waited)
+        finally:
+            os.close(fd)
+
+    def maybe_evict(self) -> Optional[int]:
+        """Запускает evict не чаще чем раз в COMPILE_FLIGHT_TTL секунд"""
+        if time.monotonic() - self._evicted_at < config.COMPILE_FLIGHT_TTL:
+            return None
+        self._evicted_at = time.monotonic()
+        return self.evict()
+
+    def evict(self) -> int:
+        """Удаляет файлы сборок старше COMPILE_FLIGHT_TTL секунд"""
+        removed = 0
+        deadline = time.time() - config.COMPILE_FLIGHT_TTL
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return removed
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                if os.stat(path).st_mtime < deadline:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+flights = CompileFlights()
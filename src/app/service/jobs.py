@@ -0,0 +1,83 @@
+import abc
+import time
+import uuid
+import threading
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from app import config
+from app.entities import Job, TestsData
+from app.service import exceptions
+from app.service.main import GoService
+
+
+class JobBackend(abc.ABC):
+    """Интерфейс очереди фоновых тестовых прогонов"""
+
+    @abc.abstractmethod
+    def submit(self, data: TestsData) -> Job:
+        pass
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        pass
+
+
+class LocalJobBackend(JobBackend):
+    """Очередь в памяти процесса: задания выполняет пул потоков воркера,
+    в котором они были созданы"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.JOB_WORKERS,
+            thread_name_prefix='job'
+        )
+
+    def submit(self, data: TestsData) -> Job:
+        with self._lock:
+            self._expire()
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= config.JOB_QUEUE_SIZE:
+                raise exceptions.QueueFullException()
+            job = Job(id=uuid.uuid4().hex, data=data)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job):
+        job.status = Job.RUNNING
+        status = Job.FAILED
+        try:
+            GoService.testing(job.data)
+        except exceptions.ServiceException as ex:
+            job.error = ex
+        except Exception as ex:
+            job.error = exceptions.ExecutionException(details=str(ex))
+        else:
+            status = Job.DONE
+        finally:
+            job.finished_at = time.monotonic()
+            job.status = status
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [
+            job.id for job in self._jobs.values()
+            if job.finished and now - job.finished_at > config.JOB_TTL
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def create_backend() -> JobBackend:
+    """Создаёт бэкенд очереди по пути к классу из config.JOB_BACKEND"""
+    module_name, _, class_name = config.JOB_BACKEND.rpartition('.')
+    return getattr(import_module(module_name), class_name)()
@@ -0,0 +1,143 @@
+// sandbox-launch ставит себе ограничения песочницы и делает exec программы.
+//
+// Веб-воркер и демон запуска стартуют его через posix_spawn, поэтому
+// им не нужен fork с preexec_fn в многопоточном процессе. Собирается
+// из app/service/launcher.py.
+//
+//	sandbox-launch -errfd N [-cgroup FD] [-cpus 0,1] [-rlimit RES:VALUE]... [-user UID:GID] -- PATH ARGS...
+//
+// -cgroup — открытый на запись cgroup.procs, -cpus — ядра для
+// sched_setaffinity, -rlimit — лимит ядра (мягкий равен жёсткому),
+// -user — пользователь, под которого перейти. Ошибку до exec
+// sandbox-launch пишет в -errfd как «errno:шаг:текст» и завершается
+// с кодом 127; при успешном exec дескриптор закрывается (close-on-exec).
+package main
+
+import (
+	"os"
+	"runtime"
+	"strconv"
+	"strings"
+	"syscall"
+	"unsafe"
+)
+
+var errfd = 2
+
+func fail(step string, err error) {
+	errno, _ := err.(syscall.Errno)
+	syscall.Write(errfd, []byte(strconv.Itoa(int(errno))+":"+step+":"+err.Error()))
+	os.Exit(127)
+}
+
+func setAffinity(list string) error {
+	var mask [16]uint64
+	for _, item := range strings.Split(list, ",") {
+		cpu, err := strconv.Atoi(item)
+		if err != nil {
+			return err
+		}
+		if cpu < 0 || cpu >= len(mask)*64 {
+			return syscall.EINVAL
+		}
+		mask[cpu/64] |= 1 << uint(cpu%64)
+	}
+	_, _, errno := syscall.RawSyscall(
+		syscall.SYS_SCHED_SETAFFINITY,
+		0,
+		unsafe.Sizeof(mask),
+		uintptr(unsafe.Pointer(&mask)),
+	)
+	if errno != 0 {
+		return errno
+	}
+	return nil
+}
+
+func pair(value string) (int, int, error) {
+	first, second, found := strings.Cut(value, ":")
+	if !found {
+		return 0, 0, syscall.EINVAL
+	}
+	a, err := strconv.Atoi(first)
+	if err != nil {
+		return 0, 0, err
+	}
+	b, err := strconv.Atoi(second)
+	return a, b, err
+}
+
+func main() {
+	// привязка к ядрам действует на поток, из которого будет exec
+	runtime.LockOSThread()
+
+	cgroup, cpus, user := -1, "", ""
+	var rlimits []string
+	args := os.Args[1:]
+	for len(args) >= 2 && args[0] != "--" {
+		name, value := args[0], args[1]
+		args = args[2:]
+		switch name {
+		case "-errfd":
+			fd, err := strconv.Atoi(value)
+			if err != nil {
+				fail("errfd", err)
+			}
+			errfd = fd
+			syscall.CloseOnExec(errfd)
+		case "-cgroup":
+			fd, err := strconv.Atoi(value)
+			if err != nil {
+				fail("cgroup", err)
+			}
+			cgroup = fd
+		case "-cpus":
+			cpus = value
+		case "-rlimit":
+			rlimits = append(rlimits, value)
+		case "-user":
+			user = value
+		default:
+			fail("usage", syscall.EINVAL)
+		}
+	}
+	if len(args) < 2 || args[0] != "--" {
+		fail("usage", syscall.EINVAL)
+	}
+	argv := args[1:]
+
+	if cgroup >= 0 {
+		if _, err := syscall.Write(cgroup, []byte("0")); err != nil {
+			fail("cgroup", err)
+		}
+		syscall.Close(cgroup)
+	}
+	if cpus != "" {
+		if err := setAffinity(cpus); err != nil {
+			fail("cpus", err)
+		}
+	}
+	for _, value := range rlimits {
+		resource, limit, err := pair(value)
+		if err == nil {
+			err = syscall.Setrlimit(resource, &syscall.Rlimit{Cur: uint64(limit), Max: uint64(limit)})
+		}
+		if err != nil {
+			fail("rlimit", err)
+		}
+	}
+	if user != "" {
+		uid, gid, err := pair(user)
+		if err == nil {
+			err = syscall.Setgid(gid)
+		}
+		if err == nil {
+			err = syscall.Setuid(uid)
+		}
+		if err != nil {
+			fail("user", err)
+		}
+	}
+	err := syscall.Exec(argv[0], argv, syscall.Environ())
+	fail("exec", err)
+}
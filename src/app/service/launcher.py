@@ -0,0 +1,86 @@
+"""sandbox-launch (launcher.go): запуск программы с ограничениями
+песочницы через posix_spawn, без fork с preexec_fn.
+
+Бинарник собирается из исходника один раз на версию исходника
+и тулчейна и лежит в LAUNCHER_DIR. Его собирает прогрев (build.warm_up),
+а демон запуска — до того, как перейти под пользователя песочницы.
+"""
+import os
+import fcntl
+import hashlib
+import tempfile
+import threading
+import subprocess
+from typing import List, Optional, Set
+
+from app import config
+from app.service.cache import toolchain_version
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'launcher.go')
+
+_source_digest: Optional[str] = None
+_built: Set[str] = set()
+_lock = threading.Lock()
+
+
+def _path() -> str:
+    global _source_digest
+    if _source_digest is None:
+        with open(SOURCE, 'rb') as f:
+            _source_digest = hashlib.sha256(f.read()).hexdigest()
+    digest = hashlib.sha256(f'{_source_digest} {toolchain_version()}'.encode()).hexdigest()
+    return os.path.join(config.LAUNCHER_DIR, f'sandbox-launch-{digest[:16]}')
+
+
+def _build(path: str):
+    fd, tmp_path = tempfile.mkstemp(dir=config.LAUNCHER_DIR, prefix='.tmp-')
+    os.close(fd)
+    try:
+        subprocess.run(
+            args=['go', 'build', '-trimpath', '-o', tmp_path, SOURCE],
+            env=dict(os.environ, GOCACHE=config.GOCACHE_DIR, CGO_ENABLED='0'),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            timeout=config.WARMUP_TIMEOUT,
+            check=True
+        )
+        os.chmod(tmp_path, 0o755)
+        os.replace(tmp_path, path)
+    except subprocess.CalledProcessError as ex:
+        raise OSError(f'Failed to build sandbox-launch: {ex.stderr.decode(errors="replace")}')
+    except subprocess.TimeoutExpired:
+        raise OSError('Failed to build sandbox-launch: timeout')
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def path() -> str:
+    """Путь к sandbox-launch, собирает его при первом обращении"""
+    launcher = _path()
+    with _lock:
+        if launcher in _built:
+            return launcher
+        os.makedirs(config.LAUNCHER_DIR, mode=0o755, exist_ok=True)
+        # собирает один воркер, остальные ждут на блокировке
+        with open(os.path.join(config.LAUNCHER_DIR, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            if not os.path.exists(launcher):
+                _build(launcher)
+        _built.add(launcher)
+        return launcher
+
+
+def command(launch, args: List[str], errfd: int) -> List[str]:
+    """Аргументы запуска программы args через sandbox-launch
+    с ограничениями launch (см. process.Launch)"""
+    cmd = [path(), '-errfd', str(errfd)]
+    if launch.cgroup is not None:
+        cmd += ['-cgroup', str(launch.cgroup)]
+    if launch.cpus:
+        cmd += ['-cpus', ','.join(map(str, launch.cpus))]
+    for resource, value in launch.rlimits:
+        cmd += ['-rlimit', f'{resource}:{value}']
+    if launch.user is not None:
+        cmd += ['-user', '{}:{}'.format(*launch.user)]
+    return cmd + ['--', *args]
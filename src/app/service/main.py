@@ -1,90 +1,512 @@
 import os
+import re
+import mmap
 import stat
-import subprocess
-from typing import Optional
-from app.service.entities import GoFile
+import signal
+from contextlib import contextmanager
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Optional, Tuple, List, Iterator, Union, Dict, Generator
+from app.service.entities import GoFile, SharedFile
 from app.entities import (
     DebugData,
     TestsData,
-
+    TestData,
+    BatchData,
 )
 from app import config
-from app.service import exceptions, messages
+from app.service import exceptions, messages, build, metrics, stages
 from app.service.entities import ExecuteResult
+from app.service.cache import artifacts, compile_errors, images, toolchain_version
+from app.service.flights import flights
+from app.service.cpus import CpuSet, cpu_slots, go_env, run_env
+from app.service.cgroups import Leaf, cgroups
+from app.service.checkers import checkers, builtin, Checker
+from app.service.runner import RunnerClient
+from app.service import process
+from app.service.process import RunResult
 from app.utils import clean_str, clean_error
 
+# так рантайм Go сообщает, что не получил память (упёрся в RLIMIT_DATA)
+OUT_OF_MEMORY = re.compile(
+    rb'fatal error: (runtime: )?(out of memory|cannot allocate memory)'
+)
+LIMIT_MESSAGES = {
+    'cpu': messages.MSG_15,
+    'wall': messages.MSG_16,
+    'memory': messages.MSG_17,
+}
+
+
 class GoService:
     @classmethod
-    def _preexec_fn(cls):
-        def change_process_user():
-            os.setgid(config.SANDBOX_USER_GID)
-            os.setuid(config.SANDBOX_USER_UID)
+    @contextmanager
+    def _launch(cls, leaf: Optional[Leaf] = None, **limits) -> Iterator[Optional[process.Launch]]:
+        """Ограничения для sandbox-launch: cgroup листа leaf и limits
+        (см. process.Launch). None, если ограничивать нечего"""
+        if leaf is None and not limits:
+            yield None
+            return
+        cgroup = leaf.open_procs() if leaf is not None else None
+        try:
+            yield process.Launch(cgroup=cgroup, **limits)
+        finally:
+            if cgroup is not None:
+                os.close(cgroup)
+
+    @classmethod
+    def _execute_launch(cls, cpus: Optional[CpuSet] = None, leaf: Optional[Leaf] = None):
+        """Программа запускается под пользователем песочницы
+        с лимитами ядра, на ядрах слота cpus и в cgroup leaf"""
+        return cls._launch(
+            leaf,
+            rlimits=cls._rlimits(),
+            cpus=cpus,
+            user=(config.SANDBOX_USER_UID, config.SANDBOX_USER_GID)
+        )
+
+    @classmethod
+    def _rlimits(cls) -> List[Tuple[int, int]]:
+        """RLIMIT_CPU по CPU_TIME_LIMIT и RLIMIT_DATA по MEMORY_LIMIT"""
+        return process.rlimits(config.CPU_TIME_LIMIT, config.MEMORY_LIMIT)
 
-        return change_process_user
+    @classmethod
+    def _build_settings(cls) -> Tuple[str, ...]:
+        """Параметры сборки, от которых зависит бинарник"""
+        return (
+            toolchain_version(),
+            'go build' if config.BUILD_BACKEND != 'direct' else 'direct',
+            *(
+                f'{name}={os.environ.get(name, "")}'
+                for name in ('GOOS', 'GOARCH', 'CGO_ENABLED', 'GOFLAGS')
+            )
+        )
 
     @classmethod
+    @contextmanager
+    def _build_context(cls) -> Iterator[Tuple[Optional[Leaf], Optional[process.Launch]]]:
+        """cgroup сборки и ограничения для sandbox-launch"""
+        with cgroups.leaf('compile') as leaf, cls._launch(leaf) as launch:
+            yield leaf, launch
+
+    @classmethod
+    def _run_build(cls, args: List[str], timeout: float) -> RunResult:
+        with cls._build_context() as (leaf, launch):
+            pid, *fds = process.spawn(
+                args=args,
+                env=build.build_env(),
+                launch=launch
+            )
+            run_result = process.communicate(pid, *fds, data_in=None, timeout=timeout)
+            return leaf.result(run_result) if leaf else run_result
+
+    @classmethod
+    def _go_build_args(cls, file: GoFile) -> List[str]:
+        return ['go', 'build', '-o', file.filepath_out, file.filepath_go]
+
+    @classmethod
+    def _direct_args(
+        cls,
+        file: GoFile,
+        tools: build.Toolchain
+    ) -> Tuple[List[str], List[str]]:
+        """Команды compile и link прямой сборки"""
+        archive = os.path.join(os.path.dirname(file.filepath_out), 'main.a')
+        return (
+            [
+                tools.compile, '-o', archive, '-p', 'main', '-complete',
+                '-nolocalimports', '-importcfg', tools.importcfg, '-pack',
+                file.filepath_go
+            ],
+            [
+                tools.link, '-o', file.filepath_out, '-importcfg', tools.importcfg,
+                '-buildmode=exe', archive
+            ],
+        )
+
+    @classmethod
+    def _direct_failed(cls, run_result: RunResult) -> RunResult:
+        """Ошибка compile или link в том виде, как её выводит go build
+        (compile пишет ошибки в stdout, go build — в stderr)"""
+        return run_result._replace(
+            stderr=b'# command-line-arguments\n' + run_result.stdout + run_result.stderr
+        )
+
+    @classmethod
+    def _direct_supported(cls, file: GoFile) -> Optional[build.Toolchain]:
+        """Инструменты прямой сборки, если она включена и подходит программе"""
+        if config.BUILD_BACKEND != 'direct':
+            return None
+        tools = build.toolchain()
+        if tools and build.direct_supported(file.code, tools):
+            return tools
+        return None
+
+    @classmethod
+    def _build_steps(
+        cls,
+        file: GoFile
+    ) -> Generator[Tuple[List[str], float], RunResult, RunResult]:
+        """Шаги сборки: go build или, если BUILD_BACKEND=direct
+        и программа это позволяет, напрямую go tool compile и link.
+        Отдаёт команду и таймаут, получает результат процесса, который
+        запускает вызывающий (GoService._build или AsyncGoService._build)"""
+        tools = cls._direct_supported(file)
+        if tools:
+            compile_args, link_args = cls._direct_args(file, tools)
+            compiled = yield compile_args, config.TIMEOUT
+            if compiled.timeout:
+                return compiled
+            if not compiled.returncode:
+                linked = yield link_args, max(config.TIMEOUT - compiled.usage.wall_time, 0)
+                if linked.returncode:
+                    linked = cls._direct_failed(linked)
+                return process.chain(compiled, linked)
+            # компилятор не нашёл импорт — собирает go build
+            if b'could not import' not in compiled.stdout + compiled.stderr:
+                return cls._direct_failed(compiled)
+        return (yield cls._go_build_args(file), config.TIMEOUT)
+
+    @classmethod
+    def _build(cls, file: GoFile) -> RunResult:
+        """Собирает бинарник (см. _build_steps)"""
+        steps = cls._build_steps(file)
+        args, timeout = next(steps)
+        while True:
+            try:
+                args, timeout = steps.send(cls._run_build(args, timeout=timeout))
+            except StopIteration as stop:
+                return stop.value
+
+    @classmethod
+    def _cached_error(cls, code: str) -> Optional[str]:
+        """Ошибка компиляции исходника из кеша ошибок,
+        проверяется до создания GoFile"""
+        settings = cls._build_settings()
+        return compile_errors.get(artifacts.key(code, *settings), settings[0])
+
+    @classmethod
+    @metrics.COMPILE.time()
     def _compile(cls, file: GoFile) -> Optional[str]:
-        """Компилирует Go-программу"""
+        """Компилирует Go-программу. В кеше ошибок запоминаются только
+        диагностики компилятора, а не превышение времени или падение сборки"""
+        settings = cls._build_settings()
+        key = artifacts.key(file.code, *settings)
+        if cls._use_cached(file, key):
+            return None
+        if cls._coalescing():
+            error = cls._compile_coalesced(file, key)
+        else:
+            error = cls._compile_file(file, key)
+        if error and file.compile_diagnostics:
+            compile_errors.put(key, settings[0], error)
+        elif not error:
+            cls._load_image(file, key)
+        return error
+
+    @classmethod
+    def _memfd(cls) -> bool:
+        """Запуск из memfd; демон запуска получает бинарник по пути"""
+        return config.EXECUTE_MEMFD and not config.RUNNER_SOCKET
+
+    @classmethod
+    def _use_cached(cls, file: GoFile, key: str) -> bool:
+        """Берёт готовый бинарник: образ memfd или файл из кеша бинарников"""
+        if not config.ARTIFACT_CACHE_ENABLED:
+            return False
+        if cls._memfd():
+            fd = images.get(key)
+            if fd is not None:
+                file.use_image(fd, cached=True)
+                return True
+        if not artifacts.get(key, file.filepath_out):
+            return False
+        file.use_artifact()
+        cls._load_image(file, key)
+        return True
+
+    @classmethod
+    def _load_image(cls, file: GoFile, key: str):
+        """При EXECUTE_MEMFD загружает бинарник в запечатанный memfd,
+        все запуски идут из него. С кешем бинарников образ сохраняется"""
+        if not cls._memfd() or file.image_fd is not None:
+            return
         try:
-            proc = subprocess.Popen(
-                args=['go', 'build', '-o', file.filepath_out, file.filepath_go],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            _, error = proc.communicate(timeout=config.TIMEOUT)
+            file.use_image(images.load(
+                key if config.ARTIFACT_CACHE_ENABLED else None,
+                file.filepath_out
+            ))
+        except OSError as ex:
+            raise exceptions.CompileException(details=str(ex))
+
+    @classmethod
+    def _coalescing(cls) -> bool:
+        """Без кеша бинарников ждущий запрос не получит чужой бинарник
+        и собирал бы сам под блокировкой, по очереди с остальными"""
+        return config.COMPILE_COALESCING and config.ARTIFACT_CACHE_ENABLED
 
-            if not error:
+    @classmethod
+    def _compile_coalesced(cls, file: GoFile, key: str) -> Optional[str]:
+        """Одновременные сборки одного исходника объединяются: собирает
+        один запрос, остальные берут его ошибку или бинарник из кеша"""
+        try:
+            with flights.flight(key) as flight:
+                shared = flight.shared()
+                if shared is not None:
+                    if shared['error'] is not None:
+                        metrics.COMPILES_COALESCED.inc()
+                        return shared['error']
+                    if cls._use_cached(file, key):
+                        metrics.COMPILES_COALESCED.inc()
+                        return None
+                error = cls._compile_file(file, key)
+                flight.publish(error)
+            flights.maybe_evict()
+        except OSError as ex:
+            raise exceptions.CompileException(details=str(ex))
+        return error
+
+    @classmethod
+    def _compile_file(cls, file: GoFile, key: str) -> Optional[str]:
+        """Собирает бинарник и кладёт его в кеш"""
+        try:
+            file.write_source()
+            with stages.COMPILE.slot():
+                run_result = cls._build(file)
+            error = cls._compiled(file, key, run_result)
+        except Exception as ex:
+            raise exceptions.CompileException(details=str(ex))
+        build.maybe_trim()
 
-                os.chmod(file.filepath_out, stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH)
-                dir_path = os.path.dirname(file.filepath_out)
-                # os.chmod(dir_path, 0o755)
-                os.chown(dir_path, config.SANDBOX_USER_UID, config.SANDBOX_USER_GID)
+        return error
 
+    @classmethod
+    def _diagnostics(cls, run_result: RunResult) -> bool:
+        """Сборка отклонила программу: go build печатает заголовок пакета
+        и завершается с обычным кодом ошибки. Убитая сигналом или OOM
+        сборка и ошибки окружения (нет места, сбой go) — не диагностика"""
+        return (
+            run_result.returncode > 0
+            and not run_result.oom_killed
+            and run_result.stderr.startswith(b'# command-line-arguments\n')
+        )
 
-        except subprocess.TimeoutExpired:
+    @classmethod
+    def _compiled(cls, file: GoFile, key: str, run_result: RunResult) -> Optional[str]:
+        """Разбирает результат сборки: возвращает ошибку компиляции
+        или готовит бинарник к запуску и кладёт его в кеш"""
+        file.compile_usage = run_result.usage
+        if run_result.timeout:
+            metrics.COMPILE_TIMEOUTS.inc()
             error = messages.MSG_1
+        else:
+            error = run_result.stderr.decode(errors='replace')
+            if error:
+                metrics.COMPILE_ERRORS.inc()
+            file.compile_diagnostics = cls._diagnostics(run_result)
+
+        # бинарник попадает в кеш до того, как его можно запустить,
+        # а пользователю песочницы достаётся только право на запуск
+        if not error and config.ARTIFACT_CACHE_ENABLED:
+            artifacts.put(key, file.filepath_out)
+        if not error and not cls._memfd():
+            # из memfd программа запускается по дескриптору, права на файл не нужны
+            os.chmod(file.filepath_out, stat.S_IRWXU | stat.S_IXGRP | stat.S_IXOTH)
+
+        return clean_error(error or None)
+
+    @classmethod
+    @metrics.EXECUTE.time()
+    def _execute(
+        cls,
+        file: GoFile,
+        data_in: Optional[str] = None,
+        data_in_path: Optional[str] = None
+    ) -> ExecuteResult:
+        """Запускает скомпилированный Go-бинарник. Ввод — строка data_in
+        или файл data_in_path, который становится stdin программы.
+        Одновременно идёт не больше EXECUTE_WORKERS запусков,
+        при EXECUTE_CPUS каждый привязан к своим ядрам,
+        при CGROUP_ROOT каждый идёт в своей cgroup"""
+        with stages.EXECUTE.slot(), cpu_slots.slot() as cpus:
+            with cgroups.leaf('execute', cpus) as leaf:
+                return cls._execute_now(file, data_in, data_in_path, cpus, leaf)
+
+    @classmethod
+    def _execute_now(
+        cls,
+        file: GoFile,
+        data_in: Optional[str] = None,
+        data_in_path: Optional[str] = None,
+        cpus: Optional[CpuSet] = None,
+        leaf: Optional[Leaf] = None
+    ) -> ExecuteResult:
+        if config.RUNNER_SOCKET:
+            try:
+                return cls._execute_in_runner(file, data_in, data_in_path, cpus, leaf)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # демон запуска недоступен — запускаем сами
+                pass
+
+        try:
+            with cls._stdin(data_in_path) as stdin, cls._execute_launch(cpus, leaf) as launch:
+                pid, *fds = process.spawn(
+                    args=[file.executable],
+                    env=run_env(go_env(cpus)),
+                    launch=launch,
+                    stdin=stdin,
+                    pass_fds=cls._pass_fds(file)
+                )
+            run_result = process.communicate(
+                pid,
+                *fds,
+                data_in=data_in.encode() if data_in is not None else None,
+                timeout=config.WALL_TIME_LIMIT,
+                stdout_limit=config.STDOUT_LIMIT,
+                stderr_limit=config.STDERR_LIMIT
+            )
+            if leaf is not None:
+                run_result = leaf.result(run_result)
         except Exception as ex:
-            raise exceptions.CompileException(details=str(ex))
+            raise exceptions.ExecutionException(details=str(ex))
+        return cls._execute_result(run_result)
+
+    @classmethod
+    @contextmanager
+    def _stdin(cls, data_in_path: Optional[str]) -> Iterator[Optional[int]]:
+        """Файл ввода теста, открытый для stdin программы"""
+        if not data_in_path:
+            yield None
+            return
+        stdin = os.open(data_in_path, os.O_RDONLY)
+        try:
+            yield stdin
         finally:
-            if 'proc' in locals():
-                proc.kill()
+            os.close(stdin)
 
-        return clean_error(error)
+    @classmethod
+    def _pass_fds(cls, file: GoFile) -> Tuple[int, ...]:
+        # /proc/self/fd/N должен быть открыт в момент exec
+        return (file.image_fd,) if file.image_fd is not None else ()
 
     @classmethod
-    def _execute(
+    def _execute_in_runner(
         cls,
         file: GoFile,
-        data_in: Optional[str] = None
+        data_in: Optional[str] = None,
+        data_in_path: Optional[str] = None,
+        cpus: Optional[CpuSet] = None,
+        leaf: Optional[Leaf] = None
     ) -> ExecuteResult:
-        """Запускает скомпилированный Go-бинарник"""
-
-        proc = subprocess.Popen(
-            args=[file.filepath_out],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            preexec_fn=cls._preexec_fn(),
-            text=True
-        )
+        """Запускает бинарник через демон запуска"""
+        stdin = None
         try:
-            result, error = proc.communicate(
-                input=data_in,
-                timeout=config.TIMEOUT
+            if data_in_path:
+                stdin = open(data_in_path, 'rb')
+            run_result = RunnerClient(config.RUNNER_SOCKET).run(
+                args=[file.filepath_out],
+                data_in=data_in.encode() if data_in is not None else None,
+                timeout=config.WALL_TIME_LIMIT,
+                stdout_limit=config.STDOUT_LIMIT,
+                stderr_limit=config.STDERR_LIMIT,
+                stdin=stdin,
+                cpus=cpus,
+                env=go_env(cpus),
+                rlimits=cls._rlimits(),
+                cgroup=leaf.path if leaf else None
             )
-        except subprocess.TimeoutExpired:
-            result, error = None, messages.MSG_1
+            if leaf is not None:
+                run_result = leaf.result(run_result)
+        except (FileNotFoundError, ConnectionRefusedError):
+            raise
         except Exception as ex:
             raise exceptions.ExecutionException(details=str(ex))
         finally:
-            proc.kill()
+            if stdin is not None:
+                stdin.close()
+        return cls._execute_result(run_result)
+
+    @classmethod
+    def _limit_exceeded(cls, run_result: RunResult) -> Optional[str]:
+        """Какой лимит превысила программа: cpu, wall или memory"""
+        if run_result.oom_killed:
+            return 'memory'
+        usage = run_result.usage
+        # SIGKILL без таймаута и переполнения вывода присылает только
+        # ядро по RLIMIT_CPU (OOM в cgroup проверен выше); учёт времени потиковый, так что usage
+        # может оказаться чуть меньше лимита
+        killed = (
+            run_result.returncode == -signal.SIGKILL
+            and not run_result.timeout
+            and not run_result.output_exceeded
+        )
+        cpu_time = usage.user_time + usage.system_time if usage else 0
+        if killed or cpu_time >= config.CPU_TIME_LIMIT:
+            return 'cpu'
+        if run_result.timeout:
+            return 'wall'
+        # ru_maxrss после fork/posix_spawn включает память воркера,
+        # поэтому нехватку памяти видно только по сообщению рантайма
+        if config.MEMORY_LIMIT > 0 and run_result.returncode and OUT_OF_MEMORY.search(run_result.stderr):
+            return 'memory'
+        return None
 
+    @classmethod
+    def _execute_result(cls, run_result: RunResult) -> ExecuteResult:
+        limit = cls._limit_exceeded(run_result)
+        if limit:
+            metrics.LIMITS_EXCEEDED.labels(limit).inc()
+            if limit == 'wall':
+                metrics.EXECUTE_TIMEOUTS.inc()
+            result, error = None, LIMIT_MESSAGES[limit]
+        elif run_result.output_exceeded:
+            result = process.truncate(
+                run_result.stdout,
+                config.OUTPUT_KEEP
+            ).decode(errors='replace')
+            error = messages.MSG_12
+        else:
+            result = run_result.stdout.decode(errors='replace')
+            error = run_result.stderr.decode(errors='replace')
         return ExecuteResult(
             result=clean_str(result or None),
-            error=clean_error(error or None)
+            error=clean_error(error or None),
+            usage=run_result.usage
         )
 
+    @classmethod
+    def _execute_many(
+        cls,
+        file: GoFile,
+        tests: List[TestData],
+        pool: Optional[Executor] = None
+    ) -> Iterator[ExecuteResult]:
+        """Запускает бинарник на всех тестах параллельно (в общем пуле,
+        если он передан). Результаты отдаются в порядке тестов."""
+        if not tests:
+            return
+        own_pool = pool is None
+        if own_pool:
+            pool = ThreadPoolExecutor(
+                max_workers=max(1, min(config.TEST_WORKERS, len(tests)))
+            )
+        futures = [
+            pool.submit(
+                cls._execute,
+                file=file,
+                data_in=test.data_in,
+                data_in_path=test.data_in_path
+            )
+            for test in tests
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            if own_pool:
+                pool.shutdown()
+
     @classmethod
     def _validate_checker_func(cls, checker_func: str):
         if not checker_func.startswith(
@@ -95,62 +517,248 @@ class GoService:
             raise exceptions.CheckerException(messages.MSG_3)
 
     @classmethod
-    def _check(cls, checker_func: str, **checker_func_vars) -> bool:
+    def _load_checker(cls, checker_func: str) -> Checker:
+        """Проверяет и компилирует checker-функцию (с кешированием)"""
         cls._validate_checker_func(checker_func)
         try:
-            exec(
-                checker_func + '\nresult = checker(right_value, value)',
-                globals(),
-                checker_func_vars
+            return checkers.get(checker_func, namespace=globals())
+        except Exception as ex:
+            metrics.CHECKER_EXCEPTIONS.inc()
+            raise exceptions.CheckerException(
+                message=messages.MSG_5,
+                details=str(ex)
             )
+
+    @classmethod
+    @metrics.CHECK.time()
+    def _check(
+        cls,
+        checker_func: Union[str, Checker],
+        right_value: Optional[str],
+        value: Optional[str]
+    ) -> bool:
+        if isinstance(checker_func, str):
+            checker_func = cls._load_checker(checker_func)
+        try:
+            result = checker_func(right_value, value)
         except Exception as ex:
+            metrics.CHECKER_EXCEPTIONS.inc()
             raise exceptions.CheckerException(
                 message=messages.MSG_5,
                 details=str(ex)
             )
-        else:
-            result = checker_func_vars['result']
-            if not isinstance(result, bool):
-                raise exceptions.CheckerException(messages.MSG_4)
-            return result
+        if not isinstance(result, bool):
+            raise exceptions.CheckerException(messages.MSG_4)
+        return result
 
     @classmethod
     def debug(cls, data: DebugData) -> DebugData:
         """Компиляция и отладочный запуск"""
+        data.error = cls._cached_error(data.code)
+        if data.error:
+            return data
         file = GoFile(data.code)
-        error = cls._compile(file)
-        if error:
-            data.error = error
+        try:
+            error = cls._compile(file)
+            if error:
+                data.error = error
+            else:
+                exec_result = cls._execute(
+                    file=file,
+                    data_in=data.data_in
+                )
+                data.result = exec_result.result
+                data.error = exec_result.error
+                data.usage = exec_result.usage
+            data.compile_usage = file.compile_usage
+        finally:
+            file.remove()
+        return data
+
+    @classmethod
+    def _schedule(cls, data: TestsData) -> List[int]:
+        """Порядок запуска тестов: как в запросе или сначала дешёвые
+        (оценка стоимости — размер консольного ввода)"""
+        order = list(range(len(data.tests)))
+        if data.order == TestsData.ORDER_COST:
+            order.sort(key=lambda i: cls._input_size(data.tests[i]))
+        return order
+
+    @classmethod
+    def _input_size(cls, test: TestData) -> int:
+        if test.data_in_path:
+            return os.path.getsize(test.data_in_path)
+        return len(test.data_in or '')
+
+    @classmethod
+    @contextmanager
+    def _data_out(cls, test: TestData, mapped: bool = False):
+        """Правильный ответ теста. Для сохранённых наборов он читается
+        из файла, а встроенным checker-функциям (mapped) отдаётся mmap"""
+        if not test.data_out_path:
+            yield test.data_out
+        elif not mapped:
+            with open(test.data_out_path, encoding='utf-8') as f:
+                yield f.read()
         else:
-            exec_result = cls._execute(
-                file=file,
-                data_in=data.data_in
+            with open(test.data_out_path, 'rb') as f:
+                if not os.fstat(f.fileno()).st_size:
+                    # пустой файл не отображается в память
+                    yield b''
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data_out:
+                    yield data_out
+
+    @classmethod
+    def _iter_tests(
+        cls,
+        file: Optional[GoFile],
+        error: Optional[str],
+        data: TestsData,
+        pool: Optional[Executor] = None
+    ) -> Iterator[Tuple[int, TestData]]:
+        """Прогон тестов на уже скомпилированной программе"""
+        data.error = error
+        if data.error:
+            for index, test in enumerate(data.tests):
+                test.error = data.error
+                test.ok = False
+                yield index, test
+            return
+
+        checker = cls._checker(data)
+        order = cls._schedule(data)
+        tests = [data.tests[i] for i in order]
+        exec_results = cls._execute_many(file, tests, pool=pool)
+        done = 0
+        try:
+            for test, exec_result in zip(tests, exec_results):
+                cls._record(data, test, exec_result, checker)
+                done += 1
+                yield order[done - 1], test
+                if cls._stop(data, test):
+                    break
+        finally:
+            exec_results.close()
+        for index in order[done:]:
+            yield index, cls._skip(data.tests[index])
+
+    @classmethod
+    def _checker(cls, data: TestsData) -> Checker:
+        """Встроенная checker-функция по имени или функция из запроса"""
+        if data.checker_name:
+            return builtin(data.checker_name, data.abs_eps, data.rel_eps)
+        return cls._load_checker(data.checker)
+
+    @classmethod
+    def _record(
+        cls,
+        data: TestsData,
+        test: TestData,
+        exec_result: ExecuteResult,
+        checker: Checker
+    ):
+        """Записывает результат запуска в тест и проверяет ответ"""
+        test.result = exec_result.result
+        test.error = exec_result.error
+        test.usage = exec_result.usage
+        with cls._data_out(test, mapped=bool(data.checker_name)) as right_value:
+            test.ok = cls._check(
+                checker_func=checker,
+                right_value=right_value,
+                value=test.result
             )
-            data.result = exec_result.result
-            data.error = exec_result.error
-        file.remove()
-        return data
+
+    @classmethod
+    def _stop(cls, data: TestsData, test: TestData) -> bool:
+        """fail_fast: после непройденного теста остальные пропускаются"""
+        return data.fail_fast and bool(test.error or not test.ok)
+
+    @classmethod
+    def _skip(cls, test: TestData) -> TestData:
+        test.error = messages.MSG_11
+        test.ok = False
+        test.skipped = True
+        return test
+
+    @classmethod
+    def iter_testing(cls, data: TestsData) -> Iterator[Tuple[int, TestData]]:
+        """Компиляция и тестовый запуск с выдачей тестов (и их индексов
+        в запросе) по мере проверки. Ошибка компиляции записывается
+        в data.error до выдачи первого теста"""
+        error = cls._cached_error(data.code)
+        if error:
+            yield from cls._iter_tests(None, error, data)
+            return
+        file = GoFile(data.code)
+        try:
+            error = cls._compile(file)
+            data.compile_usage = file.compile_usage
+            yield from cls._iter_tests(file, error, data)
+        finally:
+            file.remove()
 
     @classmethod
     def testing(cls, data: TestsData) -> TestsData:
         """Компиляция и тестовый запуск"""
-        file = GoFile(data.code)
-        error = cls._compile(file)
-        for test in data.tests:
-            if error:
-                test.error = error
-                test.ok = False
-            else:
-                exec_result = cls._execute(
-                    file=file,
-                    data_in=test.data_in
-                )
-                test.result = exec_result.result
-                test.error = exec_result.error
-                test.ok = cls._check(
-                    checker_func=data.checker,
-                    right_value=test.data_out,
-                    value=test.result
-                )
-        file.remove()
-        return data
\ No newline at end of file
+        for _ in cls.iter_testing(data):
+            pass
+        return data
+
+    @classmethod
+    def _batch_compile(
+        cls,
+        code: str,
+        pool: Executor
+    ) -> Tuple[Optional[GoFile], Optional[str]]:
+        error = cls._cached_error(code)
+        if error:
+            return None, error
+        file = GoFile(code)
+        try:
+            return file, pool.submit(cls._compile, file).result()
+        except BaseException:
+            file.remove()
+            raise
+
+    @classmethod
+    def _batch_item(cls, shared: SharedFile, data: TestsData, pool: Executor):
+        try:
+            file, error = shared.acquire(lambda code: cls._batch_compile(code, pool))
+            data.compile_usage = file.compile_usage if file else None
+            for _ in cls._iter_tests(file, error, data, pool=pool):
+                pass
+        finally:
+            shared.release()
+
+    @classmethod
+    def batch(cls, data: BatchData) -> BatchData:
+        """Пакетный тестовый прогон: одинаковый код компилируется
+        один раз, компиляция и запуски всех элементов делят общий пул.
+        Элементы идут группами по коду, и файл группы удаляется, как
+        только её последний элемент закончен, поэтому одновременно
+        живут не больше BATCH_WORKERS рабочих каталогов (плюс те, чьи
+        элементы ещё досчитываются).
+        Ошибки сервиса записываются в data.errors по индексу элемента"""
+        groups: Dict[str, List[int]] = {}
+        for index, item in enumerate(data.items):
+            groups.setdefault(item.code, []).append(index)
+        futures: Dict[int, Future] = {}
+        exec_pool = ThreadPoolExecutor(max_workers=config.TEST_WORKERS)
+        items_pool = ThreadPoolExecutor(max_workers=config.BATCH_WORKERS)
+        try:
+            for code, indexes in groups.items():
+                shared = SharedFile(code, users=len(indexes))
+                for index in indexes:
+                    futures[index] = items_pool.submit(
+                        cls._batch_item, shared, data.items[index], exec_pool
+                    )
+            for index in range(len(data.items)):
+                try:
+                    futures[index].result()
+                except exceptions.ServiceException as ex:
+                    data.errors[index] = ex
+        finally:
+            items_pool.shutdown()
+            exec_pool.shutdown()
+        return data
@@ -9,3 +9,12 @@ MSG_5 = 'Invalid checker call. See details'
 MSG_6 = 'Unexpected error during code execution. See details'
 MSG_7 = 'Compilation error. See details'
 MSG_8 = 'You need to specify the console input'
+MSG_9 = 'Job queue is full. Try again later'
+MSG_10 = 'Job not found'
+MSG_11 = 'Test skipped: a previous test failed'
+MSG_12 = 'Program output limit exceeded'
+MSG_13 = 'Test set not found'
+MSG_14 = 'Service is overloaded. Try again later'
+MSG_15 = 'Program CPU time limit exceeded'
+MSG_16 = 'Program wall time limit exceeded'
+MSG_17 = 'Program memory limit exceeded'
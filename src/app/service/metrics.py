@@ -0,0 +1,161 @@
+"""Метрики песочницы в формате Prometheus.
+
+Если задан PROMETHEUS_MULTIPROC_DIR, значения каждого воркера gunicorn
+пишутся в mmap-файлы этого каталога и /metrics суммирует их по всем
+воркерам. Каталог должен быть пустым при старте (см. start.sh).
+"""
+import os
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_SECONDS = Histogram(
+    'sandbox_stage_duration_seconds',
+    'Duration of request processing stages',
+    ['stage'],
+    buckets=BUCKETS
+)
+GOFILE_CREATE = STAGE_SECONDS.labels('gofile_create')
+GOFILE_REMOVE = STAGE_SECONDS.labels('gofile_remove')
+COMPILE = STAGE_SECONDS.labels('compile')
+EXECUTE = STAGE_SECONDS.labels('execute')
+CHECK = STAGE_SECONDS.labels('check')
+SCHEMA_LOAD = STAGE_SECONDS.labels('schema_load')
+SCHEMA_DUMP = STAGE_SECONDS.labels('schema_dump')
+
+STAGE_WORKERS = Gauge(
+    'sandbox_stage_workers',
+    'Tasks a stage runs at once',
+    ['stage'],
+    multiprocess_mode='livesum'
+)
+STAGE_TASK_SECONDS = Gauge(
+    'sandbox_stage_task_seconds',
+    'Moving average of a stage task duration, used for Retry-After',
+    ['stage'],
+    multiprocess_mode='livemax'
+)
+STAGE_WAIT_SECONDS = Histogram(
+    'sandbox_stage_wait_seconds',
+    'Time spent in a stage queue waiting for a free slot',
+    ['stage'],
+    buckets=BUCKETS
+)
+STAGE_QUEUE_LENGTH = Gauge(
+    'sandbox_stage_queue_length',
+    'Tasks waiting in a stage queue',
+    ['stage'],
+    multiprocess_mode='livesum'
+)
+STAGE_ACTIVE = Gauge(
+    'sandbox_stage_active',
+    'Tasks currently running in a stage',
+    ['stage'],
+    multiprocess_mode='livesum'
+)
+ADMISSION_REJECTED = Counter(
+    'sandbox_admission_rejected_total',
+    'Requests rejected with 429 because a stage queue was full',
+    ['stage']
+)
+
+COMPILE_ERRORS = Counter(
+    'sandbox_compile_errors_total',
+    'Programs rejected by the compiler'
+)
+COMPILES_COALESCED = Counter(
+    'sandbox_compiles_coalesced_total',
+    'Compilations served by an identical compilation already in flight'
+)
+TIMEOUTS = Counter(
+    'sandbox_timeouts_total',
+    'Compilations and runs stopped by TIMEOUT',
+    ['stage']
+)
+COMPILE_TIMEOUTS = TIMEOUTS.labels('compile')
+EXECUTE_TIMEOUTS = TIMEOUTS.labels('execute')
+LIMITS_EXCEEDED = Counter(
+    'sandbox_limits_exceeded_total',
+    'Runs stopped by a resource limit',
+    ['limit']
+)
+CHECKER_EXCEPTIONS = Counter(
+    'sandbox_checker_exceptions_total',
+    'Checker functions that failed to load or raised'
+)
+WORKSPACES_SIZE = Gauge(
+    'sandbox_workspaces',
+    'Pre-created workspace directories in the pool',
+    multiprocess_mode='livesum'
+)
+WORKSPACES_LEASED = Gauge(
+    'sandbox_workspaces_leased',
+    'Workspace directories currently leased, including overflow',
+    multiprocess_mode='livesum'
+)
+WORKSPACE_OVERFLOWS = Counter(
+    'sandbox_workspace_overflows_total',
+    'Leases served by a temporary directory because the pool was empty'
+)
+WORKSPACE_CLEANUP_ERRORS = Counter(
+    'sandbox_workspace_cleanup_errors_total',
+    'Workspace directories that could not be scrubbed and were leaked'
+)
+CPU_SLOTS_SHARED = Counter(
+    'sandbox_cpu_slots_shared_total',
+    'Runs that shared a CPU slot because every slot was busy'
+)
+CGROUP_FALLBACKS = Counter(
+    'sandbox_cgroup_fallbacks_total',
+    'Runs started without their own cgroup because it could not be created'
+)
+CACHE_LOOKUPS = Counter(
+    'sandbox_cache_lookups_total',
+    'Cache lookups by result (hit or miss)',
+    ['cache', 'result']
+)
+CACHE_EVICTIONS = Counter(
+    'sandbox_cache_evictions_total',
+    'Entries evicted from a cache to stay within its limits',
+    ['cache']
+)
+CHECKER_COMPILE_SECONDS = Counter(
+    'sandbox_checker_compile_seconds_total',
+    'Time spent compiling checker functions on cache misses'
+)
+MEMFD_IMAGES = Gauge(
+    'sandbox_memfd_images',
+    'Compiled binaries held in sealed memfds for execution',
+    multiprocess_mode='livesum'
+)
+MEMFD_IMAGE_BYTES = Gauge(
+    'sandbox_memfd_image_bytes',
+    'Total size of binaries held in sealed memfds',
+    multiprocess_mode='livesum'
+)
+
+
+def cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def render() -> bytes:
+    """Текстовый формат Prometheus, в multiprocess-режиме — по всем воркерам"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
@@ -0,0 +1,407 @@
+import os
+import math
+import time
+import signal
+import resource
+import asyncio
+import shutil
+import selectors
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.entities import Usage
+from app.service import launcher
+
+RunResult = namedtuple(
+    'RunResult',
+    ('stdout', 'stderr', 'returncode', 'timeout', 'usage', 'output_exceeded', 'oom_killed'),
+    defaults=(False, False)
+)
+
+# ограничения программы, которые до exec ставит sandbox-launch:
+# лимиты ядра (см. rlimits), ядра процессора, открытый на запись
+# cgroup.procs и пользователь (uid, gid)
+Launch = namedtuple(
+    'Launch',
+    ('rlimits', 'cpus', 'cgroup', 'user'),
+    defaults=((), None, None, None)
+)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def spawn(
+    args: List[str],
+    env: Optional[Dict[str, str]] = None,
+    launch: Optional[Launch] = None,
+    stdin: Optional[int] = None,
+    pass_fds: Tuple[int, ...] = ()
+) -> Tuple[int, Optional[int], int, int]:
+    """Запускает программу в отдельной сессии через posix_spawnp.
+    С launch программа стартует через sandbox-launch (см. launcher.py):
+    он ставит себе cgroup, ядра, лимиты ядра и пользователя и делает
+    exec, так что fork с preexec_fn в многопоточном процессе не нужен.
+    Ошибка до exec приходит по отдельному каналу и поднимается как OSError.
+    Возвращает pid и дескрипторы stdin (запись), stdout и stderr (чтение).
+    Если передан дескриптор stdin (например, открытый файл), программа
+    читает прямо из него, и вместо дескриптора записи возвращается None.
+    pass_fds — дескрипторы, которые останутся открытыми в программе
+    (например, memfd, из которого она запускается).
+    Дожидаться процесса должен вызывающий (см. communicate)"""
+    env = os.environ if env is None else env
+    if stdin is None:
+        stdin_r, stdin_w = os.pipe()
+    else:
+        stdin_r, stdin_w = os.dup(stdin), None
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    err_r, err_w = os.pipe() if launch is not None else (None, None)
+    program = args[0]
+    try:
+        if launch is not None:
+            program = shutil.which(program, path=env.get('PATH')) or program
+            args = launcher.command(launch, [program, *args[1:]], err_w)
+            pass_fds = (*pass_fds, err_w)
+            if launch.cgroup is not None:
+                pass_fds = (*pass_fds, launch.cgroup)
+        pid = os.posix_spawnp(
+            args[0],
+            args,
+            env,
+            file_actions=[
+                (os.POSIX_SPAWN_DUP2, stdin_r, 0),
+                (os.POSIX_SPAWN_DUP2, stdout_w, 1),
+                (os.POSIX_SPAWN_DUP2, stderr_w, 2),
+                # dup2 в тот же номер снимает close-on-exec
+                *((os.POSIX_SPAWN_DUP2, fd, fd) for fd in pass_fds),
+            ],
+            setsid=True,
+            # как restore_signals в subprocess: Python игнорирует SIGPIPE
+            setsigdef=(signal.SIGPIPE, signal.SIGXFSZ)
+        )
+        if launch is not None:
+            os.close(err_w)
+            err_w = None
+            error = _read_all(err_r)
+            if error:
+                os.waitpid(pid, 0)
+                raise _launch_error(error, program)
+    except Exception:
+        for fd in (stdin_w, stdout_r, stderr_r):
+            if fd is not None:
+                os.close(fd)
+        raise
+    finally:
+        for fd in (stdin_r, stdout_w, stderr_w, err_r, err_w):
+            if fd is not None:
+                os.close(fd)
+    return pid, stdin_w, stdout_r, stderr_r
+
+
+def _launch_error(error: bytes, program: str) -> OSError:
+    """Ошибка sandbox-launch «errno:шаг:текст»; ошибка exec —
+    как у subprocess (например, FileNotFoundError)"""
+    code, step, message = error.decode(errors='replace').split(':', 2)
+    if step == 'exec' and int(code):
+        return OSError(int(code), os.strerror(int(code)), program)
+    return OSError(f'sandbox-launch: {step}: {message}')
+
+
+def _read_all(fd: int) -> bytes:
+    chunks = []
+    while True:
+        data = os.read(fd, CHUNK_SIZE)
+        if not data:
+            return b''.join(chunks)
+        chunks.append(data)
+
+
+def rlimits(cpu_time: float, data: int = 0) -> List[Tuple[int, int]]:
+    """Лимиты ядра для запуска: процессорное время (RLIMIT_CPU, целые
+    секунды с округлением вверх) и память (RLIMIT_DATA), если data > 0.
+    RLIMIT_DATA считает только доступные на запись частные отображения,
+    поэтому, в отличие от RLIMIT_AS, не задевает адресное пространство,
+    которое рантайм Go резервирует при старте (PROT_NONE, около 1 ГБ).
+    Мягкий предел равен жёсткому: по жёсткому ядро сразу присылает
+    SIGKILL, а SIGXCPU рантайм Go игнорирует"""
+    limits = [(resource.RLIMIT_CPU, max(1, math.ceil(cpu_time)))]
+    if data > 0:
+        limits.append((resource.RLIMIT_DATA, data))
+    return limits
+
+
+def truncate(data: bytes, keep: int) -> bytes:
+    """Оставляет первые и последние keep байт вывода"""
+    if len(data) <= 2 * keep:
+        return data
+    return data[:keep] + b'\n...\n' + data[-keep:]
+
+
+def chain(first: RunResult, second: RunResult) -> RunResult:
+    """Результат двух процессов, запущенных друг за другом:
+    вывод и код возврата второго, время и память — по обоим"""
+    return second._replace(
+        timeout=first.timeout or second.timeout,
+        usage=Usage(
+            wall_time=first.usage.wall_time + second.usage.wall_time,
+            user_time=first.usage.user_time + second.usage.user_time,
+            system_time=first.usage.system_time + second.usage.system_time,
+            max_rss=max(
+                (u.max_rss for u in (first.usage, second.usage) if u.max_rss is not None),
+                default=None
+            ),
+            exit_code=second.usage.exit_code
+        )
+    )
+
+
+def kill(pid: int):
+    """Убивает группу процессов программы"""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _returncode(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class _Input:
+    """Ввод программы, который пишется в stdin по частям"""
+
+    def __init__(self, data: Optional[bytes]):
+        self.data = memoryview(data or b'')
+        self.written = 0
+
+    def write(self, fd: int) -> bool:
+        """Пишет очередную часть; True, когда ввод передан целиком
+        (или программа закрыла stdin)"""
+        try:
+            self.written += os.write(fd, self.data[self.written:self.written + CHUNK_SIZE])
+        except BlockingIOError:
+            return False
+        except BrokenPipeError:
+            self.written = len(self.data)
+        return self.written >= len(self.data)
+
+
+class _Output:
+    """Вывод программы: stdout и stderr с пределами в байтах.
+    Если переданы on_stdout/on_stderr, вывод отдаётся им"""
+
+    def __init__(
+        self,
+        stdout_fd: int,
+        stderr_fd: int,
+        stdout_limit: Optional[int] = None,
+        stderr_limit: Optional[int] = None,
+        on_stdout: Optional[Callable[[bytes], None]] = None,
+        on_stderr: Optional[Callable[[bytes], None]] = None
+    ):
+        self.stdout_fd = stdout_fd
+        self.stderr_fd = stderr_fd
+        self.chunks = {stdout_fd: [], stderr_fd: []}
+        self.callbacks = {stdout_fd: on_stdout, stderr_fd: on_stderr}
+        self.remaining = {stdout_fd: stdout_limit, stderr_fd: stderr_limit}
+        self.exceeded = False
+
+    def add(self, fd: int, data: bytes):
+        """Принимает прочитанное; сверх предела вывод отбрасывается
+        и выставляется exceeded"""
+        limit = self.remaining[fd]
+        if limit is not None:
+            if len(data) > limit:
+                data = data[:limit]
+                self.exceeded = True
+            self.remaining[fd] = limit - len(data)
+        if not data:
+            return
+        if self.callbacks[fd]:
+            self.callbacks[fd](data)
+        else:
+            self.chunks[fd].append(data)
+
+    def result(self, status: int, rusage, started: float, timed_out: bool) -> RunResult:
+        returncode = _returncode(status)
+        return RunResult(
+            stdout=b''.join(self.chunks[self.stdout_fd]),
+            stderr=b''.join(self.chunks[self.stderr_fd]),
+            returncode=returncode,
+            timeout=timed_out,
+            usage=Usage(
+                wall_time=time.monotonic() - started,
+                user_time=rusage.ru_utime,
+                system_time=rusage.ru_stime,
+                # ru_maxrss после fork/posix_spawn включает память родителя
+                # (ядро переносит её при exec), а VmHWM у зомби уже не прочитать
+                max_rss=None,
+                exit_code=returncode
+            ),
+            output_exceeded=self.exceeded
+        )
+
+
+def communicate(
+    pid: int,
+    stdin_fd: Optional[int],
+    stdout_fd: int,
+    stderr_fd: int,
+    data_in: Optional[bytes],
+    timeout: float,
+    on_stdout: Optional[Callable[[bytes], None]] = None,
+    on_stderr: Optional[Callable[[bytes], None]] = None,
+    stdout_limit: Optional[int] = None,
+    stderr_limit: Optional[int] = None
+) -> RunResult:
+    """Передаёт ввод и читает вывод программы до её завершения
+    или истечения timeout. Если переданы on_stdout/on_stderr, вывод
+    отдаётся им по частям и в результат не попадает.
+    Вывод сверх stdout_limit/stderr_limit байт не читается: программа
+    убивается, в результате output_exceeded"""
+    started = time.monotonic()
+    deadline = started + timeout
+    stdin = _Input(data_in)
+    output = _Output(stdout_fd, stderr_fd, stdout_limit, stderr_limit, on_stdout, on_stderr)
+    timed_out = False
+    status, rusage = None, None
+
+    selector = selectors.DefaultSelector()
+    try:
+        if data_in:
+            os.set_blocking(stdin_fd, False)
+            selector.register(stdin_fd, selectors.EVENT_WRITE)
+        elif stdin_fd is not None:
+            os.close(stdin_fd)
+        selector.register(stdout_fd, selectors.EVENT_READ)
+        selector.register(stderr_fd, selectors.EVENT_READ)
+
+        while selector.get_map() and not output.exceeded:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(remaining):
+                fd = key.fd
+                if fd == stdin_fd:
+                    if stdin.write(fd):
+                        selector.unregister(fd)
+                        os.close(fd)
+                    continue
+                data = os.read(fd, CHUNK_SIZE)
+                if not data:
+                    selector.unregister(fd)
+                    os.close(fd)
+                    continue
+                output.add(fd, data)
+
+        while not timed_out and not output.exceeded:
+            waited_pid, waited_status, waited_rusage = os.wait4(pid, os.WNOHANG)
+            if waited_pid:
+                status, rusage = waited_status, waited_rusage
+            elif time.monotonic() >= deadline:
+                timed_out = True
+            else:
+                time.sleep(0.001)
+                continue
+            break
+    finally:
+        kill(pid)
+        for key in list(selector.get_map().values()):
+            os.close(key.fd)
+        selector.close()
+        if status is None:
+            _, status, rusage = os.wait4(pid, 0)
+
+    return output.result(status, rusage, started, timed_out)
+
+
+async def communicate_async(
+    pid: int,
+    stdin_fd: Optional[int],
+    stdout_fd: int,
+    stderr_fd: int,
+    data_in: Optional[bytes],
+    timeout: float,
+    stdout_limit: Optional[int] = None,
+    stderr_limit: Optional[int] = None
+) -> RunResult:
+    """То же, что communicate, но не занимает поток: дескрипторы
+    обслуживает event loop, а завершение программы проверяется
+    через wait4 без блокировки. При отмене задачи программа убивается"""
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    deadline = started + timeout
+    stdin = _Input(data_in)
+    output = _Output(stdout_fd, stderr_fd, stdout_limit, stderr_limit)
+    timed_out = False
+    status, rusage = None, None
+    readers, writers = set(), set()
+    finished = loop.create_future()
+
+    def close(fd: int):
+        if fd in writers:
+            loop.remove_writer(fd)
+            writers.discard(fd)
+        else:
+            loop.remove_reader(fd)
+            readers.discard(fd)
+        os.close(fd)
+        if not readers and not writers and not finished.done():
+            finished.set_result(None)
+
+    def on_writable():
+        if stdin.write(stdin_fd):
+            close(stdin_fd)
+
+    def on_readable(fd: int):
+        try:
+            data = os.read(fd, CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        if not data:
+            close(fd)
+            return
+        output.add(fd, data)
+        if output.exceeded and not finished.done():
+            finished.set_result(None)
+
+    try:
+        if data_in:
+            os.set_blocking(stdin_fd, False)
+            loop.add_writer(stdin_fd, on_writable)
+            writers.add(stdin_fd)
+        elif stdin_fd is not None:
+            os.close(stdin_fd)
+        for fd in (stdout_fd, stderr_fd):
+            os.set_blocking(fd, False)
+            loop.add_reader(fd, on_readable, fd)
+            readers.add(fd)
+
+        try:
+            await asyncio.wait_for(finished, timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+
+        delay = 0.001
+        while not timed_out and not output.exceeded:
+            waited_pid, waited_status, waited_rusage = os.wait4(pid, os.WNOHANG)
+            if waited_pid:
+                status, rusage = waited_status, waited_rusage
+                break
+            if time.monotonic() >= deadline:
+                timed_out = True
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.01)
+    finally:
+        kill(pid)
+        for fd in list(readers | writers):
+            close(fd)
+        if status is None:
+            # после SIGKILL процесс завершается сразу
+            _, status, rusage = os.wait4(pid, 0)
+
+    return output.result(status, rusage, started, timed_out)
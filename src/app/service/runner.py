@@ -0,0 +1,260 @@
+"""Демон запуска программ песочницы.
+
+Запускается отдельным процессом (``python -m app.service.runner``),
+сразу переходит под пользователя песочницы и принимает от веб-воркеров
+запросы на запуск через Unix-сокет. Программы стартуют через
+posix_spawn и sandbox-launch (см. launcher.py), который до exec ставит
+им лимиты ядра, cgroup и ядра процессора, поэтому ни демон, ни
+веб-воркеры не делают fork и могут быть многопоточными.
+
+Протокол — кадры ``<тип:1 байт><длина:4 байта><данные>``.
+Клиент отправляет ``H`` (JSON с args, timeout, лимитами вывода, ядрами cpus,
+добавками к окружению env, лимитами ядра rlimits и флагами cgroup и stdin),
+при cgroup — пустой ``C`` с дескриптором cgroup.procs, при stdin — пустой
+``C`` с дескриптором консольного ввода: файла теста или memfd с вводом.
+Демон не буферизует ввод, программа читает прямо из дескриптора.
+Демон отвечает кадрами ``O`` (stdout) и ``R`` (stderr) по мере вывода
+и завершающим ``X`` (JSON с returncode, timeout, output_exceeded и usage)
+или ``F`` (текст ошибки запуска).
+"""
+import os
+import sys
+import json
+import array
+import socket
+import struct
+import socketserver
+from dataclasses import asdict
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from app import config
+from app.entities import Usage
+from app.service import launcher, process
+from app.service.cgroups import Leaf
+from app.service.cpus import run_env
+from app.service.process import RunResult
+
+HEADER = struct.Struct('>cI')
+
+
+def send_frame(sock: socket.socket, kind: bytes, payload: bytes = b''):
+    sock.sendall(HEADER.pack(kind, len(payload)) + payload)
+
+
+def send_fd(sock: socket.socket, fd: int):
+    """Пустой кадр ``C`` с дескриптором (SCM_RIGHTS)"""
+    sock.sendmsg(
+        [HEADER.pack(b'C', 0)],
+        [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', [fd]))]
+    )
+
+
+def recv_fd(sock: socket.socket) -> int:
+    fds = array.array('i')
+    data, ancdata, _, _ = sock.recvmsg(
+        HEADER.size,
+        socket.CMSG_LEN(fds.itemsize),
+        # дескриптор не должен попасть в программы, запущенные через posix_spawn
+        socket.MSG_CMSG_CLOEXEC
+    )
+    for level, kind, payload in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(payload[:fds.itemsize])
+    kind, _ = HEADER.unpack(data + _recv_exactly(sock, HEADER.size - len(data)))
+    if kind != b'C' or not fds:
+        for fd in fds:
+            os.close(fd)
+        raise ConnectionError('Runner expected a descriptor')
+    return fds[0]
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        data = sock.recv(size - len(buf))
+        if not data:
+            raise ConnectionError('Runner connection closed')
+        buf += data
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[bytes, bytes]:
+    kind, size = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return kind, _recv_exactly(sock, size)
+
+
+class RunnerHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        sock = self.request
+        kind, payload = recv_frame(sock)
+        if kind != b'H':
+            return
+        header = json.loads(payload)
+        cgroup, stdin = None, None
+        try:
+            if header.get('cgroup'):
+                cgroup = recv_fd(sock)
+            if header.get('stdin'):
+                stdin = recv_fd(sock)
+            self._run(sock, header, cgroup, stdin)
+        finally:
+            for fd in (cgroup, stdin):
+                if fd is not None:
+                    os.close(fd)
+
+    def _run(
+        self,
+        sock: socket.socket,
+        header: dict,
+        cgroup: Optional[int],
+        stdin: Optional[int]
+    ):
+        try:
+            pid, *fds = process.spawn(
+                header['args'],
+                env=run_env(header.get('env') or {}),
+                launch=process.Launch(
+                    rlimits=[tuple(limit) for limit in header.get('rlimits') or []],
+                    cpus=header.get('cpus'),
+                    cgroup=cgroup
+                ),
+                stdin=stdin
+            )
+        except OSError as ex:
+            send_frame(sock, b'F', str(ex).encode())
+            return
+        result = process.communicate(
+            pid,
+            *fds,
+            data_in=None,
+            timeout=header['timeout'],
+            on_stdout=lambda data: send_frame(sock, b'O', data),
+            on_stderr=lambda data: send_frame(sock, b'R', data),
+            stdout_limit=header.get('stdout_limit'),
+            stderr_limit=header.get('stderr_limit')
+        )
+        send_frame(sock, b'X', json.dumps({
+            'returncode': result.returncode,
+            'timeout': result.timeout,
+            'output_exceeded': result.output_exceeded,
+            'usage': asdict(result.usage),
+        }).encode())
+
+
+class RunnerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+
+class RunnerClient:
+    """Клиент демона запуска, используется веб-воркерами"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def run(
+        self,
+        args: List[str],
+        data_in: Optional[bytes],
+        timeout: float,
+        stdout_limit: Optional[int] = None,
+        stderr_limit: Optional[int] = None,
+        stdin: Optional[BinaryIO] = None,
+        cpus: Optional[Sequence[int]] = None,
+        env: Optional[Dict[str, str]] = None,
+        rlimits: Optional[List[Tuple[int, int]]] = None,
+        cgroup: Optional[str] = None
+    ) -> RunResult:
+        """Запускает программу в демоне. Ввод — data_in (передаётся
+        в memfd) или файл stdin; демону уходит только дескриптор.
+        cpus — ядра, к которым привязать программу, env — добавки
+        к окружению демона, rlimits — лимиты ядра (см. process.rlimits),
+        cgroup — каталог cgroup, в которую перенести программу
+        (демону передаётся открытый клиентом cgroup.procs)"""
+        stdout, stderr = [], []
+        stdin_fd = stdin.fileno() if stdin is not None else _memfd(data_in)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout + config.RUNNER_TIMEOUT_GRACE)
+                sock.connect(self.path)
+                send_frame(sock, b'H', json.dumps({
+                    'args': args,
+                    'timeout': timeout,
+                    'stdout_limit': stdout_limit,
+                    'stderr_limit': stderr_limit,
+                    'cpus': list(cpus) if cpus else None,
+                    'env': env or {},
+                    'rlimits': rlimits or [],
+                    'cgroup': bool(cgroup),
+                    'stdin': stdin_fd is not None,
+                }).encode())
+                if cgroup:
+                    fd = Leaf(cgroup).open_procs()
+                    try:
+                        send_fd(sock, fd)
+                    finally:
+                        os.close(fd)
+                if stdin_fd is not None:
+                    send_fd(sock, stdin_fd)
+                while True:
+                    kind, payload = recv_frame(sock)
+                    if kind == b'O':
+                        stdout.append(payload)
+                    elif kind == b'R':
+                        stderr.append(payload)
+                    elif kind == b'F':
+                        raise OSError(payload.decode())
+                    elif kind == b'X':
+                        status = json.loads(payload)
+                        return RunResult(
+                            stdout=b''.join(stdout),
+                            stderr=b''.join(stderr),
+                            returncode=status['returncode'],
+                            timeout=status['timeout'],
+                            usage=Usage(**status['usage']),
+                            output_exceeded=status['output_exceeded']
+                        )
+        finally:
+            if stdin is None and stdin_fd is not None:
+                os.close(stdin_fd)
+
+
+def _memfd(data: Optional[bytes]) -> Optional[int]:
+    """memfd с вводом программы, None без ввода"""
+    if not data:
+        return None
+    fd = os.memfd_create('stdin', os.MFD_CLOEXEC)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.lseek(fd, 0, os.SEEK_SET)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def drop_privileges():
+    """Переходит под пользователя песочницы, если запущен от root"""
+    if os.getuid() == 0:
+        os.setgroups([])
+        os.setgid(config.SANDBOX_USER_GID)
+        os.setuid(config.SANDBOX_USER_UID)
+
+
+def serve(path: str):
+    # пользователю песочницы каталог sandbox-launch недоступен на запись,
+    # поэтому он собирается до перехода под него
+    launcher.path()
+    if os.path.exists(path):
+        os.remove(path)
+    server = RunnerServer(path, RunnerHandler)
+    os.chmod(path, 0o600)
+    drop_privileges()
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1] if len(sys.argv) > 1 else config.RUNNER_SOCKET)
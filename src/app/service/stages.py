@@ -0,0 +1,155 @@
+import math
+import time
+import asyncio
+import weakref
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app import config
+from app.service import metrics
+
+
+class Stage:
+    """Этап обработки (компиляция или запуск) со своим пределом
+    одновременных задач и очередью ждущих.
+
+    Задача выполняется в потоке запроса (slot) или в задаче event loop
+    (async_slot), стадия только ограничивает, сколько их идёт сразу:
+    остальные ждут в очереди. Пределы — на воркер gunicorn или uvicorn.
+    Длина очереди и среднее время задачи используются для допуска
+    запросов (см. admission)."""
+
+    def __init__(
+        self,
+        name: str,
+        workers: Callable[[], int],
+        queue_size: Callable[[], int]
+    ):
+        self.name = name
+        self._workers = workers
+        self._queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.duration = 0.0  # скользящее среднее, seconds
+        self._condition = threading.Condition()
+        # asyncio.Condition привязан к event loop, в котором создан
+        self._async_conditions = weakref.WeakKeyDictionary()
+        self._wait_seconds = metrics.STAGE_WAIT_SECONDS.labels(name)
+        self._queue_length = metrics.STAGE_QUEUE_LENGTH.labels(name)
+        self._active = metrics.STAGE_ACTIVE.labels(name)
+        self._workers_gauge = metrics.STAGE_WORKERS.labels(name)
+        self._task_seconds = metrics.STAGE_TASK_SECONDS.labels(name)
+
+    @property
+    def workers(self) -> int:
+        return max(1, self._workers())
+
+    @property
+    def queue_size(self) -> int:
+        return self._queue_size()
+
+    def _report(self):
+        self._queue_length.set(self.waiting)
+        self._active.set(self.active)
+        self._workers_gauge.set(self.workers)
+        self._task_seconds.set(self.duration)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Занимает место на этапе, дожидаясь его в очереди"""
+        queued = time.monotonic()
+        with self._condition:
+            self.waiting += 1
+            self._report()
+            try:
+                while self.active >= self.workers:
+                    self._condition.wait()
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self._report()
+        started = time.monotonic()
+        self._wait_seconds.observe(started - queued)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._finished(started)
+                self._condition.notify()
+
+    def _async_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        condition = self._async_conditions.get(loop)
+        if condition is None:
+            condition = self._async_conditions[loop] = asyncio.Condition()
+        return condition
+
+    def _finished(self, started: float):
+        elapsed = time.monotonic() - started
+        self.active -= 1
+        self.duration = elapsed if not self.duration else 0.8 * self.duration + 0.2 * elapsed
+        self._report()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """То же, что slot, для задач event loop"""
+        queued = time.monotonic()
+        condition = self._async_condition()
+        async with condition:
+            self.waiting += 1
+            self._report()
+            try:
+                await condition.wait_for(lambda: self.active < self.workers)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self._report()
+        started = time.monotonic()
+        self._wait_seconds.observe(started - queued)
+        try:
+            yield
+        finally:
+            async with condition:
+                self._finished(started)
+                condition.notify()
+
+    def full(self) -> bool:
+        return self.waiting >= self.queue_size
+
+    def retry_after(self) -> int:
+        """Через сколько секунд очередь этапа, скорее всего, разойдётся"""
+        return max(1, math.ceil(self.waiting * self.duration / self.workers))
+
+    def stats(self) -> Dict[str, Any]:
+        """Занятость этапа; в metrics она попадает через _report"""
+        with self._condition:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+            }
+
+
+COMPILE = Stage(
+    'compile',
+    workers=lambda: config.COMPILE_WORKERS,
+    queue_size=lambda: config.COMPILE_QUEUE_SIZE
+)
+EXECUTE = Stage(
+    'execute',
+    workers=lambda: config.EXECUTE_WORKERS,
+    queue_size=lambda: config.EXECUTE_QUEUE_SIZE
+)
+STAGES = (COMPILE, EXECUTE)
+
+
+def admission() -> Optional[int]:
+    """None, если запрос можно принять, иначе Retry-After в секундах:
+    очередь одного из этапов заполнена"""
+    full = [stage for stage in STAGES if stage.full()]
+    if not full:
+        return None
+    for stage in full:
+        metrics.ADMISSION_REJECTED.labels(stage.name).inc()
+    return max(stage.retry_after() for stage in full)
+
@@ -0,0 +1,81 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import List, Optional
+
+from app import config
+from app.entities import TestData
+
+
+class TestSetStore:
+    """Наборы тестов на диске, адресуемые хешем содержимого.
+
+    Набор — каталог <id> с файлами <n>.in и <n>.out на каждый тест.
+    Каталог собирается во временном месте и переименовывается атомарно,
+    поэтому повторная загрузка того же набора ничего не меняет.
+    Файлы доступны только воркеру: программа получает свой ввод
+    готовым дескриптором stdin.
+    """
+
+    __test__ = False
+
+    @property
+    def root(self) -> str:
+        return config.TEST_SET_DIR
+
+    @classmethod
+    def key(cls, tests: List[TestData]) -> str:
+        digest = hashlib.sha256()
+        for test in tests:
+            for value in (test.data_in, test.data_out):
+                data = (value or '').encode()
+                digest.update(len(data).to_bytes(8, 'big'))
+                digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, test_set_id: str) -> str:
+        return os.path.join(self.root, test_set_id)
+
+    def put(self, tests: List[TestData]) -> str:
+        """Сохраняет набор и возвращает его id"""
+        test_set_id = self.key(tests)
+        if os.path.isdir(self.path(test_set_id)):
+            return test_set_id
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        tmpdir = tempfile.mkdtemp(dir=self.root, prefix='.tmp-')
+        try:
+            for index, test in enumerate(tests):
+                for suffix, value in (('.in', test.data_in), ('.out', test.data_out)):
+                    with open(os.path.join(tmpdir, f'{index}{suffix}'), 'wb') as f:
+                        f.write((value or '').encode())
+            try:
+                os.rename(tmpdir, self.path(test_set_id))
+            except OSError:
+                # такой же набор уже сохранил другой запрос
+                if not os.path.isdir(self.path(test_set_id)):
+                    raise
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return test_set_id
+
+    def get(self, test_set_id: str) -> Optional[List[TestData]]:
+        """Тесты набора со ссылками на файлы вместо данных,
+        None, если набора нет"""
+        if len(test_set_id) != 64 or not all(c in '0123456789abcdef' for c in test_set_id):
+            return None
+        path = self.path(test_set_id)
+        try:
+            num = sum(1 for name in os.listdir(path) if name.endswith('.in'))
+        except FileNotFoundError:
+            return None
+        return [
+            TestData(
+                data_in_path=os.path.join(path, f'{index}.in'),
+                data_out_path=os.path.join(path, f'{index}.out')
+            )
+            for index in range(num)
+        ]
+
+
+test_sets = TestSetStore()
@@ -0,0 +1,61 @@
+import threading
+import pytest
+from app.service.build import warm_up
+from app.service.runner import RunnerServer, RunnerHandler
+from app.service.cache import compile_errors, images
+
+
+@pytest.fixture(scope='session', autouse=True)
+def go_build_cache(tmp_path_factory):
+    """Общий для всех тестов прогретый GOCACHE,
+    чтобы компиляция stdlib не упиралась в TIMEOUT"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            'app.config.GOCACHE_DIR',
+            str(tmp_path_factory.mktemp('go-build'))
+        )
+        mp.setattr(
+            'app.config.LAUNCHER_DIR',
+            str(tmp_path_factory.mktemp('launcher'))
+        )
+        warm_up()
+        yield
+
+
+@pytest.fixture(scope='session', autouse=True)
+def workspace_dir(tmp_path_factory):
+    """Пул рабочих каталогов — во временном каталоге сессии"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            'app.config.WORKSPACE_DIR',
+            str(tmp_path_factory.mktemp('workspaces'))
+        )
+        yield
+
+
+@pytest.fixture(autouse=True)
+def artifact_cache(tmp_path, mocker):
+    """Каждый тест работает с пустыми кешами бинарников и ошибок"""
+    mocker.patch('app.config.ARTIFACT_CACHE_DIR', str(tmp_path / 'artifacts'))
+    mocker.patch('app.config.ARTIFACT_CACHE_ENABLED', False)
+    mocker.patch('app.config.COMPILE_FLIGHT_DIR', str(tmp_path / 'flights'))
+    compile_errors.clear()
+    images.clear()
+
+
+@pytest.fixture(autouse=True)
+def test_set_dir(tmp_path, mocker):
+    """Сохранённые наборы тестов — во временном каталоге теста"""
+    mocker.patch('app.config.TEST_SET_DIR', str(tmp_path / 'test-sets'))
+
+
+@pytest.fixture()
+def runner_socket(tmp_path):
+    """Демон запуска в потоке теста"""
+    path = str(tmp_path / 'runner.sock')
+    server = RunnerServer(path, RunnerHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,199 @@
+import os
+import time
+import asyncio
+from app.service.aio import AsyncGoService
+from app.service.main import GoService
+from app.service import messages, process
+from app.entities import DebugData, TestsData, TestData
+
+
+def test_debug__ok():
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    var n int\n'
+        '    fmt.Scan(&n)\n'
+        '    fmt.Println(n * 2)\n'
+        '}'
+    )
+    data = DebugData(code=code, data_in='21')
+
+    # act
+    debug_result = asyncio.run(AsyncGoService.debug(data))
+
+    # assert
+    assert debug_result.error is None
+    assert debug_result.result == '42'
+    assert debug_result.usage.exit_code == 0
+    assert debug_result.compile_usage.wall_time > 0
+
+
+def test_debug__compile_error__error():
+
+    # arrange
+    data = DebugData(code='package main\n\nfunc main() {\n    x := 1\n}')
+
+    # act
+    debug_result = asyncio.run(AsyncGoService.debug(data))
+
+    # assert
+    assert 'declared and not used' in debug_result.error
+    assert debug_result.result is None
+
+
+def test_debug__cpu_time_limit__return_error(mocker):
+
+    # arrange
+    mocker.patch('app.config.CPU_TIME_LIMIT', 1)
+    data = DebugData(code='package main\n\nfunc main() {\n    for {\n    }\n}')
+
+    # act
+    debug_result = asyncio.run(AsyncGoService.debug(data))
+
+    # assert
+    assert debug_result.error == messages.MSG_15
+    assert debug_result.result is None
+
+
+def test_testing__fail_fast__others_skipped():
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    var n int\n'
+        '    fmt.Scan(&n)\n'
+        '    fmt.Println(n * 2)\n'
+        '}'
+    )
+    checker = (
+        'def checker(right_value: str, value: str) -> bool:\n'
+        '    return right_value == value'
+    )
+    data = TestsData(
+        code=code,
+        checker=checker,
+        fail_fast=True,
+        tests=[
+            TestData(data_in='1', data_out='2'),
+            TestData(data_in='2', data_out='5'),
+            TestData(data_in='3', data_out='6')
+        ]
+    )
+
+    # act
+    testing_result = asyncio.run(AsyncGoService.testing(data))
+
+    # assert
+    assert [t.ok for t in testing_result.tests] == [True, False, False]
+    assert testing_result.tests[1].result == '4'
+    assert testing_result.tests[2].error == messages.MSG_11
+    assert testing_result.tests[2].skipped is True
+
+
+def test_testing__slow_checker__event_loop_not_blocked(mocker):
+
+    # arrange
+    mocker.patch.object(GoService, '_check', side_effect=lambda **kwargs: time.sleep(0.5) or True)
+    code = 'package main\n\nfunc main() {\n}'
+    data = TestsData(
+        code=code,
+        checker='def checker(right_value: str, value: str) -> bool:\n    return True',
+        tests=[TestData(data_in='', data_out='')]
+    )
+    gaps = []
+
+    async def ticker(task):
+        last = time.monotonic()
+        while not task.done():
+            await asyncio.sleep(0.01)
+            gaps.append(time.monotonic() - last)
+            last = time.monotonic()
+
+    async def main():
+        task = asyncio.ensure_future(AsyncGoService.testing(data))
+        await ticker(task)
+        return await task
+
+    # act
+    testing_result = asyncio.run(main())
+
+    # assert
+    assert testing_result.tests[0].ok is True
+    assert max(gaps) < 0.25
+
+
+def test_testing__slow_cgroup_kill__event_loop_not_blocked(mocker):
+
+    # arrange
+    leaf = mocker.Mock()
+    leaf.result.side_effect = lambda run_result: time.sleep(0.5) or run_result
+    mocker.patch('app.service.cgroups.cgroups.leaf').return_value.__enter__.return_value = leaf
+    mocker.patch.object(GoService, '_launch').return_value.__enter__.return_value = None
+    code = 'package main\n\nfunc main() {\n}'
+    data = TestsData(
+        code=code,
+        checker='def checker(right_value: str, value: str) -> bool:\n    return True',
+        tests=[TestData(data_in='', data_out='')]
+    )
+    gaps = []
+
+    async def ticker(task):
+        last = time.monotonic()
+        while not task.done():
+            await asyncio.sleep(0.01)
+            gaps.append(time.monotonic() - last)
+            last = time.monotonic()
+
+    async def main():
+        task = asyncio.ensure_future(AsyncGoService.testing(data))
+        await ticker(task)
+        return await task
+
+    # act
+    testing_result = asyncio.run(main())
+
+    # assert
+    assert testing_result.tests[0].ok is True
+    assert leaf.result.call_count >= 2
+    assert max(gaps) < 0.25
+
+
+def test_debug__cancelled__program_killed(mocker):
+
+    # arrange
+    spawn = mocker.spy(process, 'spawn')
+    data = DebugData(code='package main\n\nfunc main() {\n    for {\n    }\n}')
+
+    async def debug_and_cancel():
+        task = asyncio.ensure_future(AsyncGoService.debug(data))
+        # компиляция и go build тоже процессы: ждём запуска программы
+        while not any(c.kwargs.get('launch') for c in spawn.call_args_list):
+            await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    # act
+    cancelled = asyncio.run(debug_and_cancel())
+
+    # assert
+    assert cancelled is True
+    pid = spawn.spy_return_list[-1][0]
+    try:
+        os.kill(pid, 0)
+        alive = True
+    except ProcessLookupError:
+        alive = False
+    assert alive is False
@@ -0,0 +1,208 @@
+import os
+import subprocess
+import pytest
+from app.service import build
+
+
+def make_cache_file(root, name: str, size: int, mtime: int) -> str:
+    path = root / name[:2] / name
+    path.parent.mkdir(exist_ok=True)
+    path.write_bytes(b'x' * size)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_build_env__managed_gocache(mocker):
+
+    # arrange
+    mocker.patch('app.config.GOCACHE_DIR', '/sandbox/cache/go-build')
+
+    # act
+    env = build.build_env()
+
+    # assert
+    assert env['GOCACHE'] == '/sandbox/cache/go-build'
+    assert env['PATH'] == os.environ['PATH']
+
+
+def test_trim__over_max_size__remove_oldest(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.GOCACHE_DIR', str(tmp_path))
+    mocker.patch('app.config.GOCACHE_MAX_SIZE', 100)
+    oldest = make_cache_file(tmp_path, 'aa-d', size=50, mtime=1)
+    old = make_cache_file(tmp_path, 'bb-d', size=30, mtime=2)
+    recent = make_cache_file(tmp_path, 'cc-d', size=40, mtime=3)
+
+    # act
+    removed = build.trim()
+
+    # assert
+    assert removed == 50
+    assert not os.path.exists(oldest)
+    assert os.path.exists(old)
+    assert os.path.exists(recent)
+
+
+def test_trim__under_max_size__keep_all(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.GOCACHE_DIR', str(tmp_path))
+    mocker.patch('app.config.GOCACHE_MAX_SIZE', 100)
+    path = make_cache_file(tmp_path, 'aa-d', size=50, mtime=1)
+
+    # act
+    removed = build.trim()
+
+    # assert
+    assert removed == 0
+    assert os.path.exists(path)
+
+
+def test_maybe_trim__interval__trim_once(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.GOCACHE_DIR', str(tmp_path))
+    trim_mock = mocker.patch('app.service.build.trim', return_value=0)
+
+    # act
+    build.maybe_trim()
+    build.maybe_trim()
+
+    # assert
+    trim_mock.assert_called_once()
+
+
+def test_warm_up__set_ready_and_skip_second_run(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.GOCACHE_DIR', str(tmp_path))
+    run_mock = mocker.patch('subprocess.run')
+    mocker.patch.object(build, 'ready', build.threading.Event())
+
+    # act
+    build.warm_up()
+    build.warm_up()
+
+    # assert
+    assert build.ready.is_set()
+    assert run_mock.call_count == len(build.WARMUP_PROGRAMS)
+    for args in run_mock.call_args_list:
+        assert args.kwargs['env']['GOCACHE'] == str(tmp_path)
+
+
+def test_warm_up__build_failed__not_ready(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.GOCACHE_DIR', str(tmp_path))
+    mocker.patch('subprocess.run', side_effect=subprocess.TimeoutExpired('go', 120))
+    mocker.patch.object(build, 'ready', build.threading.Event())
+
+    # act
+    with pytest.raises(subprocess.TimeoutExpired):
+        build.warm_up()
+
+    # assert
+    assert not build.ready.is_set()
+    assert not any(name.startswith('.sandbox-warm-') for name in os.listdir(tmp_path))
+
+
+def test_keep_warming__failed__retry(mocker):
+
+    # arrange
+    mocker.patch('app.config.WARMUP_RETRY_INTERVAL', 5)
+    warm_up_mock = mocker.patch(
+        'app.service.build.warm_up',
+        side_effect=[OSError('go: not found'), None]
+    )
+    sleep_mock = mocker.patch('time.sleep')
+
+    # act
+    build.keep_warming()
+
+    # assert
+    assert warm_up_mock.call_count == 2
+    sleep_mock.assert_called_once_with(5)
+
+
+def test_trim__importcfg_exports__keep(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.GOCACHE_DIR', str(tmp_path))
+    mocker.patch('app.config.GOCACHE_MAX_SIZE', 10)
+    export = make_cache_file(tmp_path, 'aa-d', size=50, mtime=1)
+    other = make_cache_file(tmp_path, 'bb-d', size=50, mtime=2)
+    (tmp_path / '.sandbox-importcfg-go1.21-0').write_text(
+        f'packagefile fmt={export}\n'
+    )
+
+    # act
+    build.trim()
+
+    # assert
+    assert os.path.exists(export)
+    assert not os.path.exists(other)
+
+
+def test_imports__single_and_grouped():
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        'import (\n'
+        '    "bufio"\n'
+        '    m "math"\n'
+        '    _ `os`\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Println("import \\"net\\"")\n'
+        '}'
+    )
+
+    # act
+    paths = build.imports(code)
+
+    # assert
+    assert paths == {'fmt', 'bufio', 'math', 'os'}
+
+
+def test_direct_supported__std_only():
+
+    # arrange
+    tools = build.Toolchain('compile', 'link', 'importcfg', frozenset({'fmt'}))
+
+    # act
+    std = build.direct_supported('package main\nimport "fmt"\n', tools)
+    cgo = build.direct_supported('package main\nimport "C"\n', tools)
+    embed = build.direct_supported(
+        'package main\nimport _ "fmt"\n//go:embed x\nvar x string\n',
+        tools
+    )
+
+    # assert
+    assert std is True
+    assert cgo is False
+    assert embed is False
+
+
+def test_toolchain__importcfg_once(mocker):
+
+    # arrange
+    mocker.patch('app.config.BUILD_DIRECT_PACKAGES', 'fmt')
+    mocker.patch.dict('app.service.build._toolchains', clear=True)
+    write_spy = mocker.spy(build, '_write_importcfg')
+
+    # act
+    tools = build.toolchain()
+    build._toolchains.clear()
+    tools_again = build.toolchain()
+
+    # assert
+    assert write_spy.call_count == 1
+    assert tools == tools_again
+    assert {'fmt', 'runtime'} <= tools.packages
+    assert os.path.exists(tools.compile)
+    assert os.path.exists(tools.importcfg)
@@ -0,0 +1,401 @@
+import os
+import errno
+import pytest
+from prometheus_client import REGISTRY
+from app.entities import DebugData, Usage
+from app.service.cache import ArtifactCache, CompileErrorCache, ImageCache
+from app.service import cache, entities
+from app.service.entities import GoFile
+from app.service.flights import flights
+from app.service.main import GoService
+from app.service.process import RunResult
+
+
+def lookups(cache: str, result: str) -> float:
+    return REGISTRY.get_sample_value(
+        'sandbox_cache_lookups_total',
+        {'cache': cache, 'result': result}
+    ) or 0.0
+
+
+def make_artifact(tmp_path, name: str, size: int = 10) -> str:
+    path = tmp_path / name
+    path.write_bytes(b'x' * size)
+    return str(path)
+
+
+def test_key__depends_on_code_and_settings():
+
+    # act
+    key = ArtifactCache.key('code', 'go1.23')
+
+    # assert
+    assert key == ArtifactCache.key('code', 'go1.23')
+    assert key != ArtifactCache.key('other code', 'go1.23')
+    assert key != ArtifactCache.key('code', 'go1.22')
+
+
+def test_get__miss__return_none(tmp_path):
+
+    # arrange
+    cache = ArtifactCache()
+    hits, misses = lookups('artifacts', 'hit'), lookups('artifacts', 'miss')
+
+    # act
+    path = cache.get('missing', str(tmp_path / 'main.out'))
+
+    # assert
+    assert path is None
+    assert lookups('artifacts', 'hit') == hits
+    assert lookups('artifacts', 'miss') == misses + 1
+
+
+def test_put__then_get__hit(tmp_path):
+
+    # arrange
+    cache = ArtifactCache()
+    artifact = make_artifact(tmp_path, 'main.out')
+    hits = lookups('artifacts', 'hit')
+
+    # act
+    cache.put('key', artifact)
+    path = cache.get('key', str(tmp_path / 'leased.out'))
+
+    # assert
+    assert path == str(tmp_path / 'leased.out')
+    assert open(path, 'rb').read() == b'x' * 10
+    assert os.access(path, os.X_OK)
+    assert cache.stats() == {'entries': 1, 'size': 10}
+    assert lookups('artifacts', 'hit') == hits + 1
+
+
+def test_get__evicted_after_get__binary_kept(tmp_path):
+
+    # arrange
+    cache = ArtifactCache()
+    cache.put('key', make_artifact(tmp_path, 'main.out'))
+    path = cache.get('key', str(tmp_path / 'leased.out'))
+
+    # act
+    cache.clear()
+
+    # assert
+    assert cache.stats()['entries'] == 0
+    assert open(path, 'rb').read() == b'x' * 10
+
+
+def test_get__other_filesystem__copy(tmp_path, mocker):
+
+    # arrange
+    cache = ArtifactCache()
+    cache.put('key', make_artifact(tmp_path, 'main.out'))
+    mocker.patch('os.link', side_effect=OSError(errno.EXDEV, 'Invalid cross-device link'))
+
+    # act
+    path = cache.get('key', str(tmp_path / 'leased.out'))
+
+    # assert
+    assert open(path, 'rb').read() == b'x' * 10
+    assert os.stat(path).st_mode & 0o777 == 0o711
+    assert os.stat(path).st_ino != os.stat(cache.path('key')).st_ino
+
+
+def test_get__dst_exists__replace(tmp_path):
+
+    # arrange
+    cache = ArtifactCache()
+    cache.put('key', make_artifact(tmp_path, 'main.out'))
+    dst = tmp_path / 'leased.out'
+    dst.write_bytes(b'stale')
+
+    # act
+    path = cache.get('key', str(dst))
+
+    # assert
+    assert path == str(dst)
+    assert os.stat(path).st_ino == os.stat(cache.path('key')).st_ino
+
+
+def test_get__link_error__miss(tmp_path, mocker):
+
+    # arrange
+    cache = ArtifactCache()
+    cache.put('key', make_artifact(tmp_path, 'main.out'))
+    mocker.patch('os.link', side_effect=OSError(errno.EMLINK, 'Too many links'))
+    misses = lookups('artifacts', 'miss')
+
+    # act
+    path = cache.get('key', str(tmp_path / 'leased.out'))
+
+    # assert
+    assert path is None
+    assert lookups('artifacts', 'miss') == misses + 1
+
+
+def test_put__max_entries__evict_least_recently_used(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.ARTIFACT_CACHE_MAX_ENTRIES', 2)
+    cache = ArtifactCache()
+    artifact = make_artifact(tmp_path, 'main.out')
+    cache.put('first', artifact)
+    cache.put('second', artifact)
+    os.utime(cache.path('first'), (0, 0))
+    os.utime(cache.path('second'), (1, 1))
+    cache.get('first', str(tmp_path / 'first.out'))
+
+    # act
+    cache.put('third', artifact)
+
+    # assert
+    assert os.path.exists(cache.path('first'))
+    assert not os.path.exists(cache.path('second'))
+    assert os.path.exists(cache.path('third'))
+
+
+def test_put__max_size__evict(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.ARTIFACT_CACHE_MAX_SIZE', 25)
+    cache = ArtifactCache()
+    cache.put('first', make_artifact(tmp_path, 'first.out'))
+    os.utime(cache.path('first'), (0, 0))
+
+    # act
+    cache.put('second', make_artifact(tmp_path, 'second.out', size=20))
+
+    # assert
+    assert not os.path.exists(cache.path('first'))
+    assert cache.stats()['size'] == 20
+
+
+def test_compile__cached__use_artifact(mocker):
+
+    # arrange
+    mocker.patch('app.config.ARTIFACT_CACHE_ENABLED', True)
+    code = (
+        'package main\n'
+        '\n'
+        'func main() {\n'
+        '}'
+    )
+    file_1 = GoFile(code)
+    GoService._compile(file_1)
+    popen_mock = mocker.patch('subprocess.Popen')
+    file_2 = GoFile(code)
+
+    # act
+    error = GoService._compile(file_2)
+
+    # assert
+    assert error is None
+    popen_mock.assert_not_called()
+    assert file_2.cached is True
+    # бинарник из кеша лежит в рабочем каталоге запроса
+    assert file_2.filepath_out == os.path.join(file_2.tmpdir, 'main.out')
+    assert os.path.exists(file_2.filepath_out)
+    # исходник нужен только сборке
+    assert not os.path.exists(file_2.filepath_go)
+    # пользователю песочницы — только запуск
+    assert os.stat(file_1.filepath_out).st_mode & 0o777 == 0o711
+    assert os.stat(file_2.filepath_out).st_mode & 0o777 == 0o711
+    file_1.remove()
+    file_2.remove()
+    assert cache.artifacts.stats()['entries'] == 1
+    assert os.listdir(file_2.tmpdir) == []
+
+
+def test_compile__cache_disabled__no_coalescing(mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_COALESCING', True)
+    flight_spy = mocker.spy(flights, 'flight')
+    file = GoFile('package main\n\nfunc main() {\n}')
+
+    # act
+    error = GoService._compile(file)
+
+    # assert
+    assert error is None
+    flight_spy.assert_not_called()
+    file.remove()
+
+
+def test_compile_errors__ttl__expire(mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_ERROR_CACHE_TTL', 60)
+    monotonic_mock = mocker.patch('time.monotonic', return_value=100.0)
+    cache = CompileErrorCache()
+    cache.put('key', 'go1.23', 'undefined: adqeqwd')
+    hits, misses = lookups('compile_errors', 'hit'), lookups('compile_errors', 'miss')
+
+    # act
+    fresh = cache.get('key', 'go1.23')
+    monotonic_mock.return_value = 161.0
+    expired = cache.get('key', 'go1.23')
+
+    # assert
+    assert fresh == 'undefined: adqeqwd'
+    assert expired is None
+    assert cache.stats() == {'size': 0}
+    assert lookups('compile_errors', 'hit') == hits + 1
+    assert lookups('compile_errors', 'miss') == misses + 1
+
+
+def test_compile_errors__max_size__evict_least_recently_used(mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_ERROR_CACHE_SIZE', 2)
+    cache = CompileErrorCache()
+    cache.put('a', 'go1.23', 'error a')
+    cache.put('b', 'go1.23', 'error b')
+    cache.get('a', 'go1.23')
+
+    # act
+    cache.put('c', 'go1.23', 'error c')
+
+    # assert
+    assert cache.get('a', 'go1.23') == 'error a'
+    assert cache.get('b', 'go1.23') is None
+    assert cache.get('c', 'go1.23') == 'error c'
+
+
+def test_compile_errors__toolchain_changed__clear():
+
+    # arrange
+    cache = CompileErrorCache()
+    cache.put('key', 'go1.22', 'error')
+
+    # act
+    error = cache.get('key', 'go1.23')
+
+    # assert
+    assert error is None
+    assert cache.stats()['size'] == 0
+
+
+def test_debug__compile_error_cached__no_gofile(mocker):
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'func main() {\n'
+        '    adqeqwd\n'
+        '}'
+    )
+    first = GoService.debug(DebugData(code=code))
+    gofile_mock = mocker.patch('app.service.main.GoFile', wraps=GoFile)
+
+    # act
+    second = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert 'undefined: adqeqwd' in first.error
+    assert second.error == first.error
+    gofile_mock.assert_not_called()
+
+
+def test_debug__build_crashed__error_not_cached(mocker):
+
+    # arrange
+    build_result = RunResult(
+        stdout=b'',
+        stderr=b'go: error obtaining buildID: signal: killed\n',
+        returncode=1,
+        timeout=False,
+        usage=Usage(wall_time=1, user_time=1, system_time=0, max_rss=None, exit_code=1)
+    )
+    build_mock = mocker.patch.object(GoService, '_build', return_value=build_result)
+    code = 'package main\n\nfunc main() {\n}'
+
+    # act
+    first = GoService.debug(DebugData(code=code))
+    second = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert 'signal: killed' in first.error
+    assert second.error == first.error
+    assert build_mock.call_count == 2
+    assert cache.compile_errors.stats()['size'] == 0
+
+
+def test_images__sealed__write_error(tmp_path):
+
+    # arrange
+    images = ImageCache()
+    fd = images.load(None, make_artifact(tmp_path, 'a.out'))
+
+    # act
+    with pytest.raises(PermissionError):
+        os.write(fd, b'y')
+
+    # assert
+    assert os.pread(fd, 20, 0) == b'x' * 10
+    assert images.stats()['size'] == 0
+    os.close(fd)
+
+
+def test_images__max_size__evict_keep_duplicates(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.MEMFD_CACHE_SIZE', 1)
+    images = ImageCache()
+    fd_a = images.load('a', make_artifact(tmp_path, 'a.out', size=3))
+    hits, misses = lookups('images', 'hit'), lookups('images', 'miss')
+    evictions = REGISTRY.get_sample_value('sandbox_cache_evictions_total', {'cache': 'images'}) or 0.0
+
+    # act
+    images.load('b', make_artifact(tmp_path, 'b.out', size=5))
+
+    # assert
+    assert images.get('a') is None
+    fd_b = images.get('b')
+    assert os.pread(fd_b, 10, 0) == b'x' * 5
+    # выданный до вытеснения дубликат остаётся рабочим
+    assert os.pread(fd_a, 10, 0) == b'x' * 3
+    assert images.stats() == {'size': 1, 'bytes': 5}
+    assert lookups('images', 'hit') == hits + 1
+    assert lookups('images', 'miss') == misses + 1
+    assert REGISTRY.get_sample_value(
+        'sandbox_cache_evictions_total',
+        {'cache': 'images'}
+    ) == evictions + 1
+    os.close(fd_a)
+    os.close(fd_b)
+    images.clear()
+
+
+def test_debug__memfd_image_cached__no_artifact_lookup(mocker):
+
+    # arrange
+    mocker.patch('app.config.ARTIFACT_CACHE_ENABLED', True)
+    mocker.patch('app.config.EXECUTE_MEMFD', True)
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Println("hello")\n'
+        '}'
+    )
+    chmod_mock = mocker.spy(os, 'chmod')
+    first = GoService.debug(DebugData(code=code))
+    get_mock = mocker.spy(cache.artifacts, 'get')
+    lease_mock = mocker.spy(entities.workspaces, 'lease')
+
+    # act
+    second = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert first.result == 'hello'
+    assert second.result == 'hello'
+    assert second.error is None
+    get_mock.assert_not_called()
+    # ни рабочего каталога, ни исходника для программы из образа
+    lease_mock.assert_not_called()
+    # chmod бинарника не нужен, остаётся только подготовка рабочих каталогов
+    assert not [c for c in chmod_mock.call_args_list if c.args[0].endswith('main.out')]
+    assert cache.images.stats()['size'] == 1
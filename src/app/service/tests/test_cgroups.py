@@ -0,0 +1,224 @@
+import os
+import sys
+import time
+import uuid
+import subprocess
+import pytest
+from app.entities import DebugData, Usage
+from app.service import messages, metrics
+from app.service.cgroups import Cgroups, Leaf
+from app.service.main import GoService
+from app.service.process import RunResult
+from app.service.runner import RunnerClient
+
+
+def cgroup2_mount():
+    with open('/proc/mounts') as f:
+        for line in f:
+            _, path, fstype, *_ = line.split()
+            if fstype == 'cgroup2':
+                return path
+    return None
+
+
+@pytest.fixture()
+def cgroup_root(mocker):
+    mount = cgroup2_mount()
+    path = os.path.join(mount or '/nonexistent', f'sandbox-test-{uuid.uuid4().hex}')
+    try:
+        os.mkdir(path)
+    except OSError:
+        pytest.skip('cgroup v2 is not delegated')
+    mocker.patch('app.config.CGROUP_ROOT', path)
+    yield path
+    for name in os.listdir(path):
+        if os.path.isdir(os.path.join(path, name)):
+            Leaf(os.path.join(path, name)).remove()
+    os.rmdir(path)
+
+
+def alive(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+def test_leaf__disabled__none(mocker):
+
+    # arrange
+    mocker.patch('app.config.CGROUP_ROOT', '')
+
+    # act
+    with Cgroups().leaf('execute') as leaf:
+        pass
+
+    # assert
+    assert leaf is None
+
+
+def test_leaf__not_delegated__run_without_cgroup(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.CGROUP_ROOT', str(tmp_path))
+    mocker.patch('app.service.main.cgroups', Cgroups())
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Print("ok")\n'
+        '}'
+    )
+
+    # act
+    with Cgroups().leaf('execute') as leaf:
+        pass
+    debug_result = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert leaf is None
+    assert debug_result.error is None
+    assert debug_result.result == 'ok'
+
+
+def test_leaf__result__usage_from_cgroup(tmp_path):
+
+    # arrange
+    (tmp_path / 'cgroup.events').write_text('populated 0\nfrozen 0\n')
+    (tmp_path / 'cpu.stat').write_text('usage_usec 1500000\nuser_usec 1200000\nsystem_usec 300000\n')
+    (tmp_path / 'memory.peak').write_text(f'{64 * 1024 * 1024}\n')
+    (tmp_path / 'memory.events').write_text('low 0\nhigh 0\nmax 3\noom 1\noom_kill 1\n')
+    run_result = RunResult(
+        stdout=b'',
+        stderr=b'',
+        returncode=-9,
+        timeout=False,
+        usage=Usage(wall_time=2, user_time=0.1, system_time=0, max_rss=500000, exit_code=-9)
+    )
+
+    # act
+    result = Leaf(str(tmp_path)).result(run_result)
+
+    # assert
+    assert result.usage == Usage(wall_time=2, user_time=1.2, system_time=0.3, max_rss=65536, exit_code=-9)
+    assert result.oom_killed is True
+    assert GoService._execute_result(result).error == messages.MSG_17
+
+
+def test_debug__cgroup__ok(cgroup_root, mocker):
+
+    # arrange
+    mocker.patch('app.service.main.cgroups', Cgroups())
+    fallbacks = metrics.CGROUP_FALLBACKS._value.get()
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Print("ok")\n'
+        '}'
+    )
+
+    # act
+    debug_result = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert debug_result.error is None
+    assert debug_result.result == 'ok'
+    assert metrics.CGROUP_FALLBACKS._value.get() == fallbacks
+    assert [
+        name for name in os.listdir(cgroup_root)
+        if os.path.isdir(os.path.join(cgroup_root, name))
+    ] == []
+
+
+def test_debug__cgroup__kill_process_tree(cgroup_root, mocker):
+
+    # arrange
+    mocker.patch('app.service.main.cgroups', Cgroups())
+    # потомок в своей сессии: killpg его не достанет, cgroup.kill — да
+    code = (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "fmt"\n'
+        '    "os/exec"\n'
+        '    "syscall"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    cmd := exec.Command("/bin/sleep", "30")\n'
+        '    cmd.SysProcAttr = &syscall.SysProcAttr{Setsid: true}\n'
+        '    cmd.Start()\n'
+        '    fmt.Print(cmd.Process.Pid)\n'
+        '}'
+    )
+
+    # act
+    debug_result = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert debug_result.error is None
+    assert alive(int(debug_result.result)) is False
+
+
+def test_runner__sandbox_user__program_in_cgroup(cgroup_root, tmp_path):
+
+    # arrange
+    path = str(tmp_path / 'runner.sock')
+    # настоящий демон: после запуска он работает от пользователя без прав на cgroup
+    runner = subprocess.Popen(
+        [sys.executable, '-m', 'app.service.runner', path],
+        env={**os.environ, 'SANDBOX_USER_UID': '65534', 'SANDBOX_USER_GID': '65534'}
+    )
+    while not os.path.exists(path):
+        time.sleep(0.05)
+
+    # act
+    try:
+        with Cgroups().leaf('execute') as leaf:
+            result = RunnerClient(path).run(
+                args=['/bin/sh', '-c', 'id -u; cat /proc/self/cgroup'],
+                data_in=None,
+                timeout=5,
+                cgroup=leaf.path
+            )
+    finally:
+        runner.kill()
+        runner.wait()
+
+    # assert
+    assert result.returncode == 0
+    assert result.stdout.decode().splitlines()[0] == '65534'
+    assert result.stdout.decode().endswith(os.path.basename(leaf.path) + '\n')
+
+
+def test_debug__runner_and_cgroup__ok(cgroup_root, runner_socket, mocker):
+
+    # arrange
+    mocker.patch('app.config.RUNNER_SOCKET', runner_socket)
+    mocker.patch('app.service.main.cgroups', Cgroups())
+    code = (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "fmt"\n'
+        '    "os"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    data, _ := os.ReadFile("/proc/self/cgroup")\n'
+        '    fmt.Print(string(data))\n'
+        '}'
+    )
+
+    # act
+    debug_result = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert debug_result.error is None
+    assert f'{os.path.basename(cgroup_root)}/execute-' in debug_result.result
@@ -0,0 +1,177 @@
+import pytest
+from prometheus_client import REGISTRY
+from app.entities import TestData, TestsData
+from app.service.checkers import CheckerCache, builtin
+from app.service.entities import ExecuteResult
+from app.service.test_sets import test_sets
+from app.service.main import GoService
+from app.service import messages
+from app.service.exceptions import CheckerException
+
+
+checker_func = (
+    'def checker(right_value: str, value: str) -> bool:\n'
+    '    return right_value.strip() == value.strip()'
+)
+
+
+def lookups(cache: str, result: str) -> float:
+    return REGISTRY.get_sample_value(
+        'sandbox_cache_lookups_total',
+        {'cache': cache, 'result': result}
+    ) or 0.0
+
+
+def test_get__same_source__compiled_once():
+
+    # arrange
+    cache = CheckerCache()
+    hits, misses = lookups('checkers', 'hit'), lookups('checkers', 'miss')
+    compile_time = REGISTRY.get_sample_value('sandbox_checker_compile_seconds_total')
+
+    # act
+    checker_1 = cache.get(checker_func, namespace={})
+    checker_2 = cache.get(checker_func, namespace={})
+
+    # assert
+    assert checker_1 is checker_2
+    assert checker_1('1 ', ' 1') is True
+    assert cache.stats()['size'] == 1
+    assert lookups('checkers', 'hit') == hits + 1
+    assert lookups('checkers', 'miss') == misses + 1
+    assert REGISTRY.get_sample_value('sandbox_checker_compile_seconds_total') > compile_time
+
+
+def test_get__cache_size__evict_least_recently_used(mocker):
+
+    # arrange
+    mocker.patch('app.config.CHECKER_CACHE_SIZE', 2)
+    cache = CheckerCache()
+    sources = [
+        checker_func + f'  # {i}'
+        for i in range(3)
+    ]
+    hits, misses = lookups('checkers', 'hit'), lookups('checkers', 'miss')
+    cache.get(sources[0], namespace={})
+    cache.get(sources[1], namespace={})
+    cache.get(sources[0], namespace={})
+
+    # act
+    cache.get(sources[2], namespace={})
+    cache.get(sources[0], namespace={})
+
+    # assert
+    assert cache.stats()['size'] == 2
+    assert lookups('checkers', 'hit') == hits + 2
+    assert lookups('checkers', 'miss') == misses + 3
+
+
+def test_get__invalid_syntax__raise_syntax_error():
+
+    # arrange
+    cache = CheckerCache()
+    source = (
+        'def checker(right_value: str, value: str) -> bool:\n'
+        '    include(invalid syntax here)\n'
+        '    return True'
+    )
+
+    # act
+    with pytest.raises(SyntaxError):
+        cache.get(source, namespace={})
+
+    # assert
+    assert cache.stats()['size'] == 0
+
+
+def test_check__compiled_checker__ok():
+
+    # arrange
+    checker = GoService._load_checker(checker_func)
+
+    # act
+    check_result = GoService._check(
+        checker_func=checker,
+        right_value='value\n',
+        value='value'
+    )
+
+    # assert
+    assert check_result is True
+
+
+def test_check__checker_raise_exception__raise_exception():
+
+    # arrange
+    checker = GoService._load_checker(
+        'def checker(right_value: str, value: str) -> bool:\n'
+        '    return int(value) > 0'
+    )
+
+    # act
+    with pytest.raises(CheckerException) as ex:
+        GoService._check(
+            checker_func=checker,
+            right_value='1',
+            value=None
+        )
+
+    # assert
+    assert ex.value.message == messages.MSG_5
+    assert 'int()' in ex.value.details
+
+
+@pytest.mark.parametrize('name, right_value, value, ok', [
+    ('exact', '1 2\n3', '1 2\n3', True),
+    ('exact', '1 2\n3', '1 2 3', False),
+    ('tokens', '1 2\n3', ' 1  2 3\t', True),
+    ('tokens', '1 2 3', '1 2', False),
+    ('float', '0.1 2', '0.1000001 2.0', True),
+    ('float', '0.1 2', '0.11 2', False),
+    ('float', '0.1 2', '0.1', False),
+    ('float', '0.1', 'abc', False),
+    ('unordered_lines', 'a\nb\nb', 'b\na\nb', True),
+    ('unordered_lines', 'a\nb\nb', 'b\na\na', False),
+])
+def test_builtin__compare__ok(name, right_value, value, ok):
+
+    # arrange
+    checker = builtin(name, abs_eps=1e-6, rel_eps=1e-6)
+
+    # act, assert
+    assert checker(right_value, value) is ok
+    assert checker(right_value.encode(), value) is ok
+
+
+def test_testing__checker_name_and_stored_tests__ok(mocker):
+
+    # arrange
+    test_set_id = test_sets.put([
+        TestData(data_in='1', data_out='1.0 2.0'),
+        TestData(data_in='2', data_out=''),
+        TestData(data_in='3', data_out='1.0'),
+    ])
+    data = TestsData(
+        tests=test_sets.get(test_set_id),
+        code='some code',
+        checker_name='float',
+        abs_eps=0.01
+    )
+    mocker.patch.object(
+        GoService,
+        '_execute',
+        side_effect=[
+            ExecuteResult(result='1.001 1.999', error=None),
+            ExecuteResult(result=None, error=None),
+            ExecuteResult(result='1.1', error=None),
+        ]
+    )
+    load_checker_mock = mocker.patch.object(GoService, '_load_checker')
+    mocker.patch('app.config.TEST_WORKERS', 1)
+
+    # act
+    list(GoService._iter_tests(mocker.Mock(), None, data))
+
+    # assert
+    assert [test.ok for test in data.tests] == [True, True, False]
+    load_checker_mock.assert_not_called()
@@ -0,0 +1,114 @@
+import pytest
+from app.entities import DebugData
+from app.service import metrics
+from app.service.cpus import CpuSlots, go_env
+from app.service.main import GoService
+
+
+@pytest.fixture(autouse=True)
+def cpu_slot_dir(tmp_path, mocker):
+    mocker.patch('app.config.CPU_SLOT_DIR', str(tmp_path / 'cpus'))
+
+
+def test_slots__split_by_execute_cpus(mocker):
+
+    # arrange
+    mocker.patch('app.config.EXECUTE_CPUS', 3)
+    mocker.patch('os.sched_getaffinity', return_value={0, 1, 2, 3, 4, 5, 6, 7})
+
+    # act
+    slots = CpuSlots().slots()
+
+    # assert
+    assert slots == [(0, 1, 2), (3, 4, 5)]
+
+
+def test_slot__disabled__none(mocker):
+
+    # arrange
+    mocker.patch('app.config.EXECUTE_CPUS', 0)
+
+    # act
+    with CpuSlots().slot() as cpus:
+        pass
+
+    # assert
+    assert cpus is None
+
+
+def test_slot__other_worker__different_cpus(mocker):
+
+    # arrange
+    mocker.patch('app.config.EXECUTE_CPUS', 1)
+    mocker.patch('os.sched_getaffinity', return_value={0, 1})
+    # два экземпляра — как два воркера: общие у них только файлы блокировок
+    worker_1, worker_2 = CpuSlots(), CpuSlots()
+
+    # act
+    with worker_1.slot() as cpus_1, worker_2.slot() as cpus_2:
+        pass
+    with worker_2.slot() as cpus_3:
+        pass
+
+    # assert
+    assert cpus_1 == (0,)
+    assert cpus_2 == (1,)
+    assert cpus_3 == (0,)
+
+
+def test_slot__all_busy__share_least_loaded(mocker):
+
+    # arrange
+    mocker.patch('app.config.EXECUTE_CPUS', 1)
+    mocker.patch('os.sched_getaffinity', return_value={0, 1})
+    slots = CpuSlots()
+    shared = metrics.CPU_SLOTS_SHARED._value.get()
+
+    # act
+    with slots.slot() as cpus_1, slots.slot() as cpus_2, slots.slot() as cpus_3:
+        active = slots.stats()['active']
+
+    # assert
+    assert {cpus_1, cpus_2} == {(0,), (1,)}
+    assert cpus_3 in {(0,), (1,)}
+    assert active == 3
+    assert slots.stats()['active'] == 0
+    assert metrics.CPU_SLOTS_SHARED._value.get() == shared + 1
+
+
+def test_go_env__ok(mocker):
+
+    # arrange
+    mocker.patch('app.config.EXECUTE_GOGC', '200')
+    mocker.patch('app.config.MEMORY_LIMIT', 64 * 1024 * 1024)
+
+    # act
+    env = go_env((2, 3))
+
+    # assert
+    assert env == {'GOMAXPROCS': '2', 'GOGC': '200', 'GOMEMLIMIT': str(64 * 1024 * 1024)}
+
+
+def test_debug__execute_cpus__pinned(mocker):
+
+    # arrange
+    mocker.patch('app.config.EXECUTE_CPUS', 1)
+    code = (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "fmt"\n'
+        '    "runtime"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Println(runtime.NumCPU(), runtime.GOMAXPROCS(0))\n'
+        '}'
+    )
+
+    # act
+    debug_result = GoService.debug(DebugData(code=code))
+
+    # assert
+    assert debug_result.error is None
+    assert debug_result.result == '1 1'
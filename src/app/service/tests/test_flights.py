@@ -0,0 +1,90 @@
+import os
+import time
+import threading
+from app.service.flights import CompileFlights
+
+
+def test_flight__alone__not_waited(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_FLIGHT_DIR', str(tmp_path))
+    flights = CompileFlights()
+
+    # act
+    with flights.flight('key') as flight:
+        shared = flight.shared()
+
+    # assert
+    assert flight.waited is False
+    assert shared is None
+
+
+def test_flight__concurrent__share_result(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_FLIGHT_DIR', str(tmp_path))
+    flights = CompileFlights()
+    leader_started = threading.Event()
+    results = []
+
+    def leader():
+        with flights.flight('key') as flight:
+            leader_started.set()
+            time.sleep(0.2)
+            flight.publish('main.go:4:5: undefined: adqeqwd')
+
+    def follower():
+        leader_started.wait()
+        with flights.flight('key') as flight:
+            results.append((flight.waited, flight.shared()))
+
+    # act
+    threads = [threading.Thread(target=leader)]
+    threads += [threading.Thread(target=follower) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # assert
+    assert results == [
+        (True, {'error': 'main.go:4:5: undefined: adqeqwd'}),
+    ] * 3
+
+
+def test_flight__after_finished__stale_result_removed(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_FLIGHT_DIR', str(tmp_path))
+    flights = CompileFlights()
+    with flights.flight('key') as flight:
+        flight.publish(None)
+
+    # act
+    with flights.flight('key') as flight:
+        result_exists = os.path.exists(flight.result_path)
+
+    # assert
+    assert flight.waited is False
+    assert result_exists is False
+
+
+def test_evict__old_files__removed(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_FLIGHT_DIR', str(tmp_path))
+    mocker.patch('app.config.COMPILE_FLIGHT_TTL', 60)
+    flights = CompileFlights()
+    old = tmp_path / 'old.lock'
+    old.touch()
+    os.utime(old, (1, 1))
+    recent = tmp_path / 'recent.lock'
+    recent.touch()
+
+    # act
+    removed = flights.evict()
+
+    # assert
+    assert removed == 1
+    assert not old.exists()
+    assert recent.exists()
@@ -0,0 +1,140 @@
+import time
+import pytest
+from app.entities import Job, TestsData, TestData
+from app.service import messages
+from app.service.exceptions import CheckerException, QueueFullException
+from app.service.jobs import JobBackend, LocalJobBackend, create_backend
+from app.service.main import GoService
+
+
+def wait_finished(job: Job, timeout: float = 5) -> Job:
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def make_data() -> TestsData:
+    return TestsData(
+        code='some code',
+        checker='some checker',
+        tests=[
+            TestData(data_in='1', data_out='1'),
+            TestData(data_in='2', data_out='2')
+        ]
+    )
+
+
+def test_submit__testing_ok__done(mocker):
+
+    # arrange
+    def testing(data):
+        for test in data.tests:
+            test.ok = True
+        return data
+
+    testing_mock = mocker.patch.object(GoService, 'testing', side_effect=testing)
+    backend = LocalJobBackend()
+    data = make_data()
+
+    # act
+    job = wait_finished(backend.submit(data))
+
+    # assert
+    testing_mock.assert_called_once_with(data)
+    assert backend.get(job.id) is job
+    assert job.status == Job.DONE
+    assert job.error is None
+    assert len(job.done_tests) == 2
+
+
+def test_submit__service_exception__failed(mocker):
+
+    # arrange
+    ex = CheckerException(messages.MSG_4)
+    mocker.patch.object(GoService, 'testing', side_effect=ex)
+    backend = LocalJobBackend()
+
+    # act
+    job = wait_finished(backend.submit(make_data()))
+
+    # assert
+    assert job.status == Job.FAILED
+    assert job.error is ex
+
+
+def test_submit__queue_is_full__raise_exception(mocker):
+
+    # arrange
+    mocker.patch('app.config.JOB_QUEUE_SIZE', 1)
+    mocker.patch.object(GoService, 'testing', side_effect=lambda data: time.sleep(0.2))
+    backend = LocalJobBackend()
+    job = backend.submit(make_data())
+
+    # act
+    with pytest.raises(QueueFullException) as ex:
+        backend.submit(make_data())
+
+    # assert
+    assert ex.value.message == messages.MSG_9
+    wait_finished(job)
+    assert backend.submit(make_data())
+
+
+def test_get__expired__return_none(mocker):
+
+    # arrange
+    mocker.patch('app.config.JOB_TTL', 0)
+    mocker.patch.object(GoService, 'testing')
+    backend = LocalJobBackend()
+    job = wait_finished(backend.submit(make_data()))
+    time.sleep(0.01)
+
+    # act
+    result = backend.get(job.id)
+
+    # assert
+    assert result is None
+
+
+def test_done_tests__partial__return_checked_tests():
+
+    # arrange
+    data = make_data()
+    data.tests[1].ok = True
+    job = Job(id='id', data=data)
+
+    # act
+    done_tests = job.done_tests
+
+    # assert
+    assert done_tests == [data.tests[1]]
+    data.tests[0].ok = False
+    assert job.done_tests == data.tests
+
+
+def test_create_backend__config__ok(mocker):
+
+    # arrange
+    mocker.patch('app.config.JOB_BACKEND', 'app.service.jobs.LocalJobBackend')
+
+    # act
+    backend = create_backend()
+
+    # assert
+    assert isinstance(backend, LocalJobBackend)
+
+
+def test_job_backend__not_implemented__raise_exception():
+
+    # arrange
+    class SubmitOnlyBackend(JobBackend):
+        def submit(self, data: TestsData) -> Job:
+            return Job(id='some id', data=data)
+
+    # act
+    with pytest.raises(TypeError) as ex:
+        SubmitOnlyBackend()
+
+    # assert
+    assert 'get' in str(ex.value)
@@ -0,0 +1,139 @@
+import os
+import sys
+import runpy
+import subprocess
+from types import SimpleNamespace
+import pytest
+from prometheus_client import REGISTRY
+from app.service.main import GoService
+from app.service.entities import GoFile
+from app.service.exceptions import CheckerException
+from app.service import metrics
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_compile__error__counted():
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'func main() {\n'
+        '    undefined()\n'
+        '}'
+    )
+    errors_before = sample('sandbox_compile_errors_total')
+    compiles_before = sample(
+        'sandbox_stage_duration_seconds_count',
+        stage='compile'
+    )
+    file = GoFile(code)
+
+    # act
+    error = GoService._compile(file)
+    file.remove()
+
+    # assert
+    assert error
+    assert sample('sandbox_compile_errors_total') == errors_before + 1
+    assert sample(
+        'sandbox_stage_duration_seconds_count',
+        stage='compile'
+    ) == compiles_before + 1
+    assert sample(
+        'sandbox_stage_duration_seconds_count',
+        stage='gofile_remove'
+    ) > 0
+
+
+def test_execute__cpu_time_limit__counted(mocker):
+
+    # arrange
+    mocker.patch('app.config.CPU_TIME_LIMIT', 0.5)
+    code = (
+        'package main\n'
+        '\n'
+        'func main() {\n'
+        '    for {\n'
+        '    }\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+    exceeded_before = sample('sandbox_limits_exceeded_total', limit='cpu')
+
+    # act
+    GoService._execute(file=file)
+    file.remove()
+
+    # assert
+    assert sample('sandbox_limits_exceeded_total', limit='cpu') == exceeded_before + 1
+
+
+def test_check__checker_raises__counted():
+
+    # arrange
+    checker_func = (
+        'def checker(right_value: str, value: str) -> bool:\n'
+        '    return 1 / 0'
+    )
+    exceptions_before = sample('sandbox_checker_exceptions_total')
+
+    # act
+    with pytest.raises(CheckerException):
+        GoService._check(checker_func, 'some value', 'some value')
+
+    # assert
+    assert sample('sandbox_checker_exceptions_total') == exceptions_before + 1
+
+
+def test_render__multiprocess__sum_of_workers(tmp_path, monkeypatch):
+
+    # arrange
+    worker = (
+        'from app.service import metrics\n'
+        'metrics.COMPILE_ERRORS.inc()\n'
+        'metrics.COMPILE.observe(0.5)\n'
+    )
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', worker], env=env, check=True)
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+
+    # act
+    text = metrics.render().decode()
+
+    # assert
+    assert 'sandbox_compile_errors_total 2.0' in text
+    assert 'sandbox_stage_duration_seconds_count{stage="compile"} 2.0' in text
+
+
+def test_child_exit__dead_worker__livesum_removed(tmp_path, monkeypatch):
+
+    # arrange
+    worker = (
+        'import os\n'
+        'from app.service import metrics\n'
+        'metrics.WORKSPACES_LEASED.set(3)\n'
+        'metrics.COMPILE_ERRORS.inc()\n'
+        'print(os.getpid())\n'
+    )
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    pid = int(subprocess.run(
+        [sys.executable, '-c', worker], env=env, check=True, stdout=subprocess.PIPE
+    ).stdout)
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    gunicorn_conf = runpy.run_path(
+        os.path.join(os.path.dirname(__file__), '..', '..', '..', 'gunicorn.conf.py')
+    )
+
+    # act
+    gunicorn_conf['child_exit'](None, SimpleNamespace(pid=pid))
+    text = metrics.render().decode()
+
+    # assert
+    assert 'sandbox_workspaces_leased 3.0' not in text
+    assert 'sandbox_compile_errors_total 1.0' in text
@@ -0,0 +1,341 @@
+import resource
+import pytest
+from app.service import process, messages
+from app.service.entities import GoFile
+from app.service.main import GoService
+from app.service.runner import RunnerClient
+
+
+def run(args, data_in=None, timeout=5, **limits):
+    pid, *fds = process.spawn(args)
+    return process.communicate(
+        pid,
+        *fds,
+        data_in=data_in,
+        timeout=timeout,
+        **limits
+    )
+
+
+def test_communicate__input_output__ok():
+
+    # act
+    result = run(['/bin/cat'], data_in=b'x' * 1024 * 1024)
+
+    # assert
+    assert result.stdout == b'x' * 1024 * 1024
+    assert result.stderr == b''
+    assert result.returncode == 0
+    assert result.timeout is False
+
+
+def test_communicate__stderr_and_returncode__ok():
+
+    # act
+    result = run(['/bin/sh', '-c', 'echo some error >&2; exit 3'])
+
+    # assert
+    assert result.stdout == b''
+    assert result.stderr == b'some error\n'
+    assert result.returncode == 3
+
+
+def test_communicate__timeout__kill_process_group():
+
+    # act
+    result = run(['/bin/sh', '-c', 'sleep 10 & sleep 10'], timeout=0.2)
+
+    # assert
+    assert result.timeout is True
+    assert result.returncode == -9
+
+
+def test_communicate__output_limit__kill_process():
+
+    # act
+    result = run(['/usr/bin/yes'], timeout=5, stdout_limit=100000)
+
+    # assert
+    assert result.output_exceeded is True
+    assert result.timeout is False
+    assert result.returncode == -9
+    assert result.stdout == b'y\n' * 50000
+
+
+def test_truncate__long_output__prefix_and_suffix():
+
+    # act
+    data = process.truncate(b'a' * 10 + b'b' * 100 + b'c' * 10, keep=10)
+
+    # assert
+    assert data == b'a' * 10 + b'\n...\n' + b'c' * 10
+    assert process.truncate(b'short', keep=10) == b'short'
+
+
+def test_runner_client__ok(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+
+    # act
+    result = client.run(
+        args=['/bin/sh', '-c', 'cat; echo some error >&2'],
+        data_in=b'some input',
+        timeout=5
+    )
+
+    # assert
+    assert result.stdout == b'some input'
+    assert result.stderr == b'some error\n'
+    assert result.returncode == 0
+    assert result.timeout is False
+
+
+def test_runner_client__timeout__ok(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+
+    # act
+    result = client.run(args=['/bin/sleep', '10'], data_in=None, timeout=0.2)
+
+    # assert
+    assert result.timeout is True
+
+
+def test_runner_client__output_limit__ok(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+
+    # act
+    result = client.run(
+        args=['/usr/bin/yes'],
+        data_in=None,
+        timeout=5,
+        stdout_limit=100000
+    )
+
+    # assert
+    assert result.output_exceeded is True
+    assert len(result.stdout) == 100000
+
+
+def test_runner_client__stdin_file__ok(runner_socket, tmp_path):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+    path = tmp_path / 'data.in'
+    path.write_bytes(b'x' * 1024 * 1024)
+
+    # act
+    with open(path, 'rb') as stdin:
+        result = client.run(
+            args=['/bin/cat'],
+            data_in=None,
+            timeout=5,
+            stdin=stdin
+        )
+
+    # assert
+    assert result.stdout == b'x' * 1024 * 1024
+
+
+def test_runner_client__large_input__ok(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+    data_in = b'y' * (4 * process.CHUNK_SIZE + 1)
+
+    # act
+    result = client.run(
+        args=['/bin/sh', '-c', 'wc -c; readlink /proc/self/fd/0'],
+        data_in=data_in,
+        timeout=5
+    )
+
+    # assert
+    count, stdin = result.stdout.split(b'\n', 1)
+    assert int(count) == len(data_in)
+    # демон передаёт программе дескриптор ввода, а не копирует его в pipe
+    assert stdin.startswith(b'/memfd:stdin')
+
+
+def test_runner_client__cpus_env__ok(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+
+    # act
+    result = client.run(
+        args=['/bin/sh', '-c', 'echo $GOMAXPROCS; grep Cpus_allowed_list /proc/self/status'],
+        data_in=None,
+        timeout=5,
+        cpus=[0],
+        env={'GOMAXPROCS': '1'}
+    )
+
+    # assert
+    assert result.stdout == b'1\nCpus_allowed_list:\t0\n'
+
+
+def test_runner_client__launch_error__raise_exception(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+
+    # act
+    with pytest.raises(OSError) as ex:
+        client.run(args=['/bin/true'], data_in=None, timeout=1, cpus=[4096])
+
+    # assert
+    assert str(ex.value) == 'sandbox-launch: cpus: invalid argument'
+
+
+def test_rlimits__cpu_and_data__ok():
+
+    # arrange
+    limits = process.rlimits(cpu_time=0.3, data=64 * 1024 * 1024)
+
+    # act
+    pid, *fds = process.spawn(
+        ['/bin/sh', '-c', 'ulimit -t; ulimit -d'],
+        launch=process.Launch(rlimits=limits)
+    )
+    result = process.communicate(pid, *fds, data_in=None, timeout=5)
+
+    # assert
+    assert limits == [(resource.RLIMIT_CPU, 1), (resource.RLIMIT_DATA, 64 * 1024 * 1024)]
+    assert result.stdout == b'1\n65536\n'
+
+
+def test_runner_client__rlimits__set_before_exec(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+
+    # act
+    result = client.run(
+        args=['/bin/sh', '-c', 'ulimit -t; ulimit -d'],
+        data_in=None,
+        timeout=5,
+        rlimits=process.rlimits(cpu_time=2, data=64 * 1024 * 1024)
+    )
+
+    # assert
+    assert result.stdout == b'2\n65536\n'
+
+
+def test_spawn__launch__limits_without_fork(mocker):
+
+    # arrange
+    popen_mock = mocker.patch('subprocess.Popen')
+    launch = process.Launch(
+        rlimits=process.rlimits(cpu_time=2),
+        cpus=(0,),
+        user=(65534, 65534)
+    )
+
+    # act
+    pid, *fds = process.spawn(
+        ['sh', '-c', 'id -u; ulimit -t; grep Cpus_allowed_list /proc/self/status'],
+        launch=launch
+    )
+    result = process.communicate(pid, *fds, data_in=None, timeout=5)
+
+    # assert
+    popen_mock.assert_not_called()
+    assert result.stdout == b'65534\n2\nCpus_allowed_list:\t0\n'
+
+
+def test_runner_client__spawn_error__raise_exception(runner_socket):
+
+    # arrange
+    client = RunnerClient(runner_socket)
+
+    # act
+    with pytest.raises(OSError) as ex:
+        client.run(args=['/not/exists'], data_in=None, timeout=1)
+
+    # assert
+    assert 'No such file' in str(ex.value)
+
+
+def test_execute__runner__ok(runner_socket, mocker):
+
+    # arrange
+    mocker.patch('app.config.RUNNER_SOCKET', runner_socket)
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    var n int\n'
+        '    fmt.Scan(&n)\n'
+        '    fmt.Println(n * 2)\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+    spawn_spy = mocker.spy(process, 'spawn')
+
+    # act
+    exec_result = GoService._execute(file=file, data_in='21')
+
+    # assert
+    assert exec_result.result == '42'
+    assert exec_result.error is None
+    spawn_spy.assert_called_once()
+    assert spawn_spy.call_args.args == ([file.filepath_out],)
+    assert spawn_spy.call_args.kwargs['launch'].rlimits == GoService._rlimits()
+    file.remove()
+
+
+def test_execute__runner_cpu_time_limit__return_error(runner_socket, mocker):
+
+    # arrange
+    mocker.patch('app.config.RUNNER_SOCKET', runner_socket)
+    mocker.patch('app.config.CPU_TIME_LIMIT', 0.5)
+    code = (
+        'package main\n'
+        '\n'
+        'func main() {\n'
+        '    for {\n'
+        '    }\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+
+    # act
+    exec_result = GoService._execute(file=file)
+
+    # assert
+    assert exec_result.result is None
+    assert exec_result.error == messages.MSG_15
+    file.remove()
+
+
+def test_execute__runner_unavailable__execute_locally(tmp_path, mocker):
+
+    # arrange
+    mocker.patch('app.config.RUNNER_SOCKET', str(tmp_path / 'missing.sock'))
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Print("ok")\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+
+    # act
+    exec_result = GoService._execute(file=file)
+
+    # assert
+    assert exec_result.result == 'ok'
+    file.remove()
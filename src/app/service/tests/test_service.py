@@ -1,7 +1,9 @@
 # Тесты запускать только в контейнере!
+import os
+import time
+import threading
 import pytest
 from pytest_mock import MockerFixture
-import subprocess
 from unittest.mock import call
 from app.service.main import GoService
 from app import config
@@ -9,12 +11,19 @@ from app.service import messages
 from app.entities import (
     DebugData,
     TestsData,
-    TestData
+    TestData,
+    BatchData,
+    Usage
 )
 from app.service.entities import ExecuteResult
+from app.service.process import RunResult
 from app.service.entities import GoFile
+from app.service.workspaces import workspaces
 from app.service.exceptions import CheckerException
 from app.service import exceptions
+from app.service.build import build_env
+from app.service.test_sets import test_sets
+from app.utils import clean_error
 
 
 def test_execute__float_result__ok():
@@ -92,6 +101,38 @@ def test_execute__data_in_is_integer__ok():
     file.remove()
 
 
+def test_debug__usage__ok():
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "fmt"\n'
+        '    "os"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Println("done")\n'
+        '    os.Exit(3)\n'
+        '}'
+    )
+    data = DebugData(code=code)
+
+    # act
+    GoService.debug(data)
+
+    # assert
+    assert data.result == 'done'
+    assert data.usage.exit_code == 3
+    # без cgroup пик памяти неизвестен
+    assert data.usage.max_rss is None
+    assert data.usage.wall_time >= 0
+    assert data.usage.user_time >= 0
+    assert data.compile_usage.exit_code == 0
+    assert data.compile_usage.max_rss is None
+
+
 def test_execute__data_in_is_string__ok():
     """ Задача "Удаление фрагмента" """
 
@@ -156,7 +197,7 @@ def test_execute__empty_result__return_none():
     file.remove()
 
 
-def test_execute__timeout__return_error(mocker: MockerFixture):
+def test_execute__cpu_time_limit__return_error(mocker: MockerFixture):
 
     # arrange
     code = (
@@ -169,17 +210,130 @@ def test_execute__timeout__return_error(mocker: MockerFixture):
     )
     file = GoFile(code)
     GoService._compile(file)
-    mocker.patch('app.config.TIMEOUT', 1)
+    mocker.patch('app.config.CPU_TIME_LIMIT', 1)
 
     # act
     execute_result = GoService._execute(file=file)
 
     # assert
-    assert execute_result.error == messages.MSG_1
+    assert execute_result.error == messages.MSG_15
     assert execute_result.result is None
     file.remove()
 
 
+def test_execute__wall_time_limit__return_error(mocker: MockerFixture):
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import "time"\n'
+        '\n'
+        'func main() {\n'
+        '    time.Sleep(10 * time.Second)\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+    mocker.patch('app.config.WALL_TIME_LIMIT', 0.5)
+
+    # act
+    execute_result = GoService._execute(file=file)
+
+    # assert
+    assert execute_result.error == messages.MSG_16
+    assert execute_result.result is None
+    assert execute_result.usage.wall_time < 2
+    file.remove()
+
+
+def test_execute__half_memory_limit__ok(mocker: MockerFixture):
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    s := make([]byte, 128<<20)\n'
+        '    for i := range s {\n'
+        '        s[i] = 1\n'
+        '    }\n'
+        '    fmt.Println(len(s) >> 20)\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+    mocker.patch('app.config.MEMORY_LIMIT', 256 * 1024 * 1024)
+
+    # act
+    execute_result = GoService._execute(file=file)
+
+    # assert
+    assert execute_result.error is None
+    assert execute_result.result == '128'
+    file.remove()
+
+
+def test_execute__memory_limit__return_error(mocker: MockerFixture):
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    s := make([]byte, 512<<20)\n'
+        '    for i := range s {\n'
+        '        s[i] = 1\n'
+        '    }\n'
+        '    fmt.Println(len(s))\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+    mocker.patch('app.config.MEMORY_LIMIT', 64 * 1024 * 1024)
+
+    # act
+    execute_result = GoService._execute(file=file)
+
+    # assert
+    assert execute_result.error == messages.MSG_17
+    assert execute_result.result is None
+    file.remove()
+
+
+def test_execute__output_limit__return_error(mocker: MockerFixture):
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    for i := 0; ; i++ {\n'
+        '        fmt.Println(i)\n'
+        '    }\n'
+        '}'
+    )
+    file = GoFile(code)
+    GoService._compile(file)
+    mocker.patch('app.config.STDOUT_LIMIT', 1024 * 1024)
+    mocker.patch('app.config.OUTPUT_KEEP', 10)
+
+    # act
+    execute_result = GoService._execute(file=file)
+
+    # assert
+    assert execute_result.error == messages.MSG_12
+    assert execute_result.result.startswith('0\n1\n2\n3\n4\n\n...\n')
+    assert len(execute_result.result) == 25
+    file.remove()
+
+
 def test_execute__deep_recursive__error(mocker):
     """ Числа Фибоначчи """
 
@@ -205,13 +359,13 @@ def test_execute__deep_recursive__error(mocker):
     )
     file = GoFile(code)
     GoService._compile(file)
-    mocker.patch('app.config.TIMEOUT', 1)
+    mocker.patch('app.config.CPU_TIME_LIMIT', 1)
 
     # act
     execute_result = GoService._execute(file=file)
 
     # assert
-    assert execute_result.error == messages.MSG_1
+    assert execute_result.error == messages.MSG_15
     assert execute_result.result is None
     file.remove()
 
@@ -263,6 +417,338 @@ def test_execute__write_access__error():
     file.remove()
 
 
+def test_testing__runaway_test__others_finished(mocker):
+    # arrange
+    mocker.patch('app.config.CPU_TIME_LIMIT', 1)
+    mocker.patch('app.config.TEST_WORKERS', 2)
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    var n int\n'
+        '    fmt.Scan(&n)\n'
+        '    for n < 0 {\n'
+        '    }\n'
+        '    fmt.Println(n * 2)\n'
+        '}'
+    )
+    checker = (
+        'def checker(right_value: str, value: str) -> bool:\n'
+        '    return right_value == value'
+    )
+    data = TestsData(
+        code=code,
+        checker=checker,
+        tests=[
+            TestData(data_in='-1', data_out='-2'),
+            TestData(data_in='1', data_out='2'),
+            TestData(data_in='2', data_out='4'),
+            TestData(data_in='3', data_out='6')
+        ]
+    )
+
+    # act
+    testing_result = GoService.testing(data)
+
+    # assert
+    assert testing_result.tests[0].error == messages.MSG_15
+    assert testing_result.tests[0].ok is False
+    assert [t.ok for t in testing_result.tests[1:]] == [True, True, True]
+
+
+def test_batch__identical_code__compile_once(mocker):
+    # arrange
+    compile_spy = mocker.spy(GoService, '_compile')
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    var n int\n'
+        '    fmt.Scan(&n)\n'
+        '    fmt.Println(n * 2)\n'
+        '}'
+    )
+    checker = (
+        'def checker(right_value: str, value: str) -> bool:\n'
+        '    return right_value == value'
+    )
+    data = BatchData(
+        items=[
+            TestsData(
+                code=code,
+                checker=checker,
+                tests=[TestData(data_in='1', data_out='2')]
+            ),
+            TestsData(
+                code='package main\n\nfunc main() {\n    invalid\n}',
+                checker=checker,
+                tests=[TestData(data_in='1', data_out='2')]
+            ),
+            TestsData(
+                code=code,
+                checker='def invalid_checker(): pass',
+                tests=[TestData(data_in='1', data_out='2')]
+            ),
+            TestsData(
+                code=code,
+                checker=checker,
+                tests=[
+                    TestData(data_in='2', data_out='4'),
+                    TestData(data_in='3', data_out='5')
+                ]
+            )
+        ]
+    )
+
+    # act
+    batch_result = GoService.batch(data)
+
+    # assert
+    assert compile_spy.call_count == 2
+    items = batch_result.items
+    assert items[0].tests[0].ok is True
+    assert items[1].error is not None
+    assert items[1].tests[0].ok is False
+    assert batch_result.errors[2].message == messages.MSG_2
+    assert [t.ok for t in items[3].tests] == [True, False]
+    assert set(batch_result.errors) == {2}
+
+
+def test_batch__groups__release_file_after_last_item(mocker):
+    # arrange
+    mocker.patch('app.config.BATCH_WORKERS', 1)
+    # рабочий каталог выдаётся сборке
+    mocker.patch.object(GoService, '_compile', side_effect=lambda file: file.write_source())
+    leased = []
+
+    def iter_tests(file, error, data, pool):
+        leased.append(workspaces.stats()['leased'])
+        return iter(())
+
+    mocker.patch.object(GoService, '_iter_tests', side_effect=iter_tests)
+    before = workspaces.stats()['leased']
+    data = BatchData(
+        items=[
+            TestsData(code=f'code {i % 3}', checker='', tests=[])
+            for i in range(6)
+        ]
+    )
+
+    # act
+    GoService.batch(data)
+
+    # assert
+    assert GoService._compile.call_count == 3
+    assert leased == [before + 1] * 6
+    assert workspaces.stats()['leased'] == before
+
+
+def test_testing__stored_tests__stdin_from_files():
+
+    # arrange
+    code = (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "bufio"\n'
+        '    "fmt"\n'
+        '    "os"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    scanner := bufio.NewScanner(os.Stdin)\n'
+        '    lines := 0\n'
+        '    for scanner.Scan() {\n'
+        '        lines++\n'
+        '    }\n'
+        '    fmt.Println(lines)\n'
+        '}'
+    )
+    test_set_id = test_sets.put([
+        TestData(data_in='\n'.join(['x'] * 100000), data_out='100000'),
+        TestData(data_in='x', data_out='1'),
+        TestData(data_in='x', data_out='2'),
+    ])
+    data = TestsData(
+        tests=test_sets.get(test_set_id),
+        code=code,
+        checker=(
+            'def checker(right_value: str, value: str) -> bool:\n'
+            '    return right_value == value'
+        ),
+        order=TestsData.ORDER_COST
+    )
+
+    # act
+    GoService.testing(data)
+
+    # assert
+    assert [test.result for test in data.tests] == ['100000', '1', '1']
+    assert [test.ok for test in data.tests] == [True, True, False]
+
+
+def test_compile__direct_backend__ok(mocker):
+
+    # arrange
+    mocker.patch('app.config.BUILD_BACKEND', 'direct')
+    mocker.patch('app.config.BUILD_DIRECT_PACKAGES', 'fmt math')
+    run_build_spy = mocker.spy(GoService, '_run_build')
+    code = (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "fmt"\n'
+        '    "math"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    var x float64\n'
+        '    fmt.Scan(&x)\n'
+        '    fmt.Println(x - math.Floor(x))\n'
+        '}'
+    )
+    file = GoFile(code)
+
+    # act
+    error = GoService._compile(file)
+    exec_result = GoService._execute(file=file, data_in='9.08')
+
+    # assert
+    assert error is None
+    assert [os.path.basename(c.args[0][0]) for c in run_build_spy.call_args_list] == [
+        'compile', 'link'
+    ]
+    assert file.compile_usage.exit_code == 0
+    assert round(float(exec_result.result), 2) == 0.08
+    file.remove()
+
+
+def test_compile__direct_backend__same_error_as_go_build(mocker):
+
+    # arrange
+    mocker.patch('app.config.BUILD_DIRECT_PACKAGES', 'fmt')
+    code = (
+        'package main\n'
+        '\n'
+        'import "fmt"\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Println(adqeqwd)\n'
+        '}'
+    )
+    go_build_file = GoFile(code)
+    direct_file = GoFile(code)
+
+    # act
+    go_build_error = GoService._compile(go_build_file)
+    mocker.patch('app.config.BUILD_BACKEND', 'direct')
+    direct_error = GoService._compile(direct_file)
+
+    # assert
+    assert direct_error == go_build_error
+    assert 'undefined: adqeqwd' in direct_error
+    go_build_file.remove()
+    direct_file.remove()
+
+
+def test_compile__direct_backend__unknown_import__go_build(mocker):
+
+    # arrange
+    mocker.patch('app.config.BUILD_BACKEND', 'direct')
+    mocker.patch('app.config.BUILD_DIRECT_PACKAGES', 'fmt')
+    run_build_spy = mocker.spy(GoService, '_run_build')
+    code = (
+        'package main\n'
+        '\n'
+        'import (\n'
+        '    "fmt"\n'
+        '    "strings"\n'
+        ')\n'
+        '\n'
+        'func main() {\n'
+        '    fmt.Println(strings.ToUpper("go"))\n'
+        '}'
+    )
+    file = GoFile(code)
+
+    # act
+    error = GoService._compile(file)
+    exec_result = GoService._execute(file=file)
+
+    # assert
+    assert error is None
+    assert [c.args[0][0] for c in run_build_spy.call_args_list] == ['go']
+    assert exec_result.result == 'GO'
+    file.remove()
+
+
+def test_compile__concurrent_identical__compile_once(mocker):
+
+    # arrange
+    mocker.patch('app.config.ARTIFACT_CACHE_ENABLED', True)
+    build = GoService._build
+    leader_building = threading.Event()
+
+    def slow_build(file):
+        leader_building.set()
+        time.sleep(0.3)
+        return build(file)
+
+    build_mock = mocker.patch.object(GoService, '_build', side_effect=slow_build)
+    codes = {
+        'ok': (
+            'package main\n'
+            '\n'
+            'import "fmt"\n'
+            '\n'
+            'func main() {\n'
+            '    fmt.Print("shared")\n'
+            '}'
+        ),
+        'error': (
+            'package main\n'
+            '\n'
+            'func main() {\n'
+            '    adqeqwd\n'
+            '}'
+        ),
+    }
+    results = {name: [] for name in codes}
+
+    def compile_and_run(name, wait):
+        if wait:
+            leader_building.wait()
+        file = GoFile(codes[name])
+        try:
+            error = GoService._compile(file)
+            result = None if error else GoService._execute(file=file).result
+            results[name].append((error, result))
+        finally:
+            file.remove()
+
+    # act
+    for name in codes:
+        leader_building.clear()
+        threads = [
+            threading.Thread(target=compile_and_run, args=(name, i > 0))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # assert
+    assert build_mock.call_count == 2
+    assert results['ok'] == [(None, 'shared')] * 4
+    assert len(set(results['error'])) == 1
+    assert 'undefined: adqeqwd' in results['error'][0][0]
+
+
 def test_execute__clear_error_message__ok(mocker):
     # arrange
     code = (
@@ -289,22 +775,32 @@ def test_execute__clear_error_message__ok(mocker):
         "     ^~~~~~~\n"
     )
     file = GoFile(code)
-    mocker.patch.object(subprocess.Popen, '__init__', return_value=None)
+    mocker.patch(
+        'app.service.process.spawn',
+        return_value=(1, 2, 3, 4)
+    )
     communicate_mock = mocker.patch(
-        'subprocess.Popen.communicate',
-        return_value=(None, raw_error_message)
+        'app.service.process.communicate',
+        return_value=RunResult(
+            stdout=b'',
+            stderr=raw_error_message.encode(),
+            returncode=2,
+            timeout=False,
+            usage=None
+        )
     )
-    kill_mock = mocker.patch('subprocess.Popen.kill')
 
     # act
     exec_result = GoService._execute(file=file)
 
     # assert
     communicate_mock.assert_called_once_with(
-        input=None,
-        timeout=config.TIMEOUT
+        1, 2, 3, 4,
+        data_in=None,
+        timeout=config.WALL_TIME_LIMIT,
+        stdout_limit=config.STDOUT_LIMIT,
+        stderr_limit=config.STDERR_LIMIT
     )
-    kill_mock.assert_called_once()
     assert exec_result.result is None
     assert exec_result.error == clear_error_message
     file.remove()
@@ -323,12 +819,14 @@ def test_execute__proc_exception__raise_exception(mocker):
     )
     data_in = 'Some data in'
     file = GoFile(code)
-    mocker.patch.object(subprocess.Popen, '__init__', return_value=None)
+    mocker.patch(
+        'app.service.process.spawn',
+        return_value=(1, 2, 3, 4)
+    )
     communicate_mock = mocker.patch(
-        'subprocess.Popen.communicate',
+        'app.service.process.communicate',
         side_effect=Exception()
     )
-    kill_mock = mocker.patch('subprocess.Popen.kill')
 
     # act
     with pytest.raises(exceptions.ExecutionException) as ex:
@@ -337,10 +835,12 @@ def test_execute__proc_exception__raise_exception(mocker):
     # assert
     assert ex.value.message == messages.MSG_6
     communicate_mock.assert_called_once_with(
-        input=data_in,
-        timeout=config.TIMEOUT
+        1, 2, 3, 4,
+        data_in=data_in.encode(),
+        timeout=config.WALL_TIME_LIMIT,
+        stdout_limit=config.STDOUT_LIMIT,
+        stderr_limit=config.STDERR_LIMIT
     )
-    kill_mock.assert_called_once()
     file.remove()
 
 
@@ -361,20 +861,28 @@ def test_compile__timeout__error(mocker):
     )
     file_mock.code = code
 
-    mocker.patch.object(subprocess.Popen, '__init__', return_value=None)
+    mocker.patch('app.service.process.spawn', return_value=(1, 2, 3, 4))
     communicate_mock = mocker.patch(
-        'subprocess.Popen.communicate',
-        side_effect=subprocess.TimeoutExpired(cmd='', timeout=config.TIMEOUT)
+        'app.service.process.communicate',
+        return_value=RunResult(
+            stdout=b'',
+            stderr=b'',
+            returncode=-9,
+            timeout=True,
+            usage=None
+        )
     )
-    kill_mock = mocker.patch('subprocess.Popen.kill')
 
     # act
     error = GoService._compile(file_mock)
 
     # assert
     assert error == messages.MSG_1
-    communicate_mock.assert_called_once_with(timeout=config.TIMEOUT)
-    kill_mock.assert_called_once()
+    communicate_mock.assert_called_once_with(
+        1, 2, 3, 4,
+        data_in=None,
+        timeout=config.TIMEOUT
+    )
 
 
 def test_compile__exception__raise_exception(mocker):
@@ -393,12 +901,11 @@ def test_compile__exception__raise_exception(mocker):
     )
     file_mock.code = code
 
-    mocker.patch.object(subprocess.Popen, '__init__', return_value=None)
+    mocker.patch('app.service.process.spawn', return_value=(1, 2, 3, 4))
     communicate_mock = mocker.patch(
-        'subprocess.Popen.communicate',
+        'app.service.process.communicate',
         side_effect=Exception
     )
-    kill_mock = mocker.patch('subprocess.Popen.kill')
 
     # act
     with pytest.raises(exceptions.CompileException) as ex:
@@ -406,8 +913,11 @@ def test_compile__exception__raise_exception(mocker):
 
     # assert
     assert ex.value.message == messages.MSG_7
-    communicate_mock.assert_called_once_with(timeout=config.TIMEOUT)
-    kill_mock.assert_called_once()
+    communicate_mock.assert_called_once_with(
+        1, 2, 3, 4,
+        data_in=None,
+        timeout=config.TIMEOUT
+    )
 
 
 def test_compile__error__error(mocker):
@@ -427,24 +937,33 @@ def test_compile__error__error(mocker):
     file_mock.code = code
 
     compile_error = 'some error'
-    mocker.patch.object(subprocess.Popen, '__init__', return_value=None)
+    mocker.patch('app.service.process.spawn', return_value=(1, 2, 3, 4))
     communicate_mock = mocker.patch(
-        'subprocess.Popen.communicate',
-        return_value=(None, compile_error)
+        'app.service.process.communicate',
+        return_value=RunResult(
+            stdout=b'',
+            stderr=compile_error.encode(),
+            returncode=1,
+            timeout=False,
+            usage=None
+        )
     )
-    kill_mock = mocker.patch('subprocess.Popen.kill')
 
     # act
     error = GoService._compile(file_mock)
 
     # assert
     assert error == compile_error
-    communicate_mock.assert_called_once_with(timeout=config.TIMEOUT)
-    kill_mock.assert_called_once()
+    communicate_mock.assert_called_once_with(
+        1, 2, 3, 4,
+        data_in=None,
+        timeout=config.TIMEOUT
+    )
 
 
 def test_compile__ok(mocker):
     file_mock = mocker.Mock()
+    file_mock.code = 'package main\n\nfunc main() {\n}'
     file_mock.filepath_out = '/tmp/fake_out'
     file_mock.filepath_go = '/tmp/fake_go'
 
@@ -454,25 +973,42 @@ def test_compile__ok(mocker):
     mock_chown = mocker.patch('os.chown')
     mocker.patch('os.path.dirname', return_value='/tmp')
 
-    mock_popen = mocker.patch('subprocess.Popen')
-    mock_proc = mock_popen.return_value
-
-    mock_proc.communicate.return_value = (None, None)
-    mock_proc.returncode = 0
+    usage = Usage(
+        wall_time=0.5,
+        user_time=0.3,
+        system_time=0.1,
+        max_rss=1024,
+        exit_code=0
+    )
+    mock_spawn = mocker.patch(
+        'app.service.process.spawn',
+        return_value=(1, 2, 3, 4)
+    )
+    mocker.patch(
+        'app.service.process.communicate',
+        return_value=RunResult(
+            stdout=b'',
+            stderr=b'',
+            returncode=0,
+            timeout=False,
+            usage=usage
+        )
+    )
 
     # act
-    GoService._compile(file_mock)
+    error = GoService._compile(file_mock)
 
     # assert
-    mock_popen.assert_called_once_with(
+    assert error is None
+    assert file_mock.compile_usage == usage
+    mock_spawn.assert_called_once_with(
         args=['go', 'build', '-o', file_mock.filepath_out, file_mock.filepath_go],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
+        env=build_env(),
+        launch=None
     )
 
-    mock_chmod.assert_called_once()
-    mock_chown.assert_called_once()
+    mock_chmod.assert_called_once_with(file_mock.filepath_out, 0o711)
+    mock_chown.assert_not_called()
 
 
 def test_check__true__ok():
@@ -660,6 +1196,20 @@ def test_debug__compile_return_error__ok(mocker):
     assert debug_result.error == compile_error
 
 
+def test_debug__compile_raise_exception__remove_file(mocker):
+    # arrange
+    file_mock = mocker.Mock()
+    mocker.patch.object(GoFile, '__new__', return_value=file_mock)
+    mocker.patch.object(GoService, '_compile', side_effect=exceptions.CompileException('some error'))
+
+    # act
+    with pytest.raises(exceptions.CompileException):
+        GoService.debug(DebugData(code='some code'))
+
+    # assert
+    file_mock.remove.assert_called_once()
+
+
 def test_testing__compile_is_success__ok(mocker):
     # arrange
     file_mock = mocker.Mock()
@@ -675,6 +1225,8 @@ def test_testing__compile_is_success__ok(mocker):
     execute_mock = mocker.patch.object(GoService, '_execute', return_value=execute_result)
     check_result = mocker.Mock()
     check_mock = mocker.patch.object(GoService, '_check', return_value=check_result)
+    checker = mocker.Mock()
+    load_checker_mock = mocker.patch.object(GoService, '_load_checker', return_value=checker)
 
     test_1 = TestData(data_in='some test input 1', data_out='some test out 1')
     test_2 = TestData(data_in='some test input 2', data_out='some test out 2')
@@ -690,13 +1242,21 @@ def test_testing__compile_is_success__ok(mocker):
 
     # assert
     compile_mock.assert_called_once_with(file_mock)
-    assert execute_mock.call_args_list == [
-        call(file=file_mock, data_in=test_1.data_in),
-        call(file=file_mock, data_in=test_2.data_in)
-    ]
+    assert execute_mock.call_count == 2
+    execute_mock.assert_any_call(
+        file=file_mock,
+        data_in=test_1.data_in,
+        data_in_path=None
+    )
+    execute_mock.assert_any_call(
+        file=file_mock,
+        data_in=test_2.data_in,
+        data_in_path=None
+    )
+    load_checker_mock.assert_called_once_with(data.checker)
     assert check_mock.call_args_list == [
-        call(checker_func=data.checker, right_value=test_1.data_out, value=execute_result.result),
-        call(checker_func=data.checker, right_value=test_2.data_out, value=execute_result.result)
+        call(checker_func=checker, right_value=test_1.data_out, value=execute_result.result),
+        call(checker_func=checker, right_value=test_2.data_out, value=execute_result.result)
     ]
     file_mock.remove.assert_called_once()
     tests_result = testing_result.tests
@@ -719,6 +1279,7 @@ def test_testing__compile_return_error__ok(mocker):
     compile_mock = mocker.patch.object(GoService, '_compile', return_value=compile_error)
     execute_mock = mocker.patch.object(GoService, '_execute')
     check_mock = mocker.patch.object(GoService, '_check')
+    load_checker_mock = mocker.patch.object(GoService, '_load_checker')
 
     test_1 = TestData(data_in='some test input 1', data_out='some test out 1')
     test_2 = TestData(data_in='some test input 2', data_out='some test out 2')
@@ -736,6 +1297,7 @@ def test_testing__compile_return_error__ok(mocker):
     compile_mock.assert_called_once_with(file_mock)
     execute_mock.assert_not_called()
     check_mock.assert_not_called()
+    load_checker_mock.assert_not_called()
     file_mock.remove.assert_called_once()
 
     tests_result = testing_result.tests
@@ -744,3 +1306,190 @@ def test_testing__compile_return_error__ok(mocker):
         assert test_res.result is None
         assert test_res.error == compile_error
         assert test_res.ok is False
+
+
+def test_testing__parallel__keep_tests_order(mocker):
+    # arrange
+    file_mock = mocker.Mock()
+    mocker.patch.object(GoFile, '__new__', return_value=file_mock)
+    mocker.patch.object(GoService, '_compile', return_value=None)
+    mocker.patch('app.config.TEST_WORKERS', 3)
+
+    def execute(file, data_in, data_in_path=None):
+        time.sleep(float(data_in))
+        return ExecuteResult(result=data_in, error=None)
+
+    mocker.patch.object(GoService, '_execute', side_effect=execute)
+    mocker.patch.object(GoService, '_load_checker')
+    mocker.patch.object(GoService, '_check', return_value=True)
+    data = TestsData(
+        code='some code',
+        checker='some checker',
+        tests=[
+            TestData(data_in='0.3', data_out='0.3'),
+            TestData(data_in='0.2', data_out='0.2'),
+            TestData(data_in='0.1', data_out='0.1')
+        ]
+    )
+
+    # act
+    started = time.monotonic()
+    testing_result = GoService.testing(data)
+    elapsed = time.monotonic() - started
+
+    # assert
+    assert elapsed < 0.5
+    assert [t.result for t in testing_result.tests] == ['0.3', '0.2', '0.1']
+    file_mock.remove.assert_called_once()
+
+
+def test_iter_testing__yield_tests_one_by_one(mocker):
+    # arrange
+    file_mock = mocker.Mock()
+    mocker.patch.object(GoFile, '__new__', return_value=file_mock)
+    mocker.patch.object(GoService, '_compile', return_value=None)
+    mocker.patch.object(GoService, '_load_checker')
+    execute_result = ExecuteResult(result='some result', error=None)
+    mocker.patch.object(GoService, '_execute', return_value=execute_result)
+    mocker.patch.object(GoService, '_check', return_value=True)
+    data = TestsData(
+        code='some code',
+        checker='some checker',
+        tests=[
+            TestData(data_in='some test input 1', data_out='some test out 1'),
+            TestData(data_in='some test input 2', data_out='some test out 2')
+        ]
+    )
+
+    # act
+    tests = GoService.iter_testing(data)
+    index, first_test = next(tests)
+
+    # assert
+    assert data.error is None
+    assert index == 0
+    assert first_test is data.tests[0]
+    assert first_test.ok is True
+    file_mock.remove.assert_not_called()
+    assert list(tests) == [(1, data.tests[1])]
+    file_mock.remove.assert_called_once()
+
+
+def test_testing__fail_fast__skip_remaining_tests(mocker):
+    # arrange
+    file_mock = mocker.Mock()
+    mocker.patch.object(GoFile, '__new__', return_value=file_mock)
+    mocker.patch.object(GoService, '_compile', return_value=None)
+    mocker.patch.object(GoService, '_load_checker')
+    mocker.patch('app.config.TEST_WORKERS', 1)
+
+    def execute(file, data_in, data_in_path=None):
+        time.sleep(0.1)
+        return ExecuteResult(result=data_in, error=None)
+
+    execute_mock = mocker.patch.object(GoService, '_execute', side_effect=execute)
+    mocker.patch.object(
+        GoService,
+        '_check',
+        side_effect=lambda checker_func, right_value, value: right_value == value
+    )
+    data = TestsData(
+        code='some code',
+        checker='some checker',
+        fail_fast=True,
+        tests=[
+            TestData(data_in='1', data_out='1'),
+            TestData(data_in='2', data_out='invalid'),
+            TestData(data_in='3', data_out='3'),
+            TestData(data_in='4', data_out='4')
+        ]
+    )
+
+    # act
+    testing_result = GoService.testing(data)
+
+    # assert
+    tests = testing_result.tests
+    assert [t.ok for t in tests] == [True, False, False, False]
+    assert [t.skipped for t in tests] == [None, None, True, True]
+    assert tests[2].error == messages.MSG_11
+    assert tests[3].result is None
+    assert execute_mock.call_count < 4
+    file_mock.remove.assert_called_once()
+
+
+def test_testing__fail_fast_execution_error__skip_remaining_tests(mocker):
+    # arrange
+    file_mock = mocker.Mock()
+    mocker.patch.object(GoFile, '__new__', return_value=file_mock)
+    mocker.patch.object(GoService, '_compile', return_value=None)
+    mocker.patch.object(GoService, '_load_checker')
+    mocker.patch.object(
+        GoService,
+        '_execute',
+        return_value=ExecuteResult(result=None, error=messages.MSG_1)
+    )
+    mocker.patch.object(GoService, '_check', return_value=True)
+    data = TestsData(
+        code='some code',
+        checker='some checker',
+        fail_fast=True,
+        tests=[
+            TestData(data_in='1', data_out='1'),
+            TestData(data_in='2', data_out='2')
+        ]
+    )
+
+    # act
+    testing_result = GoService.testing(data)
+
+    # assert
+    assert testing_result.tests[0].error == messages.MSG_1
+    assert testing_result.tests[1].skipped is True
+
+
+def test_iter_testing__order_by_cost__cheap_tests_first(mocker):
+    # arrange
+    file_mock = mocker.Mock()
+    mocker.patch.object(GoFile, '__new__', return_value=file_mock)
+    mocker.patch.object(GoService, '_compile', return_value=None)
+    mocker.patch.object(GoService, '_load_checker')
+    mocker.patch.object(
+        GoService,
+        '_execute',
+        side_effect=lambda file, data_in, data_in_path: ExecuteResult(result=data_in, error=None)
+    )
+    mocker.patch.object(GoService, '_check', return_value=True)
+    data = TestsData(
+        code='some code',
+        checker='some checker',
+        order=TestsData.ORDER_COST,
+        tests=[
+            TestData(data_in='1 2 3', data_out=''),
+            TestData(data_in='1', data_out=''),
+            TestData(data_in=None, data_out=''),
+            TestData(data_in='1 2', data_out='')
+        ]
+    )
+
+    # act
+    indexes = [index for index, _ in GoService.iter_testing(data)]
+
+    # assert
+    assert indexes == [2, 1, 3, 0]
+    assert [t.result for t in data.tests] == ['1 2 3', '1', None, '1 2']
+
+
+def test_clean_error__workspace_dir__hide_path(mocker):
+    # arrange
+    mocker.patch('app.config.WORKSPACE_DIR', '/dev/shm/wsrev/')
+    error = (
+        '# command-line-arguments\n'
+        '/dev/shm/wsrev/123-abc/main.go:4:5: undefined: adqeqwd'
+    )
+
+    # act
+    cleaned = clean_error(error)
+
+    # assert
+    assert cleaned == '# command-line-arguments\nmain.go:4:5: undefined: adqeqwd'
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import threading
+from app.service import stages
+from app.service.stages import Stage
+
+
+def test_slot__limit__run_one_at_a_time():
+
+    # arrange
+    stage = Stage('test', workers=lambda: 1, queue_size=lambda: 10)
+    running, max_running = [0], [0]
+    lock = threading.Lock()
+
+    def task():
+        with stage.slot():
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+    # act
+    threads = [threading.Thread(target=task) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # assert
+    assert max_running[0] == 1
+    assert stage.stats()['active'] == 0
+    assert stage.stats()['waiting'] == 0
+    assert stage.duration > 0
+
+
+def test_full__queue_size__ok():
+
+    # arrange
+    stage = Stage('test', workers=lambda: 1, queue_size=lambda: 2)
+    release = threading.Event()
+
+    def task():
+        with stage.slot():
+            release.wait()
+
+    threads = [threading.Thread(target=task) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while stage.waiting < 2:
+        time.sleep(0.01)
+
+    # act
+    full = stage.full()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # assert
+    assert full is True
+    assert stage.full() is False
+
+
+def test_admission__full_stage__retry_after(mocker):
+
+    # arrange
+    mocker.patch.object(stages.EXECUTE, 'waiting', 10)
+    mocker.patch.object(stages.EXECUTE, 'duration', 0.8)
+    mocker.patch('app.config.EXECUTE_QUEUE_SIZE', 10)
+    mocker.patch('app.config.EXECUTE_WORKERS', 4)
+
+    # act
+    retry_after = stages.admission()
+
+    # assert
+    assert retry_after == 2
+
+
+def test_admission__free__none():
+
+    # act
+    retry_after = stages.admission()
+
+    # assert
+    assert retry_after is None
+
+
+def test_async_slot__limit__run_one_at_a_time():
+
+    # arrange
+    stage = Stage('test', workers=lambda: 1, queue_size=lambda: 10)
+    running, max_running = [0], [0]
+
+    async def task():
+        async with stage.async_slot():
+            running[0] += 1
+            max_running[0] = max(max_running[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+
+    async def run_all():
+        await asyncio.gather(*(task() for _ in range(4)))
+
+    # act
+    asyncio.run(run_all())
+
+    # assert
+    assert max_running[0] == 1
+    assert stage.stats()['active'] == 0
+    assert stage.stats()['waiting'] == 0
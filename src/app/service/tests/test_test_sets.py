@@ -0,0 +1,50 @@
+from app.entities import TestData
+from app.service.test_sets import TestSetStore
+
+
+def test_put__same_tests__same_id():
+
+    # arrange
+    store = TestSetStore()
+    tests = [
+        TestData(data_in='1', data_out='2'),
+        TestData(data_in=None, data_out='3'),
+    ]
+
+    # act
+    test_set_id_1 = store.put(tests)
+    test_set_id_2 = store.put([TestData(**vars(test)) for test in tests])
+
+    # assert
+    assert test_set_id_1 == test_set_id_2
+    assert test_set_id_1 != store.put([TestData(data_in='12', data_out='3')])
+
+
+def test_get__stored_tests__file_paths():
+
+    # arrange
+    store = TestSetStore()
+    test_set_id = store.put([
+        TestData(data_in='some input', data_out='some output'),
+    ])
+
+    # act
+    tests = store.get(test_set_id)
+
+    # assert
+    assert len(tests) == 1
+    assert tests[0].data_in is None
+    with open(tests[0].data_in_path) as f:
+        assert f.read() == 'some input'
+    with open(tests[0].data_out_path) as f:
+        assert f.read() == 'some output'
+
+
+def test_get__unknown_id__none():
+
+    # arrange
+    store = TestSetStore()
+
+    # act, assert
+    assert store.get('0' * 64) is None
+    assert store.get('../../etc') is None
@@ -0,0 +1,138 @@
+import os
+import logging
+import pytest
+from app.service.entities import GoFile
+from app.service.workspaces import WorkspacePool
+
+
+@pytest.fixture()
+def pool(tmp_path, mocker):
+    mocker.patch('app.config.WORKSPACE_DIR', str(tmp_path / 'workspaces'))
+    mocker.patch('app.config.WORKSPACE_POOL_SIZE', 2)
+    return WorkspacePool()
+
+
+def test_lease__pool__empty_dir(pool):
+
+    # act
+    path = pool.lease()
+
+    # assert
+    assert os.path.dirname(path) == pool.root
+    assert os.listdir(path) == []
+    assert os.stat(path).st_mode & 0o777 == 0o711
+    assert os.stat(path).st_uid == os.getuid()
+    assert pool.stats() == {
+        'size': 2,
+        'free': 1,
+        'leased': 1,
+        'overflow': 0,
+        'leaked': 0,
+    }
+
+
+def test_release__scrub_and_reuse(pool):
+
+    # arrange
+    path = pool.lease()
+    with open(os.path.join(path, 'main.go'), 'w') as f:
+        f.write('package main')
+    os.makedirs(os.path.join(path, 'sub', 'dir'))
+
+    # act
+    pool.release(path)
+
+    # assert
+    assert os.listdir(path) == []
+    assert pool.stats()['free'] == 2
+    assert pool.stats()['leased'] == 0
+    assert pool.lease() == path
+
+
+def test_lease__pool_exhausted__overflow(pool):
+
+    # arrange
+    pool.lease()
+    pool.lease()
+
+    # act
+    path = pool.lease()
+    pool.release(path)
+
+    # assert
+    assert os.path.basename(path).startswith(f'{os.getpid()}-overflow-')
+    assert not os.path.exists(path)
+    assert pool.stats()['overflow'] == 1
+    assert pool.stats()['leased'] == 2
+
+
+def test_release__cleanup_error__leaked(pool, mocker, caplog):
+
+    # arrange
+    path = pool.lease()
+    mocker.patch('os.unlink', side_effect=PermissionError)
+    with open(os.path.join(path, 'main.go'), 'w') as f:
+        f.write('package main')
+
+    # act
+    with caplog.at_level(logging.ERROR):
+        pool.release(path)
+
+    # assert
+    assert path in caplog.text
+    assert pool.stats() == {
+        'size': 1,
+        'free': 1,
+        'leased': 0,
+        'overflow': 0,
+        'leaked': 1,
+    }
+
+
+def test_lease__dead_worker__stale_removed(pool, mocker):
+
+    # arrange
+    stale = os.path.join(pool.root, '999999999-0')
+    os.makedirs(stale)
+    mocker.patch('os.kill', side_effect=ProcessLookupError)
+
+    # act
+    pool.lease()
+
+    # assert
+    assert not os.path.exists(stale)
+
+
+def test_go_file__write_error__release_workspace(pool, mocker):
+
+    # arrange
+    mocker.patch('app.service.entities.workspaces', pool)
+    mocker.patch('app.service.entities.source_opener', side_effect=OSError('no space left'))
+    # без аргументов: после patch.object(GoFile, '__new__') в других тестах
+    # object.__new__ не принимает аргументы конструктора
+    file = object.__new__(GoFile)
+    file.__init__('some code')
+
+    # act
+    with pytest.raises(OSError):
+        file.write_source()
+    file.remove()
+
+    # assert
+    assert pool.stats()['leased'] == 0
+    assert pool.stats()['free'] == 2
+
+
+def test_go_file__no_build__no_workspace(pool, mocker):
+
+    # arrange
+    mocker.patch('app.service.entities.workspaces', pool)
+    file = object.__new__(GoFile)
+    file.__init__('some code')
+
+    # act
+    file.remove()
+
+    # assert
+    assert pool.stats()['leased'] == 0
+    assert pool.stats()['free'] == 0
@@ -0,0 +1,137 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.service import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class WorkspacePool:
+    """Пул рабочих каталогов программ в WORKSPACE_DIR (может быть tmpfs).
+
+    Каждый воркер заранее создаёт WORKSPACE_POOL_SIZE каталогов
+    <pid>-<n>. Каталоги принадлежат сервису, пользователю песочницы
+    доступен только проход (0711): программы не могут подменить чужой
+    исходник или бинарник, пока тот собирается. Каталог выдаётся
+    на запрос и при возврате очищается, а не удаляется. Если свободных
+    нет, создаётся временный каталог, который после запроса удаляется.
+    Каталоги, которые не удалось очистить, в пул не возвращаются
+    и пишутся в лог.
+    """
+
+    def __init__(self):
+        self.leased = 0
+        self.overflow = 0
+        self.leaked = 0
+        self._owner: Optional[Tuple[int, str]] = None
+        self._free: List[str] = []
+        self._pooled = set()
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> str:
+        return config.WORKSPACE_DIR
+
+    def _prepare(self, path: str):
+        os.chmod(path, 0o711)
+
+    def _report(self):
+        metrics.WORKSPACES_SIZE.set(len(self._pooled))
+        metrics.WORKSPACES_LEASED.set(self.leased)
+
+    def _init(self):
+        """Создаёт каталоги пула в текущем процессе (после fork — заново)
+        и удаляет каталоги завершившихся воркеров"""
+        pid = os.getpid()
+        self._owner = (pid, self.root)
+        self._free, self._pooled = [], set()
+        self.leased = 0
+        os.makedirs(self.root, mode=0o755, exist_ok=True)
+        self._remove_stale(pid)
+        for index in range(config.WORKSPACE_POOL_SIZE):
+            path = os.path.join(self.root, f'{pid}-{index}')
+            os.makedirs(path, exist_ok=True)
+            self._scrub(path)
+            self._prepare(path)
+            self._free.append(path)
+            self._pooled.add(path)
+
+    def _remove_stale(self, current: int):
+        for name in os.listdir(self.root):
+            pid, _, _ = name.partition('-')
+            if not pid.isdigit() or int(pid) == current:
+                continue
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                logger.warning('Removing workspace of dead worker: %s', name)
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            except PermissionError:
+                pass
+
+    @staticmethod
+    def _scrub(path: str):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+
+    def lease(self) -> str:
+        """Выдаёт пустой каталог, закрытый для записи пользователю песочницы"""
+        with self._lock:
+            if self._owner != (os.getpid(), self.root):
+                self._init()
+            self.leased += 1
+            self._report()
+            if self._free:
+                return self._free.pop()
+            self.overflow += 1
+        metrics.WORKSPACE_OVERFLOWS.inc()
+        os.makedirs(self.root, mode=0o755, exist_ok=True)
+        path = tempfile.mkdtemp(dir=self.root, prefix=f'{os.getpid()}-overflow-')
+        self._prepare(path)
+        return path
+
+    def release(self, path: str):
+        """Очищает каталог и возвращает его в пул"""
+        pooled = path in self._pooled
+        try:
+            if pooled:
+                self._scrub(path)
+                self._prepare(path)
+            else:
+                shutil.rmtree(path)
+        except OSError:
+            logger.exception('Failed to clean up workspace %s', path)
+            metrics.WORKSPACE_CLEANUP_ERRORS.inc()
+            with self._lock:
+                self.leased -= 1
+                self.leaked += 1
+                self._pooled.discard(path)
+                self._report()
+            return
+        with self._lock:
+            self.leased -= 1
+            if pooled:
+                self._free.append(path)
+            self._report()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'size': len(self._pooled),
+                'free': len(self._free),
+                'leased': self.leased,
+                'overflow': self.overflow,
+                'leaked': self.leaked,
+            }
+
+
+workspaces = WorkspacePool()
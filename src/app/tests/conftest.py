@@ -1,6 +1,11 @@
-from app.main import create_app
+from app import config
 import pytest
 
+# прогрев GOCACHE не нужен: сервис в тестах API замокан
+config.WARMUP_ENABLED = False
+
+from app.main import create_app  # noqa: E402
+
 
 @pytest.fixture()
 def app():
@@ -1,9 +1,15 @@
+import json
+import time
+from threading import Event
 from app.entities import (
     DebugData,
     TestsData,
-    TestData
+    TestData,
+    Usage
 )
 from app.service.exceptions import ServiceException
+from app.service import messages
+from app.service.test_sets import test_sets
 
 
 def test_debug__ok(client, mocker):
@@ -67,6 +73,49 @@ def test_debug__not_error__ok(client, mocker):
     debug_mock.assert_called_once_with(serialized_data)
 
 
+def test_debug__usage__ok(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'data_in': 'some input'
+    }
+    debug_result = DebugData(
+        result='some result',
+        usage=Usage(
+            wall_time=0.25,
+            user_time=0.125,
+            system_time=0.0625,
+            max_rss=2048,
+            exit_code=1
+        ),
+        compile_usage=Usage(
+            wall_time=1.5,
+            user_time=1.0,
+            system_time=0.5,
+            max_rss=65536,
+            exit_code=0
+        )
+    )
+    mocker.patch(
+        'app.service.main.GoService.debug',
+        return_value=debug_result
+    )
+
+    # act
+    response = client.post('/debug/', json=request_data)
+
+    # assert
+    assert response.status_code == 200
+    assert response.json['usage'] == {
+        'wall_time': 0.25,
+        'user_time': 0.125,
+        'system_time': 0.0625,
+        'max_rss': 2048,
+        'exit_code': 1
+    }
+    assert response.json['compile_usage']['max_rss'] == 65536
+
+
 def test_debug__not_result__ok(client, mocker):
 
     # arrange
@@ -193,6 +242,34 @@ def test_testing__ok(client, mocker):
     testing_mock.assert_called_once_with(serialized_data)
 
 
+def test_testing__data_paths__ignored(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [{
+            'data_in': 'some input',
+            'data_out': 'some out',
+            'data_in_path': '/etc/passwd',
+            'data_out_path': '/etc/shadow'
+        }]
+    }
+    testing_mock = mocker.patch(
+        'app.main.GoService.testing',
+        return_value=TestsData(tests=[TestData(result='some out', ok=True)])
+    )
+
+    # act
+    response = client.post('/testing/', json=request_data)
+
+    # assert
+    assert response.status_code == 200
+    testing_mock.assert_called_once_with(TestsData(
+        code='some code',
+        checker='some func',
+        tests=[TestData(data_in='some input', data_out='some out')]
+    ))
+
 
 def test_testing__not_test_result__ok(client, mocker):
 
@@ -365,3 +442,609 @@ def test_testing__validation_error__bad_request(client, mocker):
         'checker': ['Missing data for required field.']
     }
     service_mock.assert_not_called()
+
+
+def test_ready__warmed_up__ok(client):
+
+    # act
+    response = client.get('/ready/')
+
+    # assert
+    assert response.status_code == 200
+    assert response.json['ready'] is True
+
+
+def test_ready__warm_up_in_progress__service_unavailable(client, mocker):
+
+    # arrange
+    mocker.patch('app.service.build.ready', Event())
+
+    # act
+    response = client.get('/ready/')
+
+    # assert
+    assert response.status_code == 503
+    assert response.json['ready'] is False
+
+
+def test_create_job__ok(client, mocker):
+
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [
+            {'data_in': 'some test 1 input', 'data_out': 'some test 1 out'},
+            {'data_in': 'some test 2 input', 'data_out': 'some test 2 out'}
+        ]
+    }
+
+    def testing(data):
+        data.tests[0].result = 'some result 1'
+        data.tests[0].ok = True
+        data.tests[1].error = 'some error 2'
+        data.tests[1].ok = False
+        return data
+
+    testing_mock = mocker.patch('app.main.GoService.testing', side_effect=testing)
+
+    # act
+    response = client.post('/jobs/', json=request_data)
+    job_id = response.json['id']
+    for _ in range(100):
+        job_response = client.get(f'/jobs/{job_id}')
+        if job_response.json['status'] == 'done':
+            break
+        time.sleep(0.01)
+
+    # assert
+    assert response.status_code == 202
+    assert response.json['total'] == 2
+    assert job_response.status_code == 200
+    assert job_response.json['status'] == 'done'
+    assert job_response.json['done'] == 2
+    assert job_response.json['error'] is None
+    result = job_response.json['result']
+    assert result['num'] == 2
+    assert result['num_ok'] == 1
+    assert result['ok'] is False
+    assert result['tests'][0]['result'] == 'some result 1'
+    assert result['tests'][1]['error'] == 'some error 2'
+    testing_mock.assert_called_once()
+
+
+def test_create_job__queue_is_full__too_many_requests(client, mocker):
+
+    # arrange
+    mocker.patch('app.config.JOB_QUEUE_SIZE', 0)
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [{'data_in': 'some input', 'data_out': 'some out'}]
+    }
+    service_mock = mocker.patch('app.main.GoService.testing')
+
+    # act
+    response = client.post('/jobs/', json=request_data)
+
+    # assert
+    assert response.status_code == 429
+    assert response.json['error'] == messages.MSG_9
+    service_mock.assert_not_called()
+
+
+def test_debug__stage_queue_full__too_many_requests(client, mocker):
+
+    # arrange
+    mocker.patch('app.service.stages.admission', return_value=3)
+    service_mock = mocker.patch('app.main.GoService.debug')
+
+    # act
+    response = client.post('/debug/', json={'code': 'some code'})
+
+    # assert
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '3'
+    assert response.json['error'] == messages.MSG_14
+    service_mock.assert_not_called()
+
+
+def test_testing__stage_queue_full__too_many_requests(client, mocker):
+
+    # arrange
+    mocker.patch('app.config.COMPILE_QUEUE_SIZE', 0)
+    service_mock = mocker.patch('app.main.GoService.testing')
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [{'data_in': 'some input', 'data_out': 'some out'}]
+    }
+
+    # act
+    response = client.post('/testing/', json=request_data)
+
+    # assert
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    service_mock.assert_not_called()
+
+
+def test_create_job__validation_error__bad_request(client, mocker):
+
+    # act
+    response = client.post('/jobs/', json={'code': 'some code'})
+
+    # assert
+    assert response.status_code == 400
+    assert response.json['error'] == 'Validation error'
+
+
+def test_get_job__unknown_id__not_found(client):
+
+    # act
+    response = client.get('/jobs/unknown')
+
+    # assert
+    assert response.status_code == 404
+    assert response.json['error'] == messages.MSG_10
+
+
+def test_testing__stream_ndjson__ok(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [
+            {'data_in': 'some test 1 input', 'data_out': 'some test 1 out'},
+            {'data_in': 'some test 2 input', 'data_out': 'some test 2 out'}
+        ]
+    }
+
+    def iter_testing(data):
+        data.tests[0].result = 'some result 1'
+        data.tests[0].ok = True
+        yield 0, data.tests[0]
+        data.tests[1].error = 'some error 2'
+        data.tests[1].ok = False
+        yield 1, data.tests[1]
+
+    iter_testing_mock = mocker.patch(
+        'app.main.GoService.iter_testing',
+        side_effect=iter_testing
+    )
+
+    # act
+    response = client.post('/testing/?stream=ndjson', json=request_data)
+
+    # assert
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.data.splitlines()]
+    assert events == [
+        {'event': 'compile', 'error': None, 'usage': None},
+        {'event': 'test', 'index': 0, 'ok': True, 'result': 'some result 1', 'error': None, 'skipped': None, 'usage': None},
+        {'event': 'test', 'index': 1, 'ok': False, 'result': None, 'error': 'some error 2', 'skipped': None, 'usage': None},
+        {'event': 'summary', 'num': 2, 'num_ok': 1, 'ok': False}
+    ]
+    iter_testing_mock.assert_called_once()
+
+
+def test_testing__stream_sse__ok(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [
+            {'data_in': 'some test 1 input', 'data_out': 'some test 1 out'}
+        ]
+    }
+
+    def iter_testing(data):
+        data.error = 'some compile error'
+        data.tests[0].error = data.error
+        data.tests[0].ok = False
+        yield 0, data.tests[0]
+
+    mocker.patch('app.main.GoService.iter_testing', side_effect=iter_testing)
+
+    # act
+    response = client.post(
+        '/testing/',
+        json=request_data,
+        headers={'Accept': 'text/event-stream'}
+    )
+
+    # assert
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    messages_ = response.data.decode().split('\n\n')
+    assert messages_[0] == (
+        'event: compile\n'
+        'data: {"event": "compile", "error": "some compile error", "usage": null}'
+    )
+    assert messages_[1].startswith('event: test\n')
+    assert messages_[2] == (
+        'event: summary\n'
+        'data: {"event": "summary", "num": 1, "num_ok": 0, "ok": false}'
+    )
+
+
+def test_testing__stream_checker_exception_after_first_test__error_event(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [
+            {'data_in': 'some test 1 input', 'data_out': 'some test 1 out'},
+            {'data_in': 'some test 2 input', 'data_out': 'some test 2 out'}
+        ]
+    }
+
+    def iter_testing(data):
+        data.tests[0].ok = True
+        yield 0, data.tests[0]
+        raise ServiceException(message='some message', details='some details')
+
+    mocker.patch('app.main.GoService.iter_testing', side_effect=iter_testing)
+
+    # act
+    response = client.post('/testing/?stream=ndjson', json=request_data)
+
+    # assert
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.data.splitlines()]
+    assert [e['event'] for e in events] == ['compile', 'test', 'error']
+    assert events[-1]['error'] == 'some message'
+    assert events[-1]['details'] == 'some details'
+
+
+def test_testing__stream_service_exception_before_first_test__internal_error(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [
+            {'data_in': 'some test 1 input', 'data_out': 'some test 1 out'}
+        ]
+    }
+    service_ex = ServiceException(
+        message='some message',
+        details='some details'
+    )
+    mocker.patch('app.main.GoService.iter_testing', side_effect=service_ex)
+
+    # act
+    response = client.post('/testing/?stream=ndjson', json=request_data)
+
+    # assert
+    assert response.status_code == 500
+    assert response.json['error'] == service_ex.message
+
+
+def test_testing__fail_fast_and_order__ok(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'fail_fast': True,
+        'order': 'cost',
+        'tests': [
+            {'data_in': 'some test 1 input', 'data_out': 'some test 1 out'},
+            {'data_in': 'some test 2 input', 'data_out': 'some test 2 out'}
+        ]
+    }
+    testing_result = TestsData(
+        tests=[
+            TestData(result='some result 1', error=None, ok=False),
+            TestData(result=None, error=messages.MSG_11, ok=False, skipped=True)
+        ]
+    )
+    testing_mock = mocker.patch(
+        'app.main.GoService.testing',
+        return_value=testing_result
+    )
+
+    # act
+    response = client.post('/testing/', json=request_data)
+
+    # assert
+    assert response.status_code == 200
+    assert response.json['num_ok'] == 0
+    assert response.json['tests'][0]['skipped'] is None
+    assert response.json['tests'][1]['skipped'] is True
+    assert response.json['tests'][1]['error'] == messages.MSG_11
+    data = testing_mock.call_args.args[0]
+    assert data.fail_fast is True
+    assert data.order == TestsData.ORDER_COST
+
+
+def test_testing__invalid_order__bad_request(client, mocker):
+    # arrange
+    request_data = {
+        'code': 'some code',
+        'checker': 'some func',
+        'order': 'random',
+        'tests': [{'data_in': 'some input', 'data_out': 'some out'}]
+    }
+    service_mock = mocker.patch('app.main.GoService.testing')
+
+    # act
+    response = client.post('/testing/', json=request_data)
+
+    # assert
+    assert response.status_code == 400
+    assert 'order' in response.json['details']
+    service_mock.assert_not_called()
+
+
+def test_batch__shared_tests__ok(client, mocker):
+    # arrange
+    request_data = {
+        'checker': 'some func',
+        'tests': [
+            {'data_in': 'some test input', 'data_out': 'some test out'}
+        ],
+        'items': [
+            {'code': 'some code 1'},
+            {'code': 'some code 2', 'checker': 'other func'}
+        ]
+    }
+
+    def batch(data):
+        data.items[0].tests[0].ok = True
+        data.items[1].tests[0].ok = False
+        data.errors[1] = ServiceException(message='some message', details='some details')
+        return data
+
+    batch_mock = mocker.patch('app.main.GoService.batch', side_effect=batch)
+
+    # act
+    response = client.post('/batch/', json=request_data)
+
+    # assert
+    assert response.status_code == 200
+    items = response.json['items']
+    assert items[0]['ok'] is True
+    assert items[0]['num'] == 1
+    assert items[0]['error'] is None
+    assert items[1]['ok'] is False
+    assert items[1]['error'] == 'some message'
+    assert items[1]['details'] == 'some details'
+    data = batch_mock.call_args.args[0]
+    assert [item.checker for item in data.items] == ['some func', 'other func']
+    assert data.items[0].tests == [
+        TestData(data_in='some test input', data_out='some test out', ok=True)
+    ]
+    assert data.items[0].tests[0] is not data.items[1].tests[0]
+
+
+def test_batch__missing_checker__bad_request(client, mocker):
+    # arrange
+    request_data = {
+        'items': [
+            {
+                'code': 'some code',
+                'tests': [{'data_in': 'some input', 'data_out': 'some out'}]
+            }
+        ]
+    }
+    service_mock = mocker.patch('app.main.GoService.batch')
+
+    # act
+    response = client.post('/batch/', json=request_data)
+
+    # assert
+    assert response.status_code == 400
+    assert response.json['details'] == {
+        'items': {'0': {'checker': ['Missing data for required field.']}}
+    }
+    service_mock.assert_not_called()
+
+
+def test_batch__test_set_and_checker_name__ok(client, mocker, tmp_path):
+    # arrange
+    mocker.patch('app.config.TEST_SET_DIR', str(tmp_path))
+    upload = client.post('/test-sets/', json={
+        'tests': [{'data_in': 'some input', 'data_out': '1.0'}]
+    })
+    get_spy = mocker.spy(test_sets, 'get')
+    batch_mock = mocker.patch('app.main.GoService.batch', side_effect=lambda data: data)
+    request_data = {
+        'checker_name': 'float',
+        'abs_eps': 0.001,
+        'test_set_id': upload.json['id'],
+        'items': [
+            {'code': 'some code 1'},
+            {'code': 'some code 2', 'checker': 'some func'},
+            {'code': 'some code 3', 'test_set_id': upload.json['id']}
+        ]
+    }
+
+    # act
+    response = client.post('/batch/', json=request_data)
+
+    # assert
+    assert response.status_code == 200
+    get_spy.assert_called_once_with(upload.json['id'])
+    data = batch_mock.call_args.args[0]
+    assert [item.checker_name for item in data.items] == ['float', None, 'float']
+    assert [item.checker for item in data.items] == [None, 'some func', None]
+    assert [item.abs_eps for item in data.items] == [0.001] * 3
+    assert data.items[0].tests[0].data_out_path == data.items[2].tests[0].data_out_path
+    assert data.items[0].tests[0] is not data.items[2].tests[0]
+
+
+def test_batch__test_set_errors__bad_request(client, mocker, tmp_path):
+    # arrange
+    mocker.patch('app.config.TEST_SET_DIR', str(tmp_path))
+    service_mock = mocker.patch('app.main.GoService.batch')
+
+    # act
+    both = client.post('/batch/', json={
+        'checker': 'some func',
+        'items': [{'code': 'some code', 'tests': [], 'test_set_id': '0' * 64}]
+    })
+    unknown = client.post('/batch/', json={
+        'checker': 'some func',
+        'items': [{'code': 'some code'}, {'code': 'some code', 'test_set_id': '0' * 64}],
+        'tests': []
+    })
+    unknown_checker = client.post('/batch/', json={
+        'checker_name': 'some checker',
+        'tests': [],
+        'items': [{'code': 'some code'}]
+    })
+
+    # assert
+    assert both.status_code == 400
+    assert both.json['details'] == {
+        'items': {'0': {'test_set_id': ['Specify either tests or test_set_id.']}}
+    }
+    assert unknown.status_code == 400
+    assert unknown.json['details'] == {
+        'items': {'1': {'test_set_id': ['Unknown test set.']}}
+    }
+    assert unknown_checker.status_code == 400
+    assert 'checker_name' in unknown_checker.json['details']
+    service_mock.assert_not_called()
+
+
+def test_batch__too_many_items__bad_request(client, mocker):
+    # arrange
+    mocker.patch('app.config.BATCH_MAX_ITEMS', 1)
+    request_data = {
+        'checker': 'some func',
+        'tests': [{'data_in': 'some input', 'data_out': 'some out'}],
+        'items': [{'code': 'some code 1'}, {'code': 'some code 2'}]
+    }
+    service_mock = mocker.patch('app.main.GoService.batch')
+
+    # act
+    response = client.post('/batch/', json=request_data)
+
+    # assert
+    assert response.status_code == 400
+    assert 'items' in response.json['details']
+    service_mock.assert_not_called()
+
+
+def test_metrics__ok(client):
+    # act
+    client.post('/debug/', json={'data_in': 'some input'})
+    response = client.get('/metrics')
+
+    # assert
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert b'sandbox_stage_duration_seconds_count{stage="schema_load"}' in response.data
+    assert b'sandbox_compile_errors_total' in response.data
+
+
+def test_test_sets__upload_and_testing__ok(client, mocker, tmp_path):
+    # arrange
+    mocker.patch('app.config.TEST_SET_DIR', str(tmp_path))
+    tests = [
+        {'data_in': 'some test 1 input', 'data_out': 'some test 1 out'},
+        {'data_in': 'some test 2 input', 'data_out': 'some test 2 out'}
+    ]
+    testing_mock = mocker.patch(
+        'app.service.main.GoService.testing',
+        side_effect=lambda data: data
+    )
+
+    # act
+    upload = client.post('/test-sets/', json={'tests': tests})
+    info = client.get(f'/test-sets/{upload.json["id"]}')
+    response = client.post('/testing/', json={
+        'code': 'some code',
+        'checker': 'some func',
+        'test_set_id': upload.json['id']
+    })
+
+    # assert
+    assert upload.status_code == 201
+    assert upload.json['num'] == 2
+    assert info.json == upload.json
+    assert response.status_code == 200
+    assert response.json['num'] == 2
+    data = testing_mock.call_args[0][0]
+    assert [test.data_in for test in data.tests] == [None, None]
+    with open(data.tests[1].data_out_path) as f:
+        assert f.read() == 'some test 2 out'
+
+
+def test_test_sets__unknown_id__not_found(client, mocker, tmp_path):
+    # arrange
+    mocker.patch('app.config.TEST_SET_DIR', str(tmp_path))
+
+    # act
+    info = client.get('/test-sets/' + '0' * 64)
+    response = client.post('/testing/', json={
+        'code': 'some code',
+        'checker': 'some func',
+        'test_set_id': '0' * 64
+    })
+
+    # assert
+    assert info.status_code == 404
+    assert info.json['error'] == messages.MSG_13
+    assert response.status_code == 400
+    assert response.json['details'] == {'test_set_id': ['Unknown test set.']}
+
+
+def test_testing__tests_and_test_set_id__bad_request(client):
+    # act
+    response = client.post('/testing/', json={
+        'code': 'some code',
+        'checker': 'some func',
+        'tests': [],
+        'test_set_id': '0' * 64
+    })
+
+    # assert
+    assert response.status_code == 400
+    assert 'test_set_id' in response.json['details']
+
+
+def test_testing__checker_name__ok(client, mocker):
+    # arrange
+    testing_mock = mocker.patch(
+        'app.service.main.GoService.testing',
+        side_effect=lambda data: data
+    )
+
+    # act
+    response = client.post('/testing/', json={
+        'code': 'some code',
+        'checker_name': 'float',
+        'abs_eps': 0.001,
+        'tests': [{'data_in': '1', 'data_out': '1.0'}]
+    })
+
+    # assert
+    assert response.status_code == 200
+    data = testing_mock.call_args[0][0]
+    assert data.checker is None
+    assert data.checker_name == 'float'
+    assert data.abs_eps == 0.001
+
+
+def test_testing__checker_and_checker_name__bad_request(client):
+    # act
+    both = client.post('/testing/', json={
+        'code': 'some code',
+        'checker': 'some func',
+        'checker_name': 'exact',
+        'tests': []
+    })
+    unknown = client.post('/testing/', json={
+        'code': 'some code',
+        'checker_name': 'some checker',
+        'tests': []
+    })
+
+    # assert
+    assert both.status_code == 400
+    assert 'checker_name' in both.json['details']
+    assert unknown.status_code == 400
+    assert 'checker_name' in unknown.json['details']
@@ -0,0 +1,133 @@
+import json
+import asyncio
+from app.asgi import app
+from app.entities import DebugData
+from app.service import messages
+from app.service.exceptions import ServiceException
+
+
+def request(method: str, path: str, body: bytes = b'', disconnect: bool = False):
+    """Прогоняет один запрос через ASGI-приложение.
+    disconnect — клиент отключается, не дождавшись ответа"""
+    messages_in = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages_in:
+            return messages_in.pop(0)
+        if not disconnect:
+            await asyncio.Event().wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path}
+    asyncio.run(app(scope, receive, send))
+    if not sent:
+        return None, {}, None
+    headers = {k.decode(): v.decode() for k, v in sent[0]['headers']}
+    return sent[0]['status'], headers, sent[1]['body']
+
+
+def test_debug__ok(mocker):
+
+    # arrange
+    debug_mock = mocker.patch(
+        'app.service.aio.AsyncGoService.debug',
+        return_value=DebugData(result='some result', error=None)
+    )
+    body = json.dumps({'code': 'some code', 'data_in': 'some input'}).encode()
+
+    # act
+    status, _, response = request('POST', '/debug/', body)
+
+    # assert
+    assert status == 200
+    assert json.loads(response)['result'] == 'some result'
+    debug_mock.assert_called_once_with(DebugData(code='some code', data_in='some input'))
+
+
+def test_debug__validation_error__bad_request():
+
+    # act
+    status, _, response = request('POST', '/debug/', b'{}')
+
+    # assert
+    assert status == 400
+    assert json.loads(response)['error'] == 'Validation error'
+    assert 'code' in json.loads(response)['details']
+
+
+def test_debug__service_exception__internal_error(mocker):
+
+    # arrange
+    mocker.patch(
+        'app.service.aio.AsyncGoService.debug',
+        side_effect=ServiceException(message='some error', details='some details')
+    )
+
+    # act
+    status, _, response = request('POST', '/debug/', b'{"code": "some code"}')
+
+    # assert
+    assert status == 500
+    assert json.loads(response) == {'error': 'some error', 'details': 'some details'}
+
+
+def test_debug__stage_queue_full__too_many_requests(mocker):
+
+    # arrange
+    mocker.patch('app.service.stages.admission', return_value=3)
+    debug_mock = mocker.patch('app.service.aio.AsyncGoService.debug')
+
+    # act
+    status, headers, response = request('POST', '/debug/', b'{"code": "some code"}')
+
+    # assert
+    assert status == 429
+    assert headers['retry-after'] == '3'
+    assert json.loads(response)['error'] == messages.MSG_14
+    debug_mock.assert_not_called()
+
+
+def test_debug__client_disconnected__request_cancelled(mocker):
+
+    # arrange
+    cancelled = []
+
+    async def debug(data):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    mocker.patch('app.service.aio.AsyncGoService.debug', side_effect=debug)
+
+    # act
+    status, _, _ = request('POST', '/debug/', b'{"code": "some code"}', disconnect=True)
+
+    # assert
+    assert status is None
+    assert cancelled == [True]
+
+
+def test_metrics__ok():
+
+    # act
+    status, headers, response = request('GET', '/metrics')
+
+    # assert
+    assert status == 200
+    assert headers['content-type'].startswith('text/plain')
+    assert b'sandbox_stage_wait_seconds' in response
+
+
+def test_unknown_path__not_found():
+
+    # act
+    status, _, _ = request('GET', '/unknown/')
+
+    # assert
+    assert status == 404
@@ -1,5 +1,6 @@
 import re
 from typing import Optional
+from app import config
 from app.service import messages
 
 
@@ -11,7 +12,8 @@ def clean_str(value: Optional[str]) -> Optional[str]:
 
 def clean_error(value: Optional[str]) -> Optional[str]:
     if isinstance(value, str):
-        pattern = r'/(tmp|sandbox)/\S*\.go'
+        # пути исходника в рабочих каталогах (WORKSPACE_DIR) и временных
+        pattern = r'(%s|/tmp|/sandbox)/\S*\.go' % re.escape(config.WORKSPACE_DIR.rstrip('/'))
         value = re.sub(
             pattern=pattern,
             repl="main.go",
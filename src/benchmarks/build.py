@@ -0,0 +1,104 @@
+"""Сравнение бэкендов сборки: go build и прямой compile + link.
+
+Запуск из каталога src:
+
+    python -m benchmarks.build --repeat 20 --output build.json
+
+Каждая программа корпуса собирается repeat раз каждым бэкендом,
+кеш бинарников отключён, GOCACHE прогрет заранее.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+from typing import Any, Dict, List, Optional
+
+from app import config
+from app.service import build
+from app.service.entities import GoFile
+from app.service.main import GoService
+from benchmarks import corpus
+from benchmarks.load import PERCENTILES, git_commit, percentile
+
+BACKENDS = ('go', 'direct')
+PROGRAMS = {
+    'fractional_part': corpus.FRACTIONAL_PART,
+    'apples': corpus.APPLES,
+    'remove_fragment': corpus.REMOVE_FRAGMENT,
+    'fibonacci': corpus.FIBONACCI,
+    'echo_lines': corpus.ECHO_LINES,
+    'compile_error': corpus.COMPILE_ERROR,
+}
+
+
+def measure(backend: str, code: str, repeat: int) -> List[float]:
+    """Время сборки программы бэкендом backend, repeat замеров"""
+    config.BUILD_BACKEND = backend
+    timings = []
+    for _ in range(repeat):
+        file = GoFile(code)
+        try:
+            started = time.perf_counter()
+            GoService._compile(file)
+            timings.append(time.perf_counter() - started)
+        finally:
+            file.remove()
+    return timings
+
+
+def run(repeat: int, programs: Optional[List[str]] = None) -> Dict[str, Any]:
+    config.ARTIFACT_CACHE_ENABLED = False
+    build.warm_up()
+    build.toolchain()
+    results = {}
+    for name in programs or PROGRAMS:
+        results[name] = {}
+        for backend in BACKENDS:
+            # первая сборка прогревает GOCACHE и importcfg, в замеры не идёт
+            measure(backend, PROGRAMS[name], 1)
+            timings = measure(backend, PROGRAMS[name], repeat)
+            results[name][backend] = {
+                'mean': sum(timings) / len(timings),
+                **{f'p{p}': percentile(timings, p) for p in PERCENTILES},
+            }
+    return {
+        'commit': git_commit(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'programs': results,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f'{"":20} {"backend":>8} {"mean":>10} {"p50":>10} {"p95":>10} {"p99":>10}')
+    for name, backends in report['programs'].items():
+        for backend, row in backends.items():
+            print(
+                f'{name:20} {backend:>8} {row["mean"] * 1000:>8.1f}ms'
+                + ''.join(f' {row[f"p{p}"] * 1000:>8.1f}ms' for p in PERCENTILES)
+            )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument(
+        '--program',
+        action='append',
+        choices=list(PROGRAMS),
+        help='собрать только эти программы корпуса'
+    )
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args(argv)
+
+    report = run(args.repeat, args.program)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
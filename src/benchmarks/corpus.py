@@ -0,0 +1,158 @@
+"""Корпус нагрузочного теста: программы из функциональных тестов
+(app/service/tests/test_service.py, app/tests/test_api.py),
+сгруппированные по сценариям нагрузки."""
+from typing import Any, Callable, Dict, Tuple
+
+FRACTIONAL_PART = (
+    'package main\n'
+    '\n'
+    'import (\n'
+    '    "fmt"\n'
+    '    "math"\n'
+    ')\n'
+    '\n'
+    'func main() {\n'
+    '    var x float64\n'
+    '    fmt.Scan(&x)\n'
+    '    fmt.Println(x - math.Floor(x))\n'
+    '}'
+)
+
+APPLES = (
+    'package main\n'
+    '\n'
+    'import "fmt"\n'
+    '\n'
+    'func main() {\n'
+    '    var n, k int\n'
+    '    fmt.Scan(&n)\n'
+    '    fmt.Scan(&k)\n'
+    '    fmt.Println(k / n)\n'
+    '    fmt.Println(k - (k/n)*n)\n'
+    '}'
+)
+
+REMOVE_FRAGMENT = (
+    'package main\n'
+    '\n'
+    'import (\n'
+    '    "fmt"\n'
+    '    "bufio"\n'
+    '    "os"\n'
+    '    "strings"\n'
+    ')\n'
+    '\n'
+    'func main() {\n'
+    '    reader := bufio.NewReader(os.Stdin)\n'
+    '    s, _ := reader.ReadString(\'\\n\')\n'
+    '    s = strings.TrimSpace(s)\n'
+    '    first := strings.Index(s, "h")\n'
+    '    last := strings.LastIndex(s, "h")\n'
+    '    if first != -1 && last != -1 && first < last {\n'
+    '        s = s[:first] + s[last+1:]\n'
+    '    }\n'
+    '    fmt.Print(s)\n'
+    '}'
+)
+
+FIBONACCI = (
+    'package main\n'
+    '\n'
+    'import "fmt"\n'
+    '\n'
+    'func fibonacci(N int) int {\n'
+    '    if N == 0 {\n'
+    '        return 0\n'
+    '    } else if N == 1 {\n'
+    '        return 1\n'
+    '    } else {\n'
+    '        return fibonacci(N-1) + fibonacci(N-2)\n'
+    '    }\n'
+    '}\n'
+    '\n'
+    'func main() {\n'
+    '    var n int\n'
+    '    fmt.Scan(&n)\n'
+    '    fmt.Println(fibonacci(n))\n'
+    '}'
+)
+
+ECHO_LINES = (
+    'package main\n'
+    '\n'
+    'import (\n'
+    '    "bufio"\n'
+    '    "os"\n'
+    ')\n'
+    '\n'
+    'func main() {\n'
+    '    scanner := bufio.NewScanner(os.Stdin)\n'
+    '    writer := bufio.NewWriter(os.Stdout)\n'
+    '    defer writer.Flush()\n'
+    '    for scanner.Scan() {\n'
+    '        writer.WriteString(scanner.Text())\n'
+    '        writer.WriteString("\\n")\n'
+    '    }\n'
+    '}'
+)
+
+COMPILE_ERROR = (
+    'package main\n'
+    '\n'
+    'func main() {\n'
+    '    adqeqwd\n'
+    '}'
+)
+
+INFINITE_LOOP = (
+    'package main\n'
+    '\n'
+    'func main() {\n'
+    '    for {\n'
+    '    }\n'
+    '}'
+)
+
+CHECKER = (
+    'def checker(right_value: str, value: str) -> bool:\n'
+    '    return right_value == value'
+)
+
+IO_LINES = 100000
+IO_INPUT = '\n'.join(f'line {i}' for i in range(IO_LINES))
+
+Scenario = Callable[[], Tuple[str, Dict[str, Any]]]
+
+
+def _debug(code: str, data_in: str = None) -> Scenario:
+    return lambda: ('/debug/', {'code': code, 'data_in': data_in})
+
+
+def _testing(code: str, tests) -> Scenario:
+    return lambda: ('/testing/', {
+        'code': code,
+        'checker': CHECKER,
+        'tests': tests,
+    })
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    'ok': _debug(FRACTIONAL_PART, '9.08'),
+    'compile_error': _debug(COMPILE_ERROR),
+    'cpu': _debug(FIBONACCI, '32'),
+    'io': _testing(ECHO_LINES, [
+        {'data_in': IO_INPUT, 'data_out': IO_INPUT},
+    ]),
+    'timeout': _debug(INFINITE_LOOP),
+    'testing': _testing(REMOVE_FRAGMENT, [
+        {
+            'data_in': 'In the hole in the ground there lived a hobbit',
+            'data_out': 'In tobbit',
+        },
+    ]),
+    'large_suite': _testing(APPLES, [
+        {'data_in': f'{n}\n{k}', 'data_out': f'{k // n}\n{k % n}'}
+        for n in range(1, 11)
+        for k in range(0, 100, 10)
+    ]),
+}
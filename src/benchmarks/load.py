@@ -0,0 +1,305 @@
+"""Нагрузочный тест /debug/ и /testing/.
+
+Запуск из каталога src:
+
+    python -m benchmarks.load --mix ok=4,compile_error=1,cpu=2 \\
+        --concurrency 8 --duration 30 --output results.json
+
+Без --url приложение поднимается в этом же процессе (Flask test client),
+с --url запросы идут по HTTP на запущенный сервис. Задержки по этапам
+берутся из разницы гистограмм /metrics до и после прогона.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.corpus import SCENARIOS
+
+STAGE_METRIC = 'sandbox_stage_duration_seconds'
+PERCENTILES = (50, 95, 99)
+
+
+class InProcessClient:
+    """Запросы к приложению в этом же процессе"""
+
+    def __init__(self):
+        from app.main import app
+        self.app = app
+
+    def post(self, path: str, payload: Dict[str, Any]) -> int:
+        with self.app.test_client() as client:
+            return client.post(path, json=payload).status_code
+
+    def metrics(self) -> str:
+        with self.app.test_client() as client:
+            return client.get('/metrics').get_data(as_text=True)
+
+
+class HttpClient:
+    """Запросы к запущенному сервису по HTTP"""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, path: str, payload: Dict[str, Any]) -> int:
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as ex:
+            return ex.code
+
+    def metrics(self) -> str:
+        with urllib.request.urlopen(self.url + '/metrics', timeout=self.timeout) as response:
+            return response.read().decode()
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """'ok=4,cpu=1' -> {'ok': 4, 'cpu': 1}"""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(
+                f'Unknown scenario {name!r}, expected one of {", ".join(SCENARIOS)}'
+            )
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        **{f'p{p}': percentile(latencies, p) for p in PERCENTILES},
+    }
+
+
+def stage_buckets(text: str) -> Dict[str, Dict[float, float]]:
+    """Накопленные значения бакетов гистограммы этапов по этапам"""
+    buckets = defaultdict(dict)
+    for family in text_string_to_metric_families(text):
+        for sample in family.samples:
+            if sample.name == STAGE_METRIC + '_bucket':
+                le = float(sample.labels['le'])
+                buckets[sample.labels['stage']][le] = sample.value
+    return buckets
+
+
+def histogram_quantile(q: float, buckets: Dict[float, float]) -> Optional[float]:
+    """Оценка квантиля по накопленным бакетам, как в PromQL"""
+    bounds = sorted(buckets)
+    if not bounds or not buckets[bounds[-1]]:
+        return None
+    rank = q * buckets[bounds[-1]]
+    lower, lower_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float('inf'):
+                return lower
+            if count == lower_count:
+                return bound
+            return lower + (bound - lower) * (rank - lower_count) / (count - lower_count)
+        lower, lower_count = bound, count
+    return lower
+
+
+def stage_stats(before: str, after: str) -> Dict[str, Dict[str, Any]]:
+    start, end = stage_buckets(before), stage_buckets(after)
+    stats = {}
+    for stage, buckets in end.items():
+        diff = {
+            le: value - start.get(stage, {}).get(le, 0.0)
+            for le, value in buckets.items()
+        }
+        count = diff.get(float('inf'), 0.0)
+        if not count:
+            continue
+        stats[stage] = {
+            'count': int(count),
+            **{f'p{p}': histogram_quantile(p / 100, diff) for p in PERCENTILES},
+        }
+    return stats
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    client,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: Optional[float] = None,
+    requests: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Гоняет сценарии из mix в concurrency потоков, пока не истечёт
+    duration секунд или не будет отправлено requests запросов"""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    plan = None
+    if requests is not None:
+        plan = iter(rng.choices(names, weights, k=requests))
+    results: List[Tuple[str, str, float, int]] = []
+    metrics_before = client.metrics()
+    started = time.monotonic()
+    deadline = started + duration if duration else None
+
+    def worker():
+        while True:
+            if plan is not None:
+                name = next(plan, None)
+                if name is None:
+                    return
+            else:
+                if time.monotonic() >= deadline:
+                    return
+                name = rng.choices(names, weights)[0]
+            path, payload = SCENARIOS[name]()
+            request_started = time.perf_counter()
+            status = client.post(path, payload)
+            results.append((
+                name,
+                path,
+                time.perf_counter() - request_started,
+                status
+            ))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.monotonic() - started
+    metrics_after = client.metrics()
+
+    by_endpoint, by_scenario = defaultdict(list), defaultdict(list)
+    errors_endpoint, errors_scenario = defaultdict(int), defaultdict(int)
+    for name, path, latency, status in results:
+        by_endpoint[path].append(latency)
+        by_scenario[name].append(latency)
+        if status != 200:
+            errors_endpoint[path] += 1
+            errors_scenario[name] += 1
+
+    return {
+        'commit': git_commit(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'concurrency': concurrency,
+        'mix': mix,
+        'elapsed': elapsed,
+        'total': summarize(
+            [latency for _, _, latency, _ in results],
+            sum(errors_endpoint.values()),
+            elapsed
+        ),
+        'endpoints': {
+            path: summarize(latencies, errors_endpoint[path], elapsed)
+            for path, latencies in by_endpoint.items()
+        },
+        'scenarios': {
+            name: summarize(latencies, errors_scenario[name], elapsed)
+            for name, latencies in by_scenario.items()
+        },
+        'stages': stage_stats(metrics_before, metrics_after),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    def fmt(value):
+        return '-' if value is None else f'{value * 1000:.1f}ms'
+
+    rows = [('total', report['total'])]
+    rows += [(f'endpoint {k}', v) for k, v in report['endpoints'].items()]
+    rows += [(f'scenario {k}', v) for k, v in report['scenarios'].items()]
+    print(f'{"":32} {"req":>7} {"err":>5} {"rps":>8} {"p50":>10} {"p95":>10} {"p99":>10}')
+    for title, row in rows:
+        print(
+            f'{title:32} {row["requests"]:>7} {row["errors"]:>5} {row["rps"]:>8.1f}'
+            f' {fmt(row["p50"]):>10} {fmt(row["p95"]):>10} {fmt(row["p99"]):>10}'
+        )
+    for stage, row in report['stages'].items():
+        print(
+            f'{"stage " + stage:32} {row["count"]:>7} {"":>5} {"":>8}'
+            f' {fmt(row["p50"]):>10} {fmt(row["p95"]):>10} {fmt(row["p99"]):>10}'
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--url',
+        help='адрес запущенного сервиса; без него приложение поднимается в процессе'
+    )
+    parser.add_argument(
+        '--mix',
+        type=parse_mix,
+        default=parse_mix('ok'),
+        help=f'сценарии с весами, например ok=4,cpu=1 ({", ".join(SCENARIOS)})'
+    )
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument(
+        '--requests',
+        type=int,
+        help='отправить ровно столько запросов вместо --duration'
+    )
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--timeout', type=float, default=60.0, help='таймаут HTTP-запроса')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args(argv)
+
+    client = HttpClient(args.url, args.timeout) if args.url else InProcessClient()
+    report = run(
+        client,
+        mix=args.mix,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        requests=args.requests,
+        seed=args.seed
+    )
+    report['mode'] = 'http' if args.url else 'in-process'
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,17 @@
+from benchmarks import build
+
+
+def test_print_report__row_per_backend(capsys):
+
+    # arrange
+    row = {'mean': 0.2, 'p50': 0.2, 'p95': 0.25, 'p99': 0.3}
+    report = {'programs': {'apples': {'go': row, 'direct': row}}}
+
+    # act
+    build.print_report(report)
+
+    # assert
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 3
+    assert lines[1].split()[:3] == ['apples', 'go', '200.0ms']
+    assert lines[2].split()[:2] == ['apples', 'direct']
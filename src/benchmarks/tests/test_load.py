@@ -0,0 +1,79 @@
+import argparse
+import pytest
+from benchmarks import load
+
+
+METRICS_BEFORE = (
+    'sandbox_stage_duration_seconds_bucket{le="0.1",stage="compile"} 0.0\n'
+    'sandbox_stage_duration_seconds_bucket{le="1.0",stage="compile"} 0.0\n'
+    'sandbox_stage_duration_seconds_bucket{le="+Inf",stage="compile"} 0.0\n'
+)
+METRICS_AFTER = (
+    'sandbox_stage_duration_seconds_bucket{le="0.1",stage="compile"} 5.0\n'
+    'sandbox_stage_duration_seconds_bucket{le="1.0",stage="compile"} 10.0\n'
+    'sandbox_stage_duration_seconds_bucket{le="+Inf",stage="compile"} 10.0\n'
+)
+
+
+class FakeClient:
+
+    def __init__(self):
+        self.calls = []
+        self.scrapes = [METRICS_BEFORE, METRICS_AFTER]
+
+    def post(self, path, payload):
+        self.calls.append(path)
+        return 200 if path == '/debug/' else 500
+
+    def metrics(self):
+        return self.scrapes.pop(0)
+
+
+def test_parse_mix__weights__ok():
+    # act
+    mix = load.parse_mix('ok=3,cpu')
+
+    # assert
+    assert mix == {'ok': 3, 'cpu': 1}
+
+
+def test_parse_mix__unknown_scenario__error():
+    # act
+    with pytest.raises(argparse.ArgumentTypeError):
+        load.parse_mix('unknown=1')
+
+
+def test_histogram_quantile__ok():
+    # arrange
+    buckets = {0.1: 5.0, 1.0: 10.0, float('inf'): 10.0}
+
+    # act
+    p50 = load.histogram_quantile(0.5, buckets)
+    p99 = load.histogram_quantile(0.99, buckets)
+
+    # assert
+    assert p50 == pytest.approx(0.1)
+    assert p99 == pytest.approx(0.982)
+
+
+def test_run__requests__report():
+    # arrange
+    client = FakeClient()
+
+    # act
+    report = load.run(
+        client,
+        mix={'ok': 1, 'testing': 1},
+        concurrency=2,
+        requests=10,
+        seed=1
+    )
+
+    # assert
+    assert len(client.calls) == 10
+    assert report['total']['requests'] == 10
+    assert set(report['endpoints']) == set(client.calls)
+    assert report['endpoints'].get('/debug/', {'errors': 0})['errors'] == 0
+    assert report['total']['errors'] == client.calls.count('/testing/')
+    assert report['stages']['compile']['count'] == 10
+    assert report['stages']['compile']['p50'] == pytest.approx(0.1)
@@ -0,0 +1,11 @@
+"""Настройки gunicorn: ``gunicorn -c gunicorn.conf.py app.main:app``"""
+import os
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    """Убирает метрики livesum завершившегося воркера (см. app/service/metrics.py),
+    иначе /metrics продолжит складывать его последние значения"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,2 +1,9 @@
 #!/bin/bash
-gunicorn --bind 0:9010 app.main:app --reload -w ${GUNICORN_WORKERS:=1}
\ No newline at end of file
+if [ -n "$RUNNER_SOCKET" ]; then
+    python -m app.service.runner "$RUNNER_SOCKET" &
+fi
+# метрики воркеров gunicorn складываются в общий каталог, см. app/service/metrics.py
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:=/tmp/sandbox-metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+gunicorn -c gunicorn.conf.py --bind 0:9010 app.main:app --reload -w ${GUNICORN_WORKERS:=1}